@@ -1,14 +1,16 @@
 import streamlit as st
 from dotenv import load_dotenv
 import asyncio
+import logging
 import nest_asyncio
 import os
+import re
 import time
 import shutil
+import threading
+import uuid
+from collections import deque
 from pathlib import Path
-from datetime import datetime
-import pickle
-import json
 
 # LangChain imports
 from langchain_community.vectorstores import FAISS
@@ -16,11 +18,26 @@ from langchain.chains import ConversationalRetrievalChain
 from langchain_google_genai import GoogleGenerativeAIEmbeddings, ChatGoogleGenerativeAI
 from langchain_community.embeddings import HuggingFaceEmbeddings
 from langchain.prompts import PromptTemplate
-from langchain.memory import ConversationBufferMemory
 
 # Custom loaders
-from chunk_loader import load_processed_chunks
-from scraper import WebsiteScraper
+from chunk_loader import load_processed_chunks, load_chunk_provenance
+from ingest import IngestEngine, WebSource
+from chunk_store import ChunkStore, MmapChunks, stored_chunks_file
+from shared_index import build_shared_index, load_index_vectors, load_shared_index
+from prompts import get_prompt_template, create_prompt_cache
+from token_usage import TokenUsageCallback, build_usage_record, format_history
+from question_router import enable_fast_path, needs_condensing
+from reranker import build_reranking_retriever
+from query_embeddings import CachedQueryEmbeddings
+from chat_store import MessagePager, prune_sessions, render_messages_html
+from session_store import SessionStore, SESSION_KEYS
+from hierarchical import build_hierarchical_retriever
+from batch_ingest import install_bundle
+from snapshots import SnapshotStore
+from single_flight import SingleFlightChatModel, shared_single_flight
+from extractive import ExtractiveAnswerer
+from entities import EntityPinnedRetriever, load_entity_index
+from hedging import HedgedChatModel
 
 # -------------------------------
 # Setup
@@ -47,11 +64,84 @@ if "current_key_index" not in st.session_state:
 
 GOOGLE_API_KEY = API_KEYS[st.session_state.current_key_index]
 
+# "full" sends the original long instructions, "compact" a condensed equivalent
+PROMPT_MODE = os.getenv("PROMPT_MODE", "full")
+# Ask Gemini to cache the static instructions (ignored when the provider refuses)
+PROMPT_CACHE = os.getenv("PROMPT_CACHE", "0") == "1"
+# "fast" skips the question-rewrite LLM call for standalone follow-ups, "always" keeps it
+CONDENSE_MODE = os.getenv("CONDENSE_MODE", "always")
+# Rerank the retrieved candidates with a local cross-encoder and keep only the best few
+RERANK = os.getenv("RERANK", "0") == "1"
+RERANK_TOP_N = int(os.getenv("RERANK_TOP_N", "8"))
+RERANK_MIN_SCORE = float(os.getenv("RERANK_MIN_SCORE")) if os.getenv("RERANK_MIN_SCORE") else None
+# Point the Gemini client at another endpoint (e.g. the load-test stand-in), over REST
+GEMINI_API_ENDPOINT = os.getenv("GEMINI_API_ENDPOINT")
+# Crawl checkpoints and raw page cache (outside processed_data so a new scrape doesn't wipe it)
+CRAWL_CACHE = os.getenv("CRAWL_CACHE", "../crawl_cache.sqlite")
+# Page limit per crawl (0 = no limit); LARGE_CRAWL=1 keeps the frontier on disk for 100k+ page sites
+CRAWL_MAX_PAGES = int(os.getenv("CRAWL_MAX_PAGES", "50")) or None
+LARGE_CRAWL = os.getenv("LARGE_CRAWL", "0") == "1"
+# Drop near-empty, symbol-only and URL-list chunks before embedding (0 keeps every chunk)
+CHUNK_FILTER = os.getenv("CHUNK_FILTER", "1") == "1"
+# "mmap" opens a persisted index and chunk store read-only so replicas on one host share them
+INDEX_MODE = os.getenv("INDEX_MODE", "memory")
+# "hierarchical" searches section vectors first, then chunks inside the best sections only
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "flat")
+HIER_SECTION_K = int(os.getenv("HIER_SECTION_K", "20"))
+# Neighbouring chunks (per side) merged into each hierarchical match
+HIER_EXPAND = int(os.getenv("HIER_EXPAND", "0"))
+# Messages kept in session state; older ones are paged to ../chat_sessions/<session id>/
+CHAT_WINDOW = int(os.getenv("CHAT_WINDOW", "50"))
+# Question/answer turns kept as chat history for the LLM; older turns are dropped
+CHAT_HISTORY_TURNS = int(os.getenv("CHAT_HISTORY_TURNS", "10"))
+# Retired data snapshots kept for rollback; older ones are deleted once no query can still be using them
+SNAPSHOT_KEEP = int(os.getenv("SNAPSHOT_KEEP", "1"))
+# Bundles written by batch_ingest.py, loaded with `load + name`
+BUNDLE_DIR = os.getenv("BUNDLE_DIR", "../bundles")
+# Identical prompts in flight at the same time (same snapshot) share one LLM call
+SINGLE_FLIGHT = os.getenv("SINGLE_FLIGHT", "1") == "1"
+# "extractive" answers every question from the retrieved chunks without calling Gemini (`quick + question` does it for one)
+ANSWER_MODE = os.getenv("ANSWER_MODE", "llm")
+# Answer extractively instead of failing when every API key is rate-limited
+EXTRACTIVE_FALLBACK = os.getenv("EXTRACTIVE_FALLBACK", "1") == "1"
+# Answer contact / people / price lookups from the ingest-time entity index, and pin their chunks into the context
+ENTITY_INDEX = os.getenv("ENTITY_INDEX", "1") == "1"
+# Deadline for one LLM call; a call still running at the HEDGE_PERCENTILE latency is repeated on the next API key
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "30"))
+HEDGE = os.getenv("HEDGE", "1") == "1"
+HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", "95"))
+# Per-session history and settings; sessions not saved for this long are evicted
+SESSION_STORE = os.getenv("SESSION_STORE", "../sessions.sqlite")
+SESSION_IDLE_MINUTES = float(os.getenv("SESSION_IDLE_MINUTES", "1440"))
+# Snapshots whose engines stay cached per process (each has one engine per API key); older ones are evicted
+ENGINE_CACHE_SITES = int(os.getenv("ENGINE_CACHE_SITES", "2"))
+# Per-query token usage and cache / LLM statistics are logged at DEBUG; the default keeps the hot path quiet
+LOG_LEVEL = os.getenv("LOG_LEVEL", "WARNING")
+
+logger = logging.getLogger("chatbot")
+if not logger.handlers:
+    logger.addHandler(logging.StreamHandler())
+logger.setLevel(LOG_LEVEL.upper())
+
 st.set_page_config(page_title="Chatbot", page_icon="🤖", layout="centered")
 
 # -------------------------------
 # Session State Initialization
 # -------------------------------
+@st.cache_resource
+def get_session_store():
+    return SessionStore(SESSION_STORE)
+
+if "session_id" not in st.session_state:
+    # The ID lives in the URL so a reloaded tab gets its conversation back
+    requested_id = st.query_params.get("session", "")
+    st.session_state.session_id = requested_id if re.fullmatch(r"[0-9a-f]{32}", requested_id) else uuid.uuid4().hex
+    st.query_params["session"] = st.session_state.session_id
+    saved_state = get_session_store().load(st.session_state.session_id)
+    if saved_state:
+        for key, value in saved_state.items():
+            st.session_state[key] = value
+
 if "messages" not in st.session_state:
     st.session_state["messages"] = [{"role": "bot", "text": "👋 Hi! Enter `new + url` to start."}]
 if "chat_history" not in st.session_state:
@@ -64,33 +154,80 @@ if "scraping" not in st.session_state:
     st.session_state.scraping = False
 if "scraping_url" not in st.session_state:
     st.session_state.scraping_url = None
-if "qa_chain" not in st.session_state:
-    st.session_state.qa_chain = None
+if "loading_bundle" not in st.session_state:
+    st.session_state.loading_bundle = None
+if "token_usage" not in st.session_state:
+    # Recent records only; every record is also logged at debug level
+    st.session_state.token_usage = deque(maxlen=100)
+if "message_pager" not in st.session_state:
+    st.session_state.message_pager = MessagePager(st.session_state.session_id, window=CHAT_WINDOW)
+if "older_pages_shown" not in st.session_state:
+    st.session_state.older_pages_shown = 0
+
+@st.cache_resource
+def get_housekeeping():
+    """When this process last evicted idle sessions"""
+    return {"sessions": 0.0, "lock": threading.Lock()}
+
+def evict_idle_sessions():
+    """At most every 10 minutes per process: forget sessions idle longer than SESSION_IDLE_MINUTES"""
+    housekeeping = get_housekeeping()
+    with housekeeping["lock"]:
+        if time.time() - housekeeping["sessions"] < 600:
+            return 0
+        housekeeping["sessions"] = time.time()
+    max_idle = SESSION_IDLE_MINUTES * 60
+    evicted = get_session_store().evict_idle(max_idle)
+    for session_id in evicted:
+        MessagePager(session_id).clear()
+    # Archive directories only change when a page spills, so the store's save times decide what is still active
+    prune_sessions(max_age_seconds=max_idle, active=get_session_store().active(max_idle))
+    return len(evicted)
+
+evict_idle_sessions()
+
+@st.cache_resource
+def get_snapshot_store():
+    """
+    One per process, so every session's engine builds and in-flight queries pin
+    versions in the same place. build() collects old versions right after it publishes.
+    """
+    return SnapshotStore("../processed_data", keep=SNAPSHOT_KEEP)
 
 # -------------------------------
 # Utility Functions
 # -------------------------------
 def add_message(role, text):
     st.session_state["messages"].append({"role": role, "text": text})
+    st.session_state.message_pager.spill(st.session_state["messages"])
 
-def delete_existing_data():
+def add_turn(question, answer):
+    history = st.session_state.chat_history
+    history.append((question, answer))
+    del history[:-CHAT_HISTORY_TURNS]
+
+def save_session():
+    state = {key: st.session_state[key] for key in SESSION_KEYS}
+    get_session_store().save(st.session_state.session_id, state)
+
+def reset_messages(messages):
+    st.session_state.message_pager.clear()
+    st.session_state.older_pages_shown = 0
+    st.session_state["messages"] = messages
+
+def clear_pdf_dir():
+    # Processed data is never deleted here: a new snapshot replaces it once it is complete
     pdfs_dir = Path("../pdfs")
-    processed_dir = Path("../processed_data")
     if pdfs_dir.exists():
         shutil.rmtree(pdfs_dir)
-    if processed_dir.exists():
-        shutil.rmtree(processed_dir)
     pdfs_dir.mkdir(exist_ok=True)
-    processed_dir.mkdir(exist_ok=True)
 
 def switch_key():
     st.session_state.current_key_index = (st.session_state.current_key_index + 1) % len(API_KEYS)
     global GOOGLE_API_KEY
     GOOGLE_API_KEY = API_KEYS[st.session_state.current_key_index]
-    st.cache_resource.clear()
-    docs = get_docs()
-    if docs:
-        st.session_state.qa_chain = get_chain("gemini-1.5-flash", docs)
+    # Engines are cached per key, so the next query uses the engine for the new key; it is built over the
+    # same cached retriever and index, and engines for the other keys stay cached too
 
 def update_env_with_current_key():
     with open('.env', 'w') as f:
@@ -102,188 +239,217 @@ def update_env_with_current_key():
 # -------------------------------
 # Chatbot Initialization
 # -------------------------------
-@st.cache_data(show_spinner=False)
-def get_docs():
-    """Load pre-processed chunks"""
+@st.cache_data(show_spinner=False, max_entries=ENGINE_CACHE_SITES)
+def get_docs(site):
+    """Load pre-processed chunks of one snapshot"""
     try:
-        docs = load_processed_chunks()
+        if INDEX_MODE == "mmap" and MmapChunks.available(site):
+            return MmapChunks(site)
+        docs = load_processed_chunks(site)
         return docs if docs else []
     except Exception as e:
         return []
 
-@st.cache_resource
-def get_chain(selected_model, docs):
-    if not docs:
+def site_key():
+    """
+    Directory of the current data snapshot, or None before anything is processed.
+    Published snapshots never change, so the path identifies the data; data in the
+    old flat layout also gets its file stamp.
+    """
+    data_dir = get_snapshot_store().current()
+    chunks_file = stored_chunks_file(str(data_dir))
+    if chunks_file is None:
         return None
+    if get_snapshot_store().current_version() != "legacy":
+        return str(data_dir)
+    stat = chunks_file.stat()
+    return f"{data_dir}#{stat.st_size}-{stat.st_mtime_ns}"
+
+def site_dir(site):
+    return site.split("#")[0]
+
+@st.cache_resource
+def get_embeddings():
+    """The document embedding model as (embeddings, model name, provider); shared by every engine and ingest"""
+    # Try local embeddings first
     try:
-        # Try local embeddings first
+        embedding_model = "sentence-transformers/all-MiniLM-L6-v2"
+        return HuggingFaceEmbeddings(model_name=embedding_model), embedding_model, "Local (Sentence Transformers)"
+    except Exception as local_e:
+        embedding_model = "models/embedding-001"
+        embeddings = GoogleGenerativeAIEmbeddings(
+            model=embedding_model,
+            google_api_key=GOOGLE_API_KEY
+        )
+        return embeddings, embedding_model, "Google Gemini"
+
+@st.cache_resource(max_entries=ENGINE_CACHE_SITES)
+def get_retrieval(site, _docs):
+    """
+    The retriever of one site (vector index, reranker, entity index) and the pieces the
+    answer paths share, built once per site whatever API key is in use. The docs argument
+    is not hashed (leading underscore); `site` identifies the data instead.
+    """
+    docs = _docs
+    data_dir = site_dir(site)
+    embeddings, embedding_model, embedding_provider = get_embeddings()
+
+    # Questions are embedded through a shared LRU cache; concurrent misses are encoded in one call
+    if embedding_provider.startswith("Local"):
+        batch_fn = embeddings.embed_documents
+    else:
+        batch_fn = lambda texts: embeddings.embed_documents(texts, task_type="RETRIEVAL_QUERY")
+    embeddings = CachedQueryEmbeddings(embeddings, embedding_model, batch_fn=batch_fn)
+
+    # Hierarchical retrieval needs chunk provenance to know which chunks form a section
+    provenance = load_chunk_provenance(data_dir) if RETRIEVAL_MODE == "hierarchical" else None
+    vector_store = None
+    if INDEX_MODE == "mmap":
+        # The index is built at ingest time; a snapshot without a usable one is indexed in memory instead
         try:
-            embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
-            embedding_provider = "Local (Sentence Transformers)"
-        except Exception as local_e:
-            embeddings = GoogleGenerativeAIEmbeddings(
-                model="models/embedding-001",
-                google_api_key=GOOGLE_API_KEY
-            )
-            embedding_provider = "Google Gemini"
-
-        vector_store = FAISS.from_texts(docs, embeddings)
-        retriever = vector_store.as_retriever(search_type="mmr", search_kwargs={"k": 50, "fetch_k": 100})
-        memory = ConversationBufferMemory(memory_key="chat_history", return_messages=True)
-
-        custom_prompt_template = """
-         # 🤖 Advanced Website Knowledge Assistant
-
-         You are an intelligent AI assistant specialized in website content analysis and Q&A. Your primary function is to help users understand and extract information from scraped website data.
-
-         ## 🎯 CORE PRINCIPLES
-
-         ### 1. CONTEXT-ONLY ANSWERING
-         - **MANDATORY**: Answer ONLY using the provided website context
-         - **NEVER** use external knowledge, assumptions, or general information
-         - **DEFAULT RESPONSE** for unavailable information: "I don't know. The information is not available in the provided website content."
-         - **VERIFICATION**: Cross-reference information across multiple context chunks when possible
-
-         ### 2. INTELLIGENT CONTENT RECOGNITION
-         **Synonyms & Related Terms:**
-         - **Leadership**: CEO, Founder, Owner, President, Director, Executive, Head, Boss, Manager, Chairperson
-         - **Team/People**: Employees, Staff, Workers, Team members, Personnel, Associates, Colleagues, Workforce
-         - **Company**: Organization, Firm, Business, Corporation, Enterprise, Startup, Agency, Consultancy
-         - **Products/Services**: Solutions, Offerings, Features, Capabilities, Platforms, Tools, Systems
-         - **Contact**: Reach out, Get in touch, Connect, Email, Phone, Message, Contact form
-         - **Skills/Abilities**: Expertise, Proficiency, Knowledge, Experience, Qualifications, Competencies
-         - **Certifications**: Certificates, Credentials, Qualifications, Awards, Achievements, Accreditations
-         - **Education**: Degree, Course, Training, Learning, Academic background, Qualifications
-         - **Experience**: Work history, Career, Professional background, Tenure, Employment
-
-         ### 3. SPECIALIZED CONTENT HANDLING
-
-         **Skills Analysis:**
-         - List ALL technical skills mentioned (HTML, CSS, JavaScript, Python, AWS, React, Node.js, etc.)
-         - Include proficiency levels when specified (Beginner, Intermediate, Advanced, Expert)
-         - Group related skills (Frontend: HTML/CSS/JS, Backend: Python/Node.js, Cloud: AWS/GCP)
-         - Mention tools, frameworks, and technologies
-
-         **Certifications & Qualifications:**
-         - List complete certification names with providers
-         - Include dates, validity periods, and credential IDs when available
-         - Group by category (Technical, Professional, Industry-specific)
-         - Note any specializations or concentrations
-
-         **Company/Service Information:**
-         - Extract mission, vision, values, and company culture
-         - Identify products, services, and target markets
-         - Note unique selling propositions and competitive advantages
-         - Include pricing, packages, or service tiers when mentioned
-
-         ### 4. CONVERSATION INTELLIGENCE
-
-         **Chat History Integration:**
-         - Reference previous questions and answers for context
-         - Understand follow-up questions and clarifications
-         - Maintain conversation flow and topic continuity
-         - Avoid repeating information already provided
-
-         **Question Interpretation:**
-         - Recognize implicit questions and requests
-         - Handle multi-part questions systematically
-         - Provide comprehensive answers for broad queries
-         - Ask for clarification only when absolutely necessary
-
-         ### 5. RESPONSE OPTIMIZATION
-
-         **Content Structure:**
-         - **Headers**: Use clear, descriptive headers for organized responses
-         - **Lists**: Use bullet points or numbered lists for multiple items
-         - **Tables**: Use markdown tables for comparisons or structured data
-         - **Code**: Use code blocks for technical content, commands, or examples
-
-         **Professional Communication:**
-         - Use business-appropriate, professional language
-         - Be concise yet comprehensive - no unnecessary verbosity
-         - Maintain consistent tone throughout responses
-         - Use active voice and clear sentence structure
-
-         **Error Handling:**
-         - Gracefully handle incomplete or unclear context
-         - Provide partial information when available
-         - Suggest related topics or alternative questions
-         - Maintain helpful attitude even with limitations
-
-         **Greeting Handling:**
-         - For very short inputs that are purely greetings like "hi", "hello", "hey", "good morning", respond with a friendly receptionist-style greeting
-         - Examples: "Hello! How can I help you today?" or "Hi there! What can I assist you with regarding the company?"
-         - For questions or longer inputs, always answer based on context
-         - Do not provide company information in greetings unless specifically asked
-         - Keep responses warm and welcoming only for clear greetings
-
-         ## 📋 RESPONSE GUIDELINES
-
-
-         ### For Company Information:
-
-         ## Company Overview
-         [Company Name] is a [industry] company specializing in [services/products].
-
-         ## Key Services
-         - Service 1: [Description]
-         - Service 2: [Description]
-
-         ## Unique Value Proposition
-         [What makes them stand out]
-         ```
-
-         ### For General Questions:
-         - Provide direct, factual answers
-         - Include relevant context and details
-         - Reference specific sections or pages when possible
-         - Maintain objectivity and accuracy
-
-         ## 🔍 CONTEXT ANALYSIS FRAMEWORK
-
-         When analyzing context:
-         1. **Identify Key Sections**: Headers, navigation, main content areas
-         2. **Extract Structured Data**: Lists, tables, specifications
-         3. **Note Relationships**: How different pieces of information connect
-         4. **Prioritize Relevance**: Focus on information most relevant to the question
-         5. **Maintain Accuracy**: Only include information explicitly stated
-
-         ## 🚀 ADVANCED FEATURES
-
-         - **Multi-page Synthesis**: Combine information from different website sections
-         - **Temporal Awareness**: Note dates, timelines, and chronological information
-         - **Comparative Analysis**: Handle questions comparing different options or services
-         - **Requirements Matching**: Help users find services/products that match their needs
+            vector_store = load_shared_index(data_dir, embeddings, embedding_model)
+        except (FileNotFoundError, ValueError) as e:
+            print(f"Shared index unavailable, using an in-memory FAISS index: {e}")
+    # Vectors stored with the data (batch_ingest bundles, INDEX_MODE=mmap) are reused instead of re-embedding
+    if vector_store is not None:
+        stored_vectors = vector_store.vectors
+    else:
+        stored_vectors = load_index_vectors(data_dir, embedding_model)
+    if vector_store is None and not provenance:
+        if stored_vectors is not None:
+            vector_store = FAISS.from_embeddings(list(zip(docs, stored_vectors.tolist())), embeddings)
+        else:
+            vector_store = FAISS.from_texts(list(docs), embeddings)
 
-         ---
-
-         **Context**: {context}
-         **Chat History**: {chat_history}
-         **Question**: {question}
-
-         **Answer**:
-         """
-        CUSTOM_QUESTION_PROMPT = PromptTemplate.from_template(custom_prompt_template)
+    if provenance:
+        retriever = build_hierarchical_retriever(docs, provenance, embeddings, stored_vectors, k=50, fetch_k=100,
+                                                 section_k=HIER_SECTION_K, expand=HIER_EXPAND)
+    else:
+        retriever = vector_store.as_retriever(search_type="mmr", search_kwargs={"k": 50, "fetch_k": 100})
+    if RERANK:
+        retriever = build_reranking_retriever(retriever, top_n=RERANK_TOP_N, min_score=RERANK_MIN_SCORE)
+    entity_index = load_entity_index(data_dir, docs) if ENTITY_INDEX else None
+    if entity_index:
+        retriever = EntityPinnedRetriever(retriever=retriever, index=entity_index, chunks=docs)
+    return {
+        "retriever": retriever,
+        "query_embeddings": embeddings,
+        "embedding_provider": embedding_provider,
+        "entities": entity_index,
+        # Sentence scoring must not depend on Gemini, so only the local model is used for it
+        "extractive": ExtractiveAnswerer(
+            embed_fn=embeddings.embed_documents if embedding_provider.startswith("Local") else None)
+    }
 
-        qa_chain = ConversationalRetrievalChain.from_llm(
-            llm=ChatGoogleGenerativeAI(
+@st.cache_resource(max_entries=ENGINE_CACHE_SITES * len(API_KEYS))
+def get_chain(selected_model, site, _docs, prompt_mode=PROMPT_MODE, key_index=0):
+    """
+    One QA engine per site and API key, shared by every session. It holds no
+    conversation memory; each session passes its own chat_history on every call.
+    Only the LLM clients depend on the key; the retriever comes from get_retrieval.
+    """
+    docs = _docs
+    if not docs:
+        return None
+    try:
+        retrieval = get_retrieval(site, docs)
+        api_key = API_KEYS[key_index]
+
+        cached_content = create_prompt_cache(selected_model, api_key, prompt_mode) if PROMPT_CACHE else None
+        prompt_template = get_prompt_template(prompt_mode, cached_prefix=cached_content is not None)
+        CUSTOM_QUESTION_PROMPT = PromptTemplate.from_template(prompt_template)
+
+        llm_kwargs = {"cached_content": cached_content} if cached_content else {}
+        if GEMINI_API_ENDPOINT:
+            llm_kwargs.update(transport="rest", client_options={"api_endpoint": GEMINI_API_ENDPOINT})
+        # One client per key, current key first; a prompt cache belongs to one key, so then hedges reuse it
+        keys = API_KEYS[key_index:] + API_KEYS[:key_index]
+        if cached_content:
+            keys = [api_key, api_key]
+        hedged_llm = HedgedChatModel(
+            llms=[ChatGoogleGenerativeAI(
                 model=selected_model,
-                google_api_key=GOOGLE_API_KEY,
+                google_api_key=key,
                 temperature=0.0,
                 max_tokens=300,
-                max_retries=1
-            ),
-            retriever=retriever,
-            memory=memory,
+                max_retries=1,
+                **llm_kwargs
+            ) for key in keys],
+            timeout_s=LLM_TIMEOUT,
+            hedge_percentile=HEDGE_PERCENTILE,
+            max_attempts=2 if HEDGE else 1
+        )
+        llm = hedged_llm
+        if SINGLE_FLIGHT:
+            # Keyed by the snapshot too, so prompts over different data never share an answer
+            llm = SingleFlightChatModel(llm=hedged_llm, namespace=site)
+        qa_chain = ConversationalRetrievalChain.from_llm(
+            llm=llm,
+            retriever=retrieval["retriever"],
+            return_source_documents=True,
             combine_docs_chain_kwargs={"prompt": CUSTOM_QUESTION_PROMPT}
         )
+        qa_chain.metadata = {
+            "prompt_template": prompt_template,
+            "query_embeddings": retrieval["query_embeddings"],
+            "embedding_provider": retrieval["embedding_provider"],
+            "entities": retrieval["entities"],
+            "llm": hedged_llm,
+            "extractive": retrieval["extractive"]
+        }
+
+        if CONDENSE_MODE == "fast":
+            # Only the local model is cheap enough to embed questions for routing
+            local = retrieval["embedding_provider"].startswith("Local")
+            enable_fast_path(qa_chain, embed_fn=retrieval["query_embeddings"].embed_query if local else None)
 
-        st.session_state.embedding_provider = embedding_provider
         return qa_chain
     except Exception as e:
         st.error(f"Failed to initialize the chatbot: {str(e)}")
         return None
 
+@st.cache_resource
+def get_served_site():
+    """The snapshot this process last served, shared by its sessions"""
+    return {"site": None, "lock": threading.Lock()}
+
+def evict_old_engines(site):
+    """
+    Drop every cached engine once this process sees a new snapshot. Only the process
+    that published it cleared its caches; the others notice here, on their next query.
+    """
+    served = get_served_site()
+    with served["lock"]:
+        previous, served["site"] = served["site"], site
+    if previous is not None and previous != site:
+        get_docs.clear()
+        get_retrieval.clear()
+        get_chain.clear()
+
+def get_qa_engine(site=None):
+    """The shared engine for a snapshot, by default the current one (None until something is processed)"""
+    site = site or site_key()
+    if site is None:
+        return None
+    evict_old_engines(site)
+    # Building the engine reads the snapshot, so it is pinned from the first read until the engine exists
+    with get_snapshot_store().pin(site_dir(site)):
+        docs = get_docs(site_dir(site))
+        return get_chain("gemini-1.5-flash", site, docs, key_index=st.session_state.current_key_index) if docs else None
+
+def answer_extractively(qa_chain, question):
+    """The best sentences of the retrieved chunks; no Gemini call"""
+    start = time.perf_counter()
+    result = qa_chain.metadata["extractive"].answer(question, qa_chain.retriever.invoke(question))
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Extractive answer in %.0f ms: %s", (time.perf_counter() - start) * 1000,
+                     qa_chain.metadata["extractive"].stats())
+    return result
+
+def is_quota_error(error):
+    error_str = str(error).lower()
+    return "rate limit" in error_str or "quota" in error_str or "resource exhausted" in error_str
+
 # -------------------------------
 # User Input Handling
 # -------------------------------
@@ -294,7 +460,7 @@ def handle_user_query(user_input, retry_count=0):
     # Clear chat history if user inputs "clear"
     if user_input.strip().lower() == "clear":
         st.session_state.chat_history = []
-        st.session_state["messages"] = [{"role": "bot", "text": "👋 Hi! Enter `new + url` to start."}]
+        reset_messages([{"role": "bot", "text": "👋 Hi! Enter `new + url` to start."}])
         add_message("bot", "Chat history cleared.")
         return
 
@@ -311,30 +477,99 @@ def handle_user_query(user_input, retry_count=0):
             add_message("bot", "⚠️ Please provide a valid URL starting with http:// or https://")
         return
 
+    # Switch to a prebuilt bundle if user inputs "load + name"
+    if user_input.lower().startswith("load"):
+        name = user_input[5:].strip().lstrip("+").strip()
+        if re.fullmatch(r"[\w.-]+", name):
+            st.session_state.loading_bundle = name
+        else:
+            add_message("bot", "⚠️ Please provide a bundle name, e.g. `load + example.com`")
+        return
+
     # If data not processed yet
     if not st.session_state.processed:
         add_message("bot", "Please scrape a website first by typing 'new + URL'")
         return
 
-    # Query the QA chain
+    # "quick + question" answers from the retrieved text directly, in milliseconds
+    question = user_input
+    extractive = ANSWER_MODE == "extractive"
+    quick = re.match(r"quick\s*\+\s*(.+)", user_input.strip(), re.IGNORECASE | re.DOTALL)
+    if quick:
+        question = quick.group(1)
+        extractive = True
+
+    # Query the shared QA engine with this session's history
     try:
-        result = st.session_state.qa_chain.invoke({
-            "question": user_input,
-            "chat_history": st.session_state.chat_history
-        })
+        site = site_key()
+        qa_chain = get_qa_engine(site)
+        if qa_chain is None:
+            add_message("bot", "⚠️ The chatbot isn't ready yet. Please scrape a website again with 'new + URL'")
+            return
+        # Exact lookups ("what's your email?") come straight from the entity index; follow-ups need the chain
+        entity_index = qa_chain.metadata["entities"]
+        if entity_index and not needs_condensing(question, format_history(st.session_state.chat_history)):
+            hit = entity_index.answer(question)
+            if hit:
+                logger.debug("Entity index answer (%s) from chunks %s", ", ".join(hit["kinds"]), hit["chunks"])
+                add_message("bot", hit["answer"])
+                add_turn(question, hit["answer"])
+                return
+
+        if extractive:
+            with get_snapshot_store().pin(site_dir(site)):
+                answer = answer_extractively(qa_chain, question)["answer"]
+            add_message("bot", answer)
+            add_turn(question, answer)
+            return
+
+        usage_callback = TokenUsageCallback()
+        # The snapshot this engine reads stays on disk until the answer is done, even if a new one is published
+        with get_snapshot_store().pin(site_dir(site)):
+            result = qa_chain.invoke({
+                "question": user_input,
+                "chat_history": st.session_state.chat_history
+            }, config={"callbacks": [usage_callback]})
         answer = result.get("answer", "I couldn't generate a response.")
+
+        usage = build_usage_record(
+            qa_chain.metadata["prompt_template"],
+            user_input,
+            result.get("source_documents", []),
+            st.session_state.chat_history,
+            answer,
+            usage_callback
+        )
+        st.session_state.token_usage.append(usage)
+        # The stats calls take locks shared with other sessions, so they only run when someone is listening
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Token usage: %s", usage)
+            logger.debug("Query embedding cache: %s", qa_chain.metadata["query_embeddings"].stats())
+            if SINGLE_FLIGHT:
+                logger.debug("LLM single-flight: %s", shared_single_flight().stats())
+            logger.debug("LLM calls: %s", qa_chain.metadata["llm"].stats())
         if retry_count == 0:
             add_message("bot", answer)
         else:
             add_message("bot", f"Switched to new API key. {answer}")
-        st.session_state.chat_history.append((user_input, answer))
+        add_turn(user_input, answer)
         update_env_with_current_key()  # Update .env with working key
     except Exception as e:
-        error_str = str(e).lower()
-        if ("rate limit" in error_str or "quota" in error_str or "resource exhausted" in error_str) and retry_count < len(API_KEYS) - 1:
+        if is_quota_error(e) and retry_count < len(API_KEYS) - 1:
             print("api key rate finished")
             switch_key()
             handle_user_query(user_input, retry_count + 1)
+        elif is_quota_error(e) and EXTRACTIVE_FALLBACK:
+            # Every key is exhausted: quote the most relevant passages rather than fail
+            try:
+                site = site_key()
+                with get_snapshot_store().pin(site_dir(site)):
+                    answer = answer_extractively(get_qa_engine(site), question)["answer"]
+            except Exception as fallback_error:
+                add_message("bot", f"⚠️ Error generating response: {str(e)} ({fallback_error})")
+            else:
+                add_message("bot", f"⚠️ All API keys are rate-limited, so here are the most relevant passages:\n\n{answer}")
+                add_turn(question, answer)
         else:
             add_message("bot", f"⚠️ Error generating response: {str(e)}")
 
@@ -343,41 +578,51 @@ def handle_user_query(user_input, retry_count=0):
 # -------------------------------
 if st.session_state.scraping and st.session_state.scraping_url:
     url = st.session_state.scraping_url
-    delete_existing_data()
-    scraper = WebsiteScraper()
-    chunks = scraper.scrape_to_chunks(url, lambda p,s: None, lambda: False)
-
-    processed_dir = Path("../processed_data")
-    processed_dir.mkdir(exist_ok=True)
-    metadata = {
-        "processing_date": datetime.now().isoformat(),
-        "source_url": url,
-        "total_chunks": len(chunks),
-        "total_characters": sum(len(c) for c in chunks)
-    }
-
-    with open(processed_dir / "chunks.json", 'w', encoding='utf-8') as f:
-        json.dump({"chunks": chunks, "metadata": metadata}, f, indent=2, ensure_ascii=False)
-    with open(processed_dir / "chunks.pkl", 'wb') as f:
-        pickle.dump({"chunks": chunks, "metadata": metadata}, f)
-
-    st.cache_data.clear()
-    st.cache_resource.clear()
-    st.session_state.processed = True
-    st.session_state.current_url = url
     st.session_state.scraping = False
-    # Clear previous company history when new URL is entered
-    st.session_state.chat_history = []
-    st.session_state["messages"] = []
-    add_message("bot", f"✅ Successfully scraped and processed {url}. You can now ask questions!")
+    clear_pdf_dir()
+    try:
+        source = WebSource(url, max_pages=CRAWL_MAX_PAGES, cache_path=CRAWL_CACHE, large_crawl=LARGE_CRAWL)
+        # Chunks stream into a new snapshot beside the current data, which is swapped in once it validates;
+        # other sessions keep answering meanwhile
+        with get_snapshot_store().build() as snapshot_dir:
+            IngestEngine([source], filter_chunks=CHUNK_FILTER).run(ChunkStore(str(snapshot_dir)))
+            if INDEX_MODE == "mmap":
+                # Replicas only ever open the index, so it is built here, before the snapshot is published
+                embeddings, embedding_model, _ = get_embeddings()
+                build_shared_index(str(snapshot_dir), embeddings, embedding_model)
+    except Exception as e:
+        add_message("bot", f"⚠️ Could not process {url}: {e}. The previous data is still in use.")
+    else:
+        # The next get_qa_engine() sees the new snapshot and evicts the old engines
+        st.session_state.processed = True
+        st.session_state.current_url = url
+        # Clear previous company history when new URL is entered
+        st.session_state.chat_history = []
+        reset_messages([])
+        add_message("bot", f"✅ Successfully scraped and processed {url}. You can now ask questions!")
+    save_session()
+    st.rerun()
+
+if st.session_state.loading_bundle:
+    name = st.session_state.loading_bundle
+    st.session_state.loading_bundle = None
+    try:
+        with get_snapshot_store().build() as snapshot_dir:
+            bundle = install_bundle(name, str(snapshot_dir), BUNDLE_DIR)
+        st.session_state.processed = True
+        st.session_state.current_url = next((s["name"] for s in bundle["sources"] if s["type"] == "web"), name)
+        st.session_state.chat_history = []
+        reset_messages([])
+        add_message("bot", f"✅ Loaded bundle {name} ({bundle['chunks']} chunks). You can now ask questions!")
+    except FileNotFoundError as e:
+        add_message("bot", f"⚠️ {e}")
+    save_session()
     st.rerun()
 
 # -------------------------------
 # Load docs and initialize QA chain
 # -------------------------------
-docs = get_docs()
-if docs:
-    st.session_state.qa_chain = get_chain("gemini-1.5-flash", docs)
+get_qa_engine()
 
 # -------------------------------
 # Professional Page UI
@@ -673,20 +918,14 @@ st.markdown("""
     </div>
 """, unsafe_allow_html=True)
 
-# Messages Area
-st.markdown('<div class="chat-messages" id="chat-messages">', unsafe_allow_html=True)
-
-for msg in st.session_state["messages"]:
-    role_class = "bot" if msg["role"] == "bot" else "user"
-    avatar_icon = "🤖" if msg["role"] == "bot" else "👤"
-    st.markdown(f"""
-        <div class="message {role_class}">
-            <div class="message-avatar">{avatar_icon}</div>
-            <div class="message-bubble">{msg['text']}</div>
-        </div>
-    """, unsafe_allow_html=True)
-
-st.markdown('</div>', unsafe_allow_html=True)
+# Messages Area - older pages are read from disk only when asked for
+pager = st.session_state.message_pager
+if pager.pages > st.session_state.older_pages_shown:
+    if st.button(f"⬆️ Show older messages ({pager.pages - st.session_state.older_pages_shown} pages)"):
+        st.session_state.older_pages_shown += 1
+        st.rerun()
+visible = pager.older(st.session_state.older_pages_shown) + st.session_state["messages"]
+st.markdown(render_messages_html(visible), unsafe_allow_html=True)
 
 with st.form(key="chat_form", clear_on_submit=True):
     st.markdown('<div class="input-row">', unsafe_allow_html=True)
@@ -704,6 +943,7 @@ with st.form(key="chat_form", clear_on_submit=True):
 
     if submitted and user_input:
         handle_user_query(user_input)
+        save_session()
         st.rerun()
 
 st.markdown('</div>', unsafe_allow_html=True)
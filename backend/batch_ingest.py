@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Batch Ingest for RAG Chatbot
+Headless ingestion of many sites and document folders into self-contained bundles the app can load without re-indexing
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlparse
+
+from chunk_store import ChunkStore
+from ingest import IngestEngine, IngestSource, LocalDocumentSource, PDFDirectorySource, WebSource
+from shared_index import build_shared_index
+
+BUNDLE_FILE = "bundle.json"
+DEFAULT_BUNDLE_DIR = "../bundles"
+DEFAULT_EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+DEFAULT_PARALLEL = 2
+
+
+def bundle_name(spec: Dict[str, Any]) -> str:
+    """Explicit name, or the host of the first URL / the folder name"""
+    if spec.get("name"):
+        return spec["name"]
+    first = (spec.get("sources") or [spec])[0]
+    if first.get("url"):
+        return urlparse(first["url"]).netloc.replace(":", "_")
+    return Path(first.get("path") or first.get("pdf_dir") or first.get("local_dir")).name
+
+
+def build_sources(spec: Dict[str, Any], defaults: Dict[str, Any], crawl_cache: Optional[str]) -> List[IngestSource]:
+    """
+    Sources of one bundle. A bundle lists "sources" ({"type": "web" | "pdf" | "local", ...})
+    or uses the shorthand keys "url", "pdf_dir" and "local_dir" directly.
+    """
+    entries = list(spec.get("sources", []))
+    if spec.get("url"):
+        entries.append({"type": "web", "url": spec["url"]})
+    if spec.get("pdf_dir"):
+        entries.append({"type": "pdf", "path": spec["pdf_dir"]})
+    if spec.get("local_dir"):
+        entries.append({"type": "local", "path": spec["local_dir"]})
+    if not entries:
+        raise ValueError(f"Bundle {spec.get('name')!r} has no sources")
+
+    sources = []
+    for entry in entries:
+        options = {**defaults, **spec, **entry}
+        if entry["type"] == "web":
+            sources.append(WebSource(entry["url"], max_pages=options.get("max_pages", 50) or None,
+                                     cache_path=crawl_cache, large_crawl=options.get("large_crawl", False)))
+        elif entry["type"] == "pdf":
+            sources.append(PDFDirectorySource(entry["path"]))
+        elif entry["type"] == "local":
+            sources.append(LocalDocumentSource(entry["path"]))
+        else:
+            raise ValueError(f"Unknown source type: {entry['type']}")
+    return sources
+
+
+def load_job_manifest(path: str) -> Dict[str, Any]:
+    """{"defaults": {...}, "bundles": [{...}, ...]}; a bare list is taken as the bundles"""
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if isinstance(data, list):
+        data = {"bundles": data}
+    names = [bundle_name(spec) for spec in data.get("bundles", [])]
+    duplicates = {name for name in names if names.count(name) > 1}
+    if duplicates:
+        raise ValueError(f"Duplicate bundle names: {', '.join(sorted(duplicates))}")
+    return data
+
+
+class BatchIngest:
+    """
+    Builds one bundle per manifest entry: the chunk store (chunks, provenance,
+    source manifest, mmap texts), the shared vector index and bundle.json with
+    build stats. `parallel` bundles are ingested at once and split the `workers`
+    budget between them; embedding runs one bundle at a time so the model is
+    never oversubscribed.
+    """
+
+    def __init__(self, output_dir: str = DEFAULT_BUNDLE_DIR, workers: Optional[int] = None,
+                 parallel: int = DEFAULT_PARALLEL, embeddings=None, model_name: str = DEFAULT_EMBEDDING_MODEL,
+                 crawl_cache: Optional[str] = None, filter_chunks: bool = True):
+        self.output_dir = Path(output_dir)
+        self.workers = workers or os.cpu_count() or 4
+        self.parallel = max(1, parallel)
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.crawl_cache = crawl_cache
+        self.filter_chunks = filter_chunks
+        self._embed_lock = threading.Lock()
+
+    def build(self, spec: Dict[str, Any], defaults: Dict[str, Any], workers: int) -> Dict[str, Any]:
+        name = bundle_name(spec)
+        final_dir = self.output_dir / name
+        tmp_dir = self.output_dir / f".{name}.tmp-{os.getpid()}"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        started = time.time()
+
+        sources = build_sources(spec, defaults, self.crawl_cache)
+        engine = IngestEngine(sources, max_workers=workers, filter_chunks=self.filter_chunks)
+        result = engine.run(ChunkStore(str(tmp_dir)))
+        if not result["metadata"]["total_chunks"]:
+            raise ValueError("No text could be extracted")
+        ingest_seconds = time.time() - started
+
+        index_seconds = None
+        if self.embeddings is not None:
+            with self._embed_lock:
+                index_started = time.time()
+                build_shared_index(str(tmp_dir), self.embeddings, self.model_name)
+                index_seconds = time.time() - index_started
+
+        metadata = result["metadata"]
+        stats = {
+            "name": name,
+            "created": datetime.now().isoformat(),
+            "sources": [source.describe() for source in sources],
+            "documents": sum(len(s["documents"]) for s in metadata["sources"]),
+            "chunks": metadata["total_chunks"],
+            "characters": metadata["total_characters"],
+            "chunk_filter": metadata.get("chunk_filter"),
+            "embedding_model": self.model_name if self.embeddings is not None else None,
+            "ingest_seconds": round(ingest_seconds, 2),
+            "index_seconds": round(index_seconds, 2) if index_seconds is not None else None
+        }
+        with open(tmp_dir / BUNDLE_FILE, 'w', encoding='utf-8') as f:
+            json.dump(stats, f, indent=2)
+
+        # Written beside the old bundle and swapped in, so readers never see a half-written one
+        old_dir = self.output_dir / f".{name}.old-{os.getpid()}"
+        if final_dir.exists():
+            os.rename(final_dir, old_dir)
+        os.rename(tmp_dir, final_dir)
+        shutil.rmtree(old_dir, ignore_errors=True)
+        print(f"[{name}] bundle written to {final_dir}: {stats['chunks']} chunks")
+        return stats
+
+    def _build_safely(self, spec: Dict[str, Any], defaults: Dict[str, Any], workers: int) -> Dict[str, Any]:
+        name = bundle_name(spec)
+        try:
+            return {"status": "ok", **self.build(spec, defaults, workers)}
+        except Exception as e:
+            print(f"[{name}] failed: {e}")
+            shutil.rmtree(self.output_dir / f".{name}.tmp-{os.getpid()}", ignore_errors=True)
+            return {"name": name, "status": "failed", "error": str(e)}
+
+    def run(self, manifest: Dict[str, Any], only: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Build every bundle (or only the named ones); one failure doesn't stop the rest"""
+        specs = [spec for spec in manifest.get("bundles", []) if not only or bundle_name(spec) in only]
+        defaults = manifest.get("defaults", {})
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        parallel = min(self.parallel, max(len(specs), 1))
+        workers = max(1, self.workers // parallel)
+        print(f"Building {len(specs)} bundles, {parallel} at a time with {workers} workers each")
+
+        with ThreadPoolExecutor(max_workers=parallel) as pool:
+            return list(pool.map(lambda spec: self._build_safely(spec, defaults, workers), specs))
+
+
+def list_bundles(root: str = DEFAULT_BUNDLE_DIR) -> List[Dict[str, Any]]:
+    bundles = []
+    for path in sorted(Path(root).glob(f"*/{BUNDLE_FILE}")):
+        with open(path, 'r', encoding='utf-8') as f:
+            bundles.append(json.load(f))
+    return bundles
+
+
+def install_bundle(name: str, processed_dir: str, root: str = DEFAULT_BUNDLE_DIR) -> Dict[str, Any]:
+    """Copy a bundle into a (new snapshot) directory; its index is reused as-is"""
+    bundle_dir = Path(root) / name
+    if not (bundle_dir / BUNDLE_FILE).exists():
+        raise FileNotFoundError(f"No bundle named {name!r} in {root}")
+    shutil.copytree(bundle_dir, processed_dir, dirs_exist_ok=True)
+    with open(bundle_dir / BUNDLE_FILE, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest sites and document folders into loadable bundles")
+    parser.add_argument("manifest", help="JSON job manifest listing the bundles to build")
+    parser.add_argument("--output", default=DEFAULT_BUNDLE_DIR, help="directory the bundles are written to")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="total ingest workers")
+    parser.add_argument("--parallel", type=int, default=DEFAULT_PARALLEL, help="bundles built at the same time")
+    parser.add_argument("--only", help="comma-separated bundle names to (re)build")
+    parser.add_argument("--embedding-model", default=DEFAULT_EMBEDDING_MODEL, help="model for the vector index")
+    parser.add_argument("--no-index", action="store_true", help="skip embedding; the app indexes on first load")
+    parser.add_argument("--crawl-cache", default="../crawl_cache.sqlite", help="crawl cache ('' to disable)")
+    parser.add_argument("--no-filter", action="store_true", help="keep every chunk (no quality filter)")
+    parser.add_argument("--report", help="write the per-bundle results as JSON to this file")
+    args = parser.parse_args()
+
+    embeddings = None
+    if not args.no_index:
+        from langchain_community.embeddings import HuggingFaceEmbeddings
+        embeddings = HuggingFaceEmbeddings(model_name=args.embedding_model)
+
+    batch = BatchIngest(args.output, args.workers, args.parallel, embeddings, args.embedding_model,
+                        args.crawl_cache or None, filter_chunks=not args.no_filter)
+    results = batch.run(load_job_manifest(args.manifest), args.only.split(",") if args.only else None)
+
+    print("\nBundle                          Status   Chunks  Ingest s  Index s")
+    for row in results:
+        index_seconds = row.get("index_seconds")
+        print(f"{row['name'][:30]:<31} {row['status']:<8} {row.get('chunks', '-'):>6}  "
+              f"{row.get('ingest_seconds', '-'):>8}  {'-' if index_seconds is None else index_seconds:>7}")
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults saved to {args.report}")
+    sys.exit(1 if any(row["status"] != "ok" for row in results) else 0)
+
+
+if __name__ == "__main__":
+    main()
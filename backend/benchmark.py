@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Retrieval Benchmark for RAG Chatbot
+Recall@k, MRR, retrieval latency and index memory per configuration, on a fixed local corpus (no LLM)
+"""
+
+import argparse
+import itertools
+import json
+import re
+import time
+from typing import List, Dict, Any, Tuple
+
+from chunker import TokenChunker, split_provenance
+from metrics import percentile
+
+PAGE_MARKER = re.compile(r"^--- Page: (.+) ---$", re.MULTILINE)
+
+
+def load_corpus(path: str) -> List[Tuple[str, str]]:
+    """
+    Rebuild (source, text) documents from a chunks.json file so they can be
+    re-chunked per configuration. Uses provenance when present, otherwise the
+    '--- Page: url ---' markers older scrapes left in the chunk text.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    chunks = data["chunks"]
+
+    if "provenance" in data:
+        documents: Dict[str, List[str]] = {}
+        for text, record in zip(chunks, data["provenance"]):
+            documents.setdefault(record["source"], []).append(text)
+        return [(source, "\n\n".join(texts)) for source, texts in documents.items()]
+
+    joined = "\n\n".join(chunks)
+    markers = list(PAGE_MARKER.finditer(joined))
+    if not markers:
+        return [(data["metadata"].get("source_url", path), joined)]
+    documents = []
+    for i, marker in enumerate(markers):
+        end = markers[i + 1].start() if i + 1 < len(markers) else len(joined)
+        documents.append((marker.group(1), joined[marker.end():end].strip()))
+    return documents
+
+
+def load_golden_set(path: str) -> List[Dict[str, Any]]:
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)["questions"]
+
+
+def is_relevant(text: str, snippets: List[str]) -> bool:
+    lowered = text.lower()
+    return any(snippet.lower() in lowered for snippet in snippets)
+
+
+def check_golden_set(documents: List[Tuple[str, str]], questions: List[Dict[str, Any]]):
+    """Fail fast when the corpus no longer contains a question's snippets (the two files must change together)"""
+    missing = [q["question"] for q in questions if not any(is_relevant(text, q["relevant"]) for _, text in documents)]
+    if missing:
+        raise ValueError(f"No snippet of these golden questions is in the corpus: {missing}")
+
+
+def score_retrieval(retrieved: List[str], snippets: List[str]) -> Tuple[float, float]:
+    """Return (recall, reciprocal rank) for one question"""
+    found = {s for s in snippets if any(s.lower() in text.lower() for text in retrieved)}
+    recall = len(found) / len(snippets) if snippets else 0.0
+    for rank, text in enumerate(retrieved, start=1):
+        if is_relevant(text, snippets):
+            return recall, 1.0 / rank
+    return recall, 0.0
+
+
+def index_memory_bytes(vector_store, chunks: List[str]) -> int:
+    """Flat FAISS vectors (float32) plus the stored chunk text"""
+    index = vector_store.index
+    return index.ntotal * index.d * 4 + sum(len(c.encode('utf-8')) for c in chunks)
+
+
+class RetrievalBenchmark:
+    def __init__(self, documents: List[Tuple[str, str]], questions: List[Dict[str, Any]], repeats: int = 3):
+        self.documents = documents
+        self.questions = questions
+        self.repeats = repeats
+        self._embeddings = {}
+        self._chunks: List[str] = []
+        self._provenance: List[Dict[str, Any]] = []
+        self._hierarchical = None
+
+    def embeddings(self, model_name: str):
+        if model_name not in self._embeddings:
+            from langchain_community.embeddings import HuggingFaceEmbeddings
+            self._embeddings[model_name] = HuggingFaceEmbeddings(model_name=model_name)
+        return self._embeddings[model_name]
+
+    def build_index(self, model_name: str, chunk_size: int, chunk_overlap: int):
+        from langchain_community.vectorstores import FAISS
+
+        chunker = TokenChunker(chunk_size, chunk_overlap)
+        records = [r for source, text in self.documents for r in chunker.chunk_text(text, source)]
+        chunks, provenance = split_provenance(records)
+        t0 = time.perf_counter()
+        vector_store = FAISS.from_texts(chunks, self.embeddings(model_name))
+        self._chunks, self._provenance, self._hierarchical = chunks, provenance, None
+        return vector_store, chunks, time.perf_counter() - t0
+
+    def hierarchical_index(self, vector_store):
+        """Two-level index over the same vectors as the flat index (built on first use)"""
+        if self._hierarchical is None:
+            from hierarchical import HierarchicalIndex
+            vectors = vector_store.index.reconstruct_n(0, vector_store.index.ntotal)
+            self._hierarchical = HierarchicalIndex(self._chunks, self._provenance, vectors)
+        return self._hierarchical
+
+    def search(self, vector_store, question: str, search_type: str, k: int) -> List[str]:
+        if search_type == "hierarchical":
+            from hierarchical import HierarchicalRetriever
+            retriever = HierarchicalRetriever(index=self.hierarchical_index(vector_store),
+                                              embeddings=vector_store.embeddings, k=k,
+                                              fetch_k=max(2 * k, 20), search_type="similarity")
+            docs = retriever.invoke(question)
+        elif search_type == "mmr":
+            docs = vector_store.max_marginal_relevance_search(question, k=k, fetch_k=max(2 * k, 20))
+        else:
+            docs = vector_store.similarity_search(question, k=k)
+        return [doc.page_content for doc in docs]
+
+    def run_config(self, vector_store, search_type: str, k: int) -> Dict[str, Any]:
+        recalls, reciprocal_ranks, latencies = [], [], []
+        for item in self.questions:
+            retrieved = []
+            for _ in range(self.repeats):
+                t0 = time.perf_counter()
+                retrieved = self.search(vector_store, item["question"], search_type, k)
+                latencies.append((time.perf_counter() - t0) * 1000)
+            recall, rr = score_retrieval(retrieved, item["relevant"])
+            recalls.append(recall)
+            reciprocal_ranks.append(rr)
+
+        return {
+            "recall@k": sum(recalls) / len(recalls),
+            "mrr": sum(reciprocal_ranks) / len(reciprocal_ranks),
+            "p50_ms": percentile(latencies, 50),
+            "p95_ms": percentile(latencies, 95)
+        }
+
+    def run(self, models: List[str], chunk_sizes: List[int], overlaps: List[int],
+            search_types: List[str], ks: List[int]) -> List[Dict[str, Any]]:
+        results = []
+        for model_name, chunk_size, overlap in itertools.product(models, chunk_sizes, overlaps):
+            if overlap >= chunk_size:
+                continue
+            vector_store, chunks, build_seconds = self.build_index(model_name, chunk_size, overlap)
+            # Warm up so the first measured query doesn't pay model/lazy-init cost
+            self.search(vector_store, self.questions[0]["question"], "similarity", 1)
+
+            for search_type, k in itertools.product(search_types, ks):
+                row = {
+                    "model": model_name,
+                    "chunk_size": chunk_size,
+                    "overlap": overlap,
+                    "search": search_type,
+                    "k": k,
+                    "chunks": len(chunks),
+                    "build_s": build_seconds,
+                    "index_mb": index_memory_bytes(vector_store, chunks) / 1e6
+                }
+                row.update(self.run_config(vector_store, search_type, k))
+                results.append(row)
+                print_row(row)
+        return results
+
+
+# (field, width, format spec)
+COLUMNS = [("chunk_size", 10, "d"), ("overlap", 7, "d"), ("search", 10, "s"), ("k", 3, "d"),
+           ("chunks", 6, "d"), ("recall@k", 8, ".3f"), ("mrr", 6, ".3f"),
+           ("p50_ms", 8, ".2f"), ("p95_ms", 8, ".2f"), ("index_mb", 8, ".3f")]
+
+
+def print_header():
+    print("  ".join(f"{name:>{width}}" for name, width, _ in COLUMNS))
+
+
+def print_row(row: Dict[str, Any]):
+    print("  ".join(f"{row[name]:>{width}{spec}}" for name, width, spec in COLUMNS))
+
+
+def parse_list(value: str, cast=int) -> List:
+    return [cast(v) for v in value.split(",") if v.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark retrieval quality and latency against a golden set")
+    parser.add_argument("--corpus", default="../benchmarks/corpus.json", help="chunks.json-style corpus file (default: the fixed benchmark fixture)")
+    parser.add_argument("--golden", default="../benchmarks/golden_set.json", help="golden question set")
+    parser.add_argument("--models", default="sentence-transformers/all-MiniLM-L6-v2", help="comma-separated embedding models")
+    parser.add_argument("--chunk-sizes", default="120,180,250", help="comma-separated chunk sizes in tokens")
+    parser.add_argument("--overlaps", default="25", help="comma-separated chunk overlaps in tokens")
+    parser.add_argument("--search", default="similarity,mmr", help="comma-separated search types (similarity, mmr, hierarchical)")
+    parser.add_argument("--k", default="3,5,10", help="comma-separated k values")
+    parser.add_argument("--repeats", type=int, default=3, help="timed repetitions per question")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    args = parser.parse_args()
+
+    documents = load_corpus(args.corpus)
+    questions = load_golden_set(args.golden)
+    check_golden_set(documents, questions)
+    print("Retrieval Benchmark")
+    print("=" * 50)
+    print(f"Corpus: {args.corpus} ({len(documents)} documents)")
+    print(f"Golden set: {args.golden} ({len(questions)} questions)\n")
+
+    benchmark = RetrievalBenchmark(documents, questions, args.repeats)
+    print_header()
+    results = benchmark.run(
+        parse_list(args.models, str),
+        parse_list(args.chunk_sizes),
+        parse_list(args.overlaps),
+        parse_list(args.search, str),
+        parse_list(args.k)
+    )
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Chat Store for RAG Chatbot
+Keeps a bounded window of messages in session state, pages older ones to disk and renders the window as one HTML block
+"""
+
+import json
+import os
+import shutil
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import List, Dict, Optional, Set
+
+DEFAULT_WINDOW = 50
+DEFAULT_PAGE_SIZE = 25
+DEFAULT_SESSIONS_DIR = "../chat_sessions"
+
+
+class MessagePager:
+    """
+    Per-session message archive. When the in-memory list grows past `window`,
+    its oldest `page_size` messages are written out as one page file.
+    """
+
+    def __init__(self, session_id: str, root: str = DEFAULT_SESSIONS_DIR,
+                 window: int = DEFAULT_WINDOW, page_size: int = DEFAULT_PAGE_SIZE):
+        self.dir = Path(root) / session_id
+        self.window = max(window, page_size)
+        self.page_size = page_size
+        # Pages written before a restart (the session store brings the rest of the session back)
+        self.pages = len(list(self.dir.glob("page-*.json"))) if self.dir.exists() else 0
+
+    def _page_path(self, index: int) -> Path:
+        return self.dir / f"page-{index:06d}.json"
+
+    def spill(self, messages: List[Dict[str, str]]):
+        """Move the oldest messages out of the list (in place) until it fits the window"""
+        while len(messages) > self.window:
+            self.dir.mkdir(parents=True, exist_ok=True)
+            with open(self._page_path(self.pages), 'w', encoding='utf-8') as f:
+                json.dump(messages[:self.page_size], f, ensure_ascii=False)
+            del messages[:self.page_size]
+            self.pages += 1
+
+    def load_page(self, index: int) -> List[Dict[str, str]]:
+        """Page 0 is the oldest"""
+        with open(self._page_path(index), 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def older(self, page_count: int) -> List[Dict[str, str]]:
+        """Messages of the newest `page_count` archived pages, oldest first"""
+        messages = []
+        for index in range(max(self.pages - page_count, 0), self.pages):
+            messages.extend(self.load_page(index))
+        return messages
+
+    def archived_count(self) -> int:
+        return self.pages * self.page_size
+
+    def clear(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+        self.pages = 0
+
+
+def prune_sessions(root: str = DEFAULT_SESSIONS_DIR, max_age_seconds: float = 7 * 24 * 3600,
+                   active: Optional[Set[str]] = None) -> int:
+    """
+    Delete archives of sessions not written to for max_age_seconds; returns how many
+    were removed. A directory's mtime only changes when a page spills, so sessions in
+    `active` (recently saved, per the session store) are always kept.
+    """
+    root_path = Path(root)
+    if not root_path.exists():
+        return 0
+    cutoff = time.time() - max_age_seconds
+    removed = 0
+    for session_dir in root_path.iterdir():
+        if active is not None and session_dir.name in active:
+            continue
+        if session_dir.is_dir() and os.path.getmtime(session_dir) < cutoff:
+            shutil.rmtree(session_dir, ignore_errors=True)
+            removed += 1
+    return removed
+
+
+@lru_cache(maxsize=4096)
+def message_html(role: str, text: str) -> str:
+    """HTML for one message bubble, built once per distinct message"""
+    role_class = "bot" if role == "bot" else "user"
+    avatar_icon = "🤖" if role == "bot" else "👤"
+    return (f'<div class="message {role_class}">'
+            f'<div class="message-avatar">{avatar_icon}</div>'
+            f'<div class="message-bubble">{text}</div>'
+            f'</div>')
+
+
+def render_messages_html(messages: List[Dict[str, str]]) -> str:
+    """The whole visible conversation as one block, so a rerun emits a single element"""
+    body = "".join(message_html(msg["role"], msg["text"]) for msg in messages)
+    return f'<div class="chat-messages" id="chat-messages">{body}</div>'
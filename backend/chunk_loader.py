@@ -6,13 +6,16 @@ Loads pre-processed chunks from disk for faster app startup
 
 import json
 import pickle
-from pathlib import Path
 from typing import List, Dict, Any, Optional
-from preprocess import PDFProcessor
+from snapshots import resolve_data_dir
+from chunk_stats import load_chunk_stats
+from chunk_store import MmapChunks, read_metadata, read_provenance
+from shared_index import INDEX_DIR, META_FILE, VECTORS_FILE
 
 class ChunkLoader:
     def __init__(self, processed_data_dir: str = "../processed_data"):
-        self.processed_data_dir = Path(processed_data_dir)
+        # A snapshot root resolves to its current version; any other directory is read as-is
+        self.processed_data_dir = resolve_data_dir(processed_data_dir)
 
     def load_chunks(self) -> Optional[List[str]]:
         """Load pre-processed chunks from disk"""
@@ -20,8 +23,11 @@ class ChunkLoader:
             pickle_file = self.processed_data_dir / "chunks.pkl"
             json_file = self.processed_data_dir / "chunks.json"
 
-           
-            if pickle_file.exists():
+            metadata = read_metadata(str(self.processed_data_dir))
+            if metadata is not None and MmapChunks.available(str(self.processed_data_dir)):
+                print("Loading chunks from the chunk store...")
+                data = {"chunks": list(MmapChunks(str(self.processed_data_dir))), "metadata": metadata}
+            elif pickle_file.exists():
                 print("Loading chunks from pickle file...")
                 with open(pickle_file, 'rb') as f:
                     data = pickle.load(f)
@@ -51,9 +57,44 @@ class ChunkLoader:
             print(f"Error loading chunks: {e}")
             return None
 
+    def load_provenance(self) -> Optional[List[Dict[str, Any]]]:
+        """Per-chunk provenance (source, offsets, pages), or None for data processed without it"""
+        try:
+            # Stored on its own, so reading it never loads the chunk texts
+            provenance = read_provenance(str(self.processed_data_dir))
+            if provenance is not None:
+                return provenance
+
+            pickle_file = self.processed_data_dir / "chunks.pkl"
+            json_file = self.processed_data_dir / "chunks.json"
+
+            if pickle_file.exists():
+                with open(pickle_file, 'rb') as f:
+                    data = pickle.load(f)
+            elif json_file.exists():
+                with open(json_file, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            else:
+                return None
+
+            return data.get('provenance')
+
+        except Exception as e:
+            print(f"Error loading provenance: {e}")
+            return None
+
     def get_chunk_stats(self) -> Optional[Dict[str, Any]]:
-        """Get statistics about the loaded chunks"""
+        """
+        Statistics about the processed chunks. Data written by ChunkStore carries them
+        precomputed in stats.json, so only that file (and the index metadata) is read;
+        older data falls back to loading every chunk.
+        """
         try:
+            stats = load_chunk_stats(str(self.processed_data_dir))
+            if stats is not None:
+                stats["embedding"] = self.get_embedding_stats()
+                return stats
+
             pickle_file = self.processed_data_dir / "chunks.pkl"
             json_file = self.processed_data_dir / "chunks.json"
 
@@ -86,14 +127,30 @@ class ChunkLoader:
             print(f"Error getting chunk stats: {e}")
             return None
 
-def load_processed_chunks() -> Optional[List[str]]:
+    def get_embedding_stats(self) -> Optional[Dict[str, Any]]:
+        """Model, dimensions and size of the stored vector index, or None if there is none"""
+        index_dir = self.processed_data_dir / INDEX_DIR
+        if not (index_dir / META_FILE).exists():
+            return None
+        with open(index_dir / META_FILE, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        vectors_file = index_dir / VECTORS_FILE
+        return {"model": meta["model"], "vectors": meta["count"], "dimensions": meta["dim"],
+                "bytes": vectors_file.stat().st_size if vectors_file.exists() else meta["count"] * meta["dim"] * 4}
+
+def load_processed_chunks(processed_data_dir: str = "../processed_data") -> Optional[List[str]]:
     """Convenience function to load chunks"""
-    loader = ChunkLoader()
+    loader = ChunkLoader(processed_data_dir)
     return loader.load_chunks()
 
-def get_chunk_statistics() -> Optional[Dict[str, Any]]:
+def load_chunk_provenance(processed_data_dir: str = "../processed_data") -> Optional[List[Dict[str, Any]]]:
+    """Convenience function to load chunk provenance"""
+    loader = ChunkLoader(processed_data_dir)
+    return loader.load_provenance()
+
+def get_chunk_statistics(processed_data_dir: str = "../processed_data") -> Optional[Dict[str, Any]]:
     """Convenience function to get chunk statistics"""
-    loader = ChunkLoader()
+    loader = ChunkLoader(processed_data_dir)
     return loader.get_chunk_stats()
 
 if __name__ == "__main__":
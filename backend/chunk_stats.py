@@ -0,0 +1,128 @@
+"""
+Chunk Statistics for RAG Chatbot
+Corpus statistics computed once at ingest and stored beside the chunks, so stats queries never read chunk data
+"""
+
+import json
+from array import array
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from chunker import count_tokens
+
+STATS_FILE = "stats.json"
+STATS_VERSION = 1
+# Upper bounds (characters) of the length histogram buckets; the last bucket is open-ended
+LENGTH_BUCKETS = [100, 250, 500, 750, 1000, 1500, 2000]
+TOP_SOURCES = 50
+
+
+def length_histogram(lengths: Sequence[int]) -> Dict[str, int]:
+    labels = [f"{low}-{high - 1}" for low, high in zip([0] + LENGTH_BUCKETS, LENGTH_BUCKETS)]
+    labels.append(f"{LENGTH_BUCKETS[-1]}+")
+    counts = np.bincount(np.searchsorted(LENGTH_BUCKETS, np.asarray(lengths, dtype=np.int64), side='right'),
+                         minlength=len(labels))
+    return {label: int(counts[i]) for i, label in enumerate(labels)}
+
+
+def metadata_sources(metadata: Dict[str, Any], chunk_count: int, characters: int) -> Dict[str, Dict[str, int]]:
+    """Chunks and characters per source from the ingest metadata, for data stored without provenance"""
+    sources: Dict[str, Dict[str, int]] = {}
+    if metadata.get("sources"):
+        for source in metadata["sources"]:
+            for document in source["documents"]:
+                sources[document["source"]] = {"chunks": document["chunks"], "characters": document["characters"]}
+    elif metadata.get("source_url"):
+        sources[metadata["source_url"]] = {"chunks": chunk_count, "characters": characters}
+    return sources
+
+
+class ChunkStatsBuilder:
+    """
+    Collects the stats one chunk at a time while the store is written. Per chunk it
+    keeps a length, a token count and a text hash (for duplicates), never the text.
+    """
+
+    def __init__(self):
+        self.lengths = array('q')
+        self.tokens = array('q')
+        self.hashes = array('q')
+        self.sources: Dict[str, Dict[str, int]] = {}
+        self.has_provenance = True
+
+    def add(self, text: str, record: Optional[Dict[str, Any]] = None):
+        self.lengths.append(len(text))
+        # The chunker already counted tokens; only chunks without provenance are counted again
+        self.tokens.append(record["tokens"] if record and "tokens" in record else count_tokens(text))
+        # Python's string hash is stable within a process, which is all duplicate counting needs
+        self.hashes.append(hash(text))
+        if record is None:
+            self.has_provenance = False
+            return
+        entry = self.sources.setdefault(record["source"], {"chunks": 0, "characters": 0})
+        entry["chunks"] += 1
+        entry["characters"] += len(text)
+
+    def result(self, metadata: Dict[str, Any]) -> Dict[str, Any]:
+        lengths = np.frombuffer(self.lengths, dtype=np.int64)
+        tokens = np.frombuffer(self.tokens, dtype=np.int64)
+        count = len(lengths)
+        # Identical chunks (a footer repeated on every page)
+        duplicates = count - len(np.unique(np.frombuffer(self.hashes, dtype=np.int64))) if count else 0
+        if self.has_provenance and count:
+            sources = self.sources
+        else:
+            sources = metadata_sources(metadata, count, int(lengths.sum()))
+        top = sorted(sources.items(), key=lambda item: -item[1]["chunks"])[:TOP_SOURCES]
+
+        stats = {
+            "version": STATS_VERSION,
+            "total_chunks": count,
+            "total_characters": metadata.get("total_characters", int(lengths.sum())),
+            "processing_date": metadata.get("processing_date"),
+            "avg_chunk_length": float(lengths.mean()) if count else 0,
+            "min_chunk_length": int(lengths.min()) if count else 0,
+            "median_chunk_length": float(np.median(lengths)) if count else 0,
+            "max_chunk_length": int(lengths.max()) if count else 0,
+            "length_histogram": length_histogram(lengths),
+            "total_tokens": int(tokens.sum()),
+            "avg_chunk_tokens": float(tokens.mean()) if count else 0,
+            "max_chunk_tokens": int(tokens.max()) if count else 0,
+            "duplicate_chunks": duplicates,
+            "duplicate_ratio": round(duplicates / count, 4) if count else 0.0,
+            "total_sources": len(sources),
+            "top_sources": [{"source": source, **counts} for source, counts in top]
+        }
+        # Keys the old stats carried
+        if "source_url" in metadata:
+            stats["source_url"] = metadata["source_url"]
+        elif "pdf_files" in metadata:
+            stats["pdf_files"] = len(metadata["pdf_files"])
+        return stats
+
+
+def compute_chunk_stats(chunks: Sequence[str], metadata: Dict[str, Any],
+                        provenance: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+    builder = ChunkStatsBuilder()
+    for i, chunk in enumerate(chunks):
+        builder.add(chunk, provenance[i] if provenance else None)
+    return builder.result(metadata)
+
+
+def save_chunk_stats(output_dir: str, stats: Dict[str, Any]) -> Path:
+    path = Path(output_dir) / STATS_FILE
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(stats, f, indent=2, ensure_ascii=False)
+    return path
+
+
+def load_chunk_stats(output_dir: str) -> Optional[Dict[str, Any]]:
+    """The stored stats, or None for data processed before they were stored"""
+    path = Path(output_dir) / STATS_FILE
+    if not path.exists():
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        stats = json.load(f)
+    return stats if stats.get("version") == STATS_VERSION else None
@@ -0,0 +1,304 @@
+"""
+Chunk Store for RAG Chatbot
+Single place where processed chunks, provenance, metadata and the source manifest are written to disk, one chunk at a time
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import sys
+from array import array
+from contextlib import contextmanager
+from functools import lru_cache
+from pathlib import Path
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Sequence
+from manifest import SourceManifest, file_sha256
+from entities import EntityIndex
+from chunk_stats import ChunkStatsBuilder, save_chunk_stats
+
+TEXTS_FILE = "chunk_texts.bin"
+OFFSETS_FILE = "chunk_offsets.bin"
+PROVENANCE_FILE = "provenance.jsonl"
+METADATA_FILE = "metadata.json"
+# Older layouts; still read, and chunks.json is still written on request
+PICKLE_FILE = "chunks.pkl"
+JSON_FILE = "chunks.json"
+# Metadata key holding the content hash of the chunk texts and boundaries
+CHUNKS_HASH_KEY = "chunks_sha256"
+
+
+def chunks_hash(texts_sha256: str, offsets: array) -> str:
+    """Content hash of a chunk store: the sha256 of its text blob plus its little-endian offsets"""
+    return hashlib.sha256(bytes.fromhex(texts_sha256) + offsets.tobytes()).hexdigest()
+
+
+def write_chunk_texts(chunks: Sequence[str], output_dir: Path) -> str:
+    """
+    Write chunks as one UTF-8 blob plus int64 byte offsets, the layout MmapChunks
+    maps read-only. Files are written under temporary names and renamed into place.
+    Returns the content hash.
+    """
+    offsets = array('q', [0])
+    texts_sha256 = hashlib.sha256()
+    tmp_texts = output_dir / f"{TEXTS_FILE}.tmp"
+    with open(tmp_texts, 'wb') as f:
+        for chunk in chunks:
+            data = chunk.encode('utf-8')
+            f.write(data)
+            texts_sha256.update(data)
+            offsets.append(offsets[-1] + len(data))
+    if sys.byteorder != "little":
+        offsets.byteswap()
+    tmp_offsets = output_dir / f"{OFFSETS_FILE}.tmp"
+    with open(tmp_offsets, 'wb') as f:
+        offsets.tofile(f)
+    os.replace(tmp_texts, output_dir / TEXTS_FILE)
+    os.replace(tmp_offsets, output_dir / OFFSETS_FILE)
+    return chunks_hash(texts_sha256.hexdigest(), offsets)
+
+
+def read_provenance(output_dir: str = "../processed_data") -> Optional[List[Dict[str, Any]]]:
+    """The stored provenance, or None if this data has no provenance file"""
+    path = Path(output_dir) / PROVENANCE_FILE
+    if not path.exists():
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+class MmapChunks(Sequence):
+    """
+    Read-only list of chunk strings backed by mmap. Every process that opens the same
+    files shares their physical pages; only the chunks actually read get decoded.
+    """
+
+    def __init__(self, output_dir: str = "../processed_data"):
+        self.output_dir = Path(output_dir)
+        with open(self.output_dir / TEXTS_FILE, 'rb') as f:
+            # mmap can't map an empty file
+            self._texts = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if os.fstat(f.fileno()).st_size else b""
+        with open(self.output_dir / OFFSETS_FILE, 'rb') as f:
+            self._offsets_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._offsets = memoryview(self._offsets_map).cast('q')
+        self._fingerprint = (os.path.getmtime(self.output_dir / OFFSETS_FILE), len(self._offsets))
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("chunk index out of range")
+        return self._texts[self._offsets[index]:self._offsets[index + 1]].decode('utf-8')
+
+    def __reduce__(self):
+        # Pickles (and Streamlit cache keys) as the directory, not the text
+        return (MmapChunks, (str(self.output_dir),), {"fingerprint": self._fingerprint})
+
+    def __setstate__(self, state):
+        # Already reopened from disk; the fingerprint only tells rebuilt stores apart
+        pass
+
+    @staticmethod
+    def available(output_dir: str = "../processed_data") -> bool:
+        return (Path(output_dir) / TEXTS_FILE).exists() and (Path(output_dir) / OFFSETS_FILE).exists()
+
+class ChunkWriter:
+    """
+    Writes a chunk store one chunk at a time. Text goes straight to the mmap blob and
+    provenance to provenance.jsonl; the entity index and stats are built as chunks
+    arrive. Memory holds offsets, per-chunk counters and the index, never chunk text.
+    Nothing is visible under the final file names until close().
+    """
+
+    def __init__(self, output_dir: Path, provenance: bool = True, write_json: bool = False,
+                 previous_manifest: Optional[SourceManifest] = None):
+        self.output_dir = output_dir
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.write_json = write_json
+        self.previous_manifest = previous_manifest
+        self.offsets = array('q', [0])
+        self.entities = EntityIndex(str(output_dir))
+        self.stats = ChunkStatsBuilder()
+        self._texts_sha256 = hashlib.sha256()
+        self._texts = open(output_dir / f"{TEXTS_FILE}.tmp", 'wb')
+        self._provenance = open(output_dir / f"{PROVENANCE_FILE}.tmp", 'w', encoding='utf-8') if provenance else None
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def add(self, text: str, record: Optional[Dict[str, Any]] = None) -> int:
+        """Append one chunk (and its provenance, without the text); returns its chunk ID"""
+        chunk_id = len(self)
+        data = text.encode('utf-8')
+        self._texts.write(data)
+        self._texts_sha256.update(data)
+        self.offsets.append(self.offsets[-1] + len(data))
+        if self._provenance is not None:
+            record = {k: v for k, v in record.items() if k != "text"}
+            self._provenance.write(json.dumps(record, ensure_ascii=False) + "\n")
+        # Contacts, people and prices, keyed for lookups that shouldn't need retrieval
+        self.entities.add(chunk_id, text, record["source"] if record else None)
+        self.stats.add(text, record)
+        return chunk_id
+
+    def add_records(self, records: Iterable[Dict[str, Any]]):
+        for record in records:
+            self.add(record["text"], record)
+
+    def abort(self):
+        for f in (self._texts, self._provenance):
+            if f is not None:
+                f.close()
+                Path(f.name).unlink(missing_ok=True)
+
+    def close(self, metadata: Dict[str, Any]):
+        self._texts.close()
+        offsets = array('q', self.offsets)
+        if sys.byteorder != "little":
+            offsets.byteswap()
+        with open(self.output_dir / f"{OFFSETS_FILE}.tmp", 'wb') as f:
+            offsets.tofile(f)
+        os.replace(self.output_dir / f"{TEXTS_FILE}.tmp", self.output_dir / TEXTS_FILE)
+        os.replace(self.output_dir / f"{OFFSETS_FILE}.tmp", self.output_dir / OFFSETS_FILE)
+        # Recorded with the data, so an index can be matched to these exact chunks without rehashing them
+        metadata[CHUNKS_HASH_KEY] = chunks_hash(self._texts_sha256.hexdigest(), offsets)
+        provenance_file = self.output_dir / PROVENANCE_FILE
+        if self._provenance is not None:
+            self._provenance.close()
+            os.replace(self.output_dir / f"{PROVENANCE_FILE}.tmp", provenance_file)
+        elif provenance_file.exists():
+            provenance_file.unlink()
+
+        metadata_file = self.output_dir / METADATA_FILE
+        with open(metadata_file, 'w', encoding='utf-8') as f:
+            json.dump(metadata, f, indent=2, ensure_ascii=False)
+
+        manifest = SourceManifest(str(self.output_dir))
+        if "sources" in metadata:
+            manifest.build(metadata, self.previous_manifest).save()
+        elif manifest.exists():
+            manifest.path.unlink()
+
+        self.entities.save()
+        # Computed once here so stats queries read one small file instead of every chunk
+        stats_file = save_chunk_stats(str(self.output_dir), self.stats.result(metadata))
+
+        json_file = self.output_dir / JSON_FILE
+        if self.write_json:
+            write_chunks_json(self.output_dir, metadata)
+        elif json_file.exists():
+            json_file.unlink()
+
+        print(f"{len(self)} chunks saved to {self.output_dir}:")
+        print(f"   Texts: {TEXTS_FILE}, {OFFSETS_FILE}")
+        if self._provenance is not None:
+            print(f"   Provenance: {provenance_file.name}")
+        print(f"   Metadata: {metadata_file.name}")
+        if self.write_json:
+            print(f"   JSON: {json_file.name}")
+        if manifest.exists():
+            print(f"   Manifest: {manifest.path.name}")
+        print(f"   Entities: {self.entities.path.name} {self.entities.counts()}")
+        print(f"   Stats: {stats_file.name}")
+
+
+def write_chunks_json(output_dir: Path, metadata: Dict[str, Any]):
+    """
+    chunks.json in the old {"chunks", "metadata", "provenance"} shape, for reading and
+    debugging. Written one chunk at a time from the finished store.
+    """
+    chunks = MmapChunks(str(output_dir))
+    with open(output_dir / f"{JSON_FILE}.tmp", 'w', encoding='utf-8') as f:
+        f.write('{\n  "metadata": ' + json.dumps(metadata, ensure_ascii=False) + ',\n  "chunks": [')
+        for i, chunk in enumerate(chunks):
+            f.write(("," if i else "") + "\n    " + json.dumps(chunk, ensure_ascii=False))
+        f.write("\n  ]")
+        provenance_file = output_dir / PROVENANCE_FILE
+        if provenance_file.exists():
+            f.write(',\n  "provenance": [')
+            with open(provenance_file, 'r', encoding='utf-8') as records:
+                for i, line in enumerate(records):
+                    f.write(("," if i else "") + "\n    " + line.rstrip("\n"))
+            f.write("\n  ]")
+        f.write("\n}\n")
+    del chunks
+    os.replace(output_dir / f"{JSON_FILE}.tmp", output_dir / JSON_FILE)
+
+
+def read_metadata(output_dir: str = "../processed_data") -> Optional[Dict[str, Any]]:
+    """The ingest metadata of a chunk store, or None for data in the old chunks.pkl / chunks.json layout"""
+    path = Path(output_dir) / METADATA_FILE
+    if not path.exists():
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def stored_chunks_hash(output_dir: str = "../processed_data") -> str:
+    """The content hash recorded in metadata.json, or computed from the files for data written without one"""
+    metadata = read_metadata(output_dir)
+    if metadata and metadata.get(CHUNKS_HASH_KEY):
+        return metadata[CHUNKS_HASH_KEY]
+    stat = (Path(output_dir) / TEXTS_FILE).stat()
+    return _hash_chunk_files(str(Path(output_dir).resolve()), stat.st_size, stat.st_mtime_ns)
+
+
+@lru_cache(maxsize=32)
+def _hash_chunk_files(output_dir: str, size: int, mtime_ns: int) -> str:
+    # size and mtime_ns only key the cache, so a store is hashed once until its files change
+    offsets = array('q')
+    with open(Path(output_dir) / OFFSETS_FILE, 'rb') as f:
+        offsets.frombytes(f.read())
+    return chunks_hash(file_sha256(Path(output_dir) / TEXTS_FILE), offsets)
+
+
+def stored_chunks_file(output_dir: str = "../processed_data") -> Optional[Path]:
+    """The file that shows output_dir holds processed chunks (current or old layout), or None"""
+    directory = Path(output_dir)
+    if (directory / METADATA_FILE).exists() and MmapChunks.available(str(directory)):
+        return directory / OFFSETS_FILE
+    for name in (PICKLE_FILE, JSON_FILE):
+        if (directory / name).exists():
+            return directory / name
+    return None
+
+
+class ChunkStore:
+    """
+    The on-disk chunk store: chunk_texts.bin + chunk_offsets.bin (texts), provenance.jsonl,
+    metadata.json, manifest.json, entities.json and stats.json. chunks.json, the whole
+    corpus in one readable file, is only written with write_json. previous_manifest (the
+    manifest of the data being replaced) saves rehashing files that haven't changed.
+    """
+
+    def __init__(self, output_dir: str = "../processed_data", write_json: bool = False,
+                 previous_manifest: Optional[SourceManifest] = None):
+        self.output_dir = Path(output_dir)
+        self.write_json = write_json
+        self.previous_manifest = previous_manifest
+
+    @contextmanager
+    def writer(self, metadata: Dict[str, Any], provenance: bool = True) -> Iterator[ChunkWriter]:
+        """
+        Stream chunks into the store. `metadata` may be filled in while the block runs
+        (counts are only known at the end); it is written when the block exits.
+        """
+        writer = ChunkWriter(self.output_dir, provenance, self.write_json, self.previous_manifest)
+        try:
+            yield writer
+        except BaseException:
+            writer.abort()
+            raise
+        writer.close(metadata)
+
+    def save(self, chunks: Sequence[str], metadata: Dict[str, Any],
+             provenance: Optional[Sequence[Dict[str, Any]]] = None):
+        """Write chunks that are already in memory"""
+        with self.writer(metadata, provenance=provenance is not None) as writer:
+            for i, chunk in enumerate(chunks):
+                writer.add(chunk, provenance[i] if provenance is not None else None)
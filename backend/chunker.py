@@ -0,0 +1,173 @@
+"""
+Token-aware Chunker for RAG Chatbot
+Single-pass splitting shared by the PDF and website pipelines, with per-chunk provenance
+"""
+
+import re
+from bisect import bisect_right
+from typing import Iterable, Iterator, List, Dict, Any, Tuple
+
+# Roughly one subword token: short words whole, long words in 8-char pieces, punctuation alone
+TOKEN_PATTERN = re.compile(r"\w{1,8}|[^\w\s]")
+
+DEFAULT_CHUNK_TOKENS = 180
+DEFAULT_OVERLAP_TOKENS = 25
+
+# Preference for cutting in the gap before a token (higher is better)
+BREAK_NONE = -1       # inside a word
+BREAK_SPACE = 0
+BREAK_SENTENCE = 1
+BREAK_LINE = 2
+BREAK_SECTION = 3     # blank line or a short heading-like line ("Skills", "Projects")
+
+HEADING_MAX_CHARS = 40
+SENTENCE_ENDINGS = {".", "!", "?", ":"}
+
+
+def count_tokens(text: str) -> int:
+    """Approximate token count using the chunker's own token units"""
+    return sum(1 for _ in TOKEN_PATTERN.finditer(text))
+
+
+class TokenChunker:
+    def __init__(self, chunk_size: int = DEFAULT_CHUNK_TOKENS, chunk_overlap: int = DEFAULT_OVERLAP_TOKENS):
+        if chunk_overlap >= chunk_size:
+            raise ValueError("chunk_overlap must be smaller than chunk_size")
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+
+    def _break_strength(self, text: str, prev_end: int, start: int) -> int:
+        """Classify the gap text[prev_end:start] between two tokens"""
+        if prev_end == start:
+            return BREAK_NONE
+        gap = text[prev_end:start]
+        if "\n" not in gap:
+            return BREAK_SENTENCE if text[prev_end - 1] in SENTENCE_ENDINGS else BREAK_SPACE
+        if "\n\n" in gap.replace("\r", "").replace(" ", "").replace("\t", ""):
+            return BREAK_SECTION
+        line_end = text.find("\n", start, start + HEADING_MAX_CHARS + 1)
+        if line_end != -1:
+            return BREAK_SECTION
+        return BREAK_LINE
+
+    def _pick_cut(self, window: List[Tuple[int, int, int]]) -> int:
+        """Index of the token that starts the next chunk, preferring strong breaks in the second half"""
+        best, best_strength = len(window) - 1, BREAK_NONE - 1
+        for i in range(len(window) - 1, len(window) // 2 - 1, -1):
+            strength = window[i][2]
+            if strength > best_strength:
+                best, best_strength = i, strength
+                if strength == BREAK_SECTION:
+                    break
+        return best
+
+    def _make_record(self, buf: str, buf_start: int, window: List[Tuple[int, int, int]], source: str,
+                     page_starts: List[int], page_numbers: List[Any]) -> Dict[str, Any]:
+        start, end = window[0][0], window[-1][1]
+        record = {
+            "text": buf[start - buf_start:end - buf_start],
+            "source": source,
+            "start": start,
+            "end": end,
+            "tokens": len(window)
+        }
+        page = page_numbers[bisect_right(page_starts, start) - 1]
+        if page is not None:
+            record["page"] = page
+            record["page_end"] = page_numbers[bisect_right(page_starts, end - 1) - 1]
+        return record
+
+    def chunk_stream(self, pages: Iterable[Tuple[Any, str]], source: str = "") -> Iterator[Dict[str, Any]]:
+        """
+        Yield chunk records from (page number, text) pairs as they arrive.
+        Chunks may span pages and record both ends; offsets are into the pages
+        joined with newlines. Only the text of the chunk still being built is
+        kept, so memory stays bounded by one page plus one chunk.
+        """
+        buf, buf_start = "", 0
+        page_starts: List[int] = []
+        page_numbers: List[Any] = []
+        window: List[Tuple[int, int, int]] = []
+        prev_end = 0
+        emitted_end = 0
+
+        for page_number, page_text in pages:
+            if not page_text or not page_text.strip():
+                continue
+            if page_starts:
+                buf += "\n"
+            page_offset = buf_start + len(buf)
+            page_starts.append(page_offset)
+            page_numbers.append(page_number)
+            buf += page_text
+
+            for match in TOKEN_PATTERN.finditer(buf, page_offset - buf_start):
+                start, end = match.start() + buf_start, match.end() + buf_start
+                if window:
+                    strength = self._break_strength(buf, prev_end - buf_start, start - buf_start)
+                else:
+                    strength = BREAK_SECTION
+                window.append((start, end, strength))
+                prev_end = end
+
+                if len(window) > self.chunk_size:
+                    cut = self._pick_cut(window)
+                    chunk = window[:cut]
+                    yield self._make_record(buf, buf_start, chunk, source, page_starts, page_numbers)
+                    emitted_end = chunk[-1][1]
+                    window = window[max(cut - self.chunk_overlap, 1):]
+
+            # Forget text and pages no future chunk can start in
+            keep_from = window[0][0] if window else buf_start + len(buf)
+            buf = buf[keep_from - buf_start:]
+            buf_start = keep_from
+            while len(page_starts) > 1 and page_starts[1] <= keep_from:
+                page_starts.pop(0)
+                page_numbers.pop(0)
+
+        if window and window[-1][1] > emitted_end:
+            yield self._make_record(buf, buf_start, window, source, page_starts, page_numbers)
+
+    def chunk_text(self, text: str, source: str = "") -> Iterator[Dict[str, Any]]:
+        """Yield chunk records for one document in a single pass over its tokens"""
+        return self.chunk_stream([(None, text)], source)
+
+    def chunk_pages(self, pages: Iterable[Tuple[Any, str]], source: str = "") -> Iterator[Dict[str, Any]]:
+        """Chunk a multi-page document; chunks may span pages and record both ends"""
+        return self.chunk_stream(pages, source)
+
+
+def chunk_records(text: str, source: str = "", chunk_size: int = DEFAULT_CHUNK_TOKENS,
+                  chunk_overlap: int = DEFAULT_OVERLAP_TOKENS) -> List[Dict[str, Any]]:
+    """Convenience function to chunk one text into records"""
+    return list(TokenChunker(chunk_size, chunk_overlap).chunk_text(text, source))
+
+
+def split_provenance(records: List[Dict[str, Any]]) -> Tuple[List[str], List[Dict[str, Any]]]:
+    """Separate chunk texts from their provenance for storage"""
+    texts = [r["text"] for r in records]
+    provenance = [{k: v for k, v in r.items() if k != "text"} for r in records]
+    return texts, provenance
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    print("Testing Token Chunker")
+    print("=" * 30)
+
+    sample_path = sys.argv[1] if len(sys.argv) > 1 else None
+    if sample_path:
+        with open(sample_path, 'r', encoding='utf-8', errors='ignore') as f:
+            sample = f.read()
+    else:
+        sample = ("Skills\nPython, AWS, HTML and CSS.\n\nProjects\n" + "Built a scalable web service. " * 400)
+
+    t0 = time.perf_counter()
+    records = chunk_records(sample, source=sample_path or "sample")
+    elapsed = time.perf_counter() - t0
+    print(f"   Characters: {len(sample)}")
+    print(f"   Chunks: {len(records)} in {elapsed * 1000:.1f} ms")
+    if records:
+        print(f"   First chunk: {records[0]}")
@@ -0,0 +1,186 @@
+"""
+Crawl Cache for RAG Chatbot
+Checkpoints the crawl frontier, visited set and compressed raw pages in SQLite (WAL) so crawls can resume
+"""
+
+import hashlib
+import math
+import sqlite3
+import threading
+import time
+import zlib
+from collections import deque
+from pathlib import Path
+from typing import Deque, Iterator, List, Optional, Set, Tuple
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS crawls (
+    crawl_id TEXT PRIMARY KEY,
+    started_at REAL NOT NULL,
+    finished_at REAL
+);
+CREATE TABLE IF NOT EXISTS frontier (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    crawl_id TEXT NOT NULL,
+    url TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS frontier_crawl ON frontier (crawl_id, url);
+CREATE INDEX IF NOT EXISTS frontier_order ON frontier (crawl_id, seq);
+CREATE TABLE IF NOT EXISTS visited (
+    crawl_id TEXT NOT NULL,
+    url TEXT NOT NULL,
+    PRIMARY KEY (crawl_id, url)
+);
+CREATE TABLE IF NOT EXISTS pages (
+    url TEXT PRIMARY KEY,
+    fetched_at REAL NOT NULL,
+    codec TEXT NOT NULL,
+    content BLOB NOT NULL
+);
+"""
+
+
+def compress(data: bytes) -> Tuple[str, bytes]:
+    if zstandard is not None:
+        return "zstd", zstandard.ZstdCompressor(level=10).compress(data)
+    return "zlib", zlib.compress(data, 6)
+
+
+def decompress(codec: str, blob: bytes) -> bytes:
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("Page was cached with zstd but the zstandard package is not installed")
+        return zstandard.ZstdDecompressor().decompress(blob)
+    return zlib.decompress(blob)
+
+
+class BloomFilter:
+    """
+    Fixed-size set of strings: no false negatives, about `error_rate` false positives
+    once `capacity` items are added. 2M URLs at 0.1% take 3.6 MB.
+    """
+
+    def __init__(self, capacity: int = 2_000_000, error_rate: float = 0.001):
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str) -> List[int]:
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[p >> 3] & (1 << (p & 7)) for p in self._positions(item))
+
+    def add(self, item: str) -> bool:
+        """Add item; returns False if it was (probably) already present"""
+        new = False
+        for p in self._positions(item):
+            mask = 1 << (p & 7)
+            if not self.bits[p >> 3] & mask:
+                self.bits[p >> 3] |= mask
+                new = True
+        if new:
+            self.count += 1
+        return new
+
+
+class CrawlCache:
+    def __init__(self, db_path: str = "../crawl_cache.sqlite"):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def is_resumable(self, crawl_id: str) -> bool:
+        """An earlier crawl of this start URL exists and never finished"""
+        row = self.conn.execute("SELECT finished_at FROM crawls WHERE crawl_id = ?", (crawl_id,)).fetchone()
+        return row is not None and row[0] is None
+
+    def start(self, crawl_id: str, start_url: str):
+        """Begin a fresh crawl, discarding any earlier checkpoint for it (cached pages are kept)"""
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM frontier WHERE crawl_id = ?", (crawl_id,))
+            self.conn.execute("DELETE FROM visited WHERE crawl_id = ?", (crawl_id,))
+            self.conn.execute("INSERT OR REPLACE INTO crawls (crawl_id, started_at, finished_at) VALUES (?, ?, NULL)",
+                              (crawl_id, time.time()))
+            self.conn.execute("INSERT INTO frontier (crawl_id, url) VALUES (?, ?)", (crawl_id, start_url))
+
+    def restore(self, crawl_id: str) -> Tuple[Deque[str], Set[str]]:
+        """Rebuild the in-memory queue and visited set from the last checkpoint"""
+        visited = {row[0] for row in self.conn.execute("SELECT url FROM visited WHERE crawl_id = ?", (crawl_id,))}
+        queue = deque(row[0] for row in self.conn.execute(
+            "SELECT url FROM frontier WHERE crawl_id = ? ORDER BY seq", (crawl_id,)) if row[0] not in visited)
+        return queue, visited
+
+    def record_page(self, crawl_id: str, url: str, content: Optional[bytes], new_links: List[str]):
+        """Atomically mark url visited, store its raw content and enqueue the links found on it"""
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM frontier WHERE crawl_id = ? AND url = ?", (crawl_id, url))
+            self.conn.execute("INSERT OR IGNORE INTO visited (crawl_id, url) VALUES (?, ?)", (crawl_id, url))
+            self.conn.executemany("INSERT INTO frontier (crawl_id, url) VALUES (?, ?)",
+                                  [(crawl_id, link) for link in new_links])
+            if content is not None:
+                codec, blob = compress(content)
+                self.conn.execute("INSERT OR REPLACE INTO pages (url, fetched_at, codec, content) VALUES (?, ?, ?, ?)",
+                                  (url, time.time(), codec, blob))
+
+    def next_url(self, crawl_id: str) -> Optional[str]:
+        """Oldest queued URL (it stays queued until record_page marks it visited)"""
+        row = self.conn.execute("SELECT url FROM frontier WHERE crawl_id = ? ORDER BY seq LIMIT 1",
+                                (crawl_id,)).fetchone()
+        return row[0] if row else None
+
+    def counts(self, crawl_id: str) -> Tuple[int, int]:
+        """(visited, queued) for a crawl"""
+        visited = self.conn.execute("SELECT COUNT(*) FROM visited WHERE crawl_id = ?", (crawl_id,)).fetchone()[0]
+        queued = self.conn.execute("SELECT COUNT(*) FROM frontier WHERE crawl_id = ?", (crawl_id,)).fetchone()[0]
+        return visited, queued
+
+    def iter_known_urls(self, crawl_id: str) -> Iterator[str]:
+        """Every URL visited or queued, streamed (used to rebuild a visited filter on resume)"""
+        for row in self.conn.execute("SELECT url FROM visited WHERE crawl_id = ? "
+                                     "UNION ALL SELECT url FROM frontier WHERE crawl_id = ?", (crawl_id, crawl_id)):
+            yield row[0]
+
+    def finish(self, crawl_id: str):
+        with self._lock, self.conn:
+            self.conn.execute("UPDATE crawls SET finished_at = ? WHERE crawl_id = ?", (time.time(), crawl_id))
+            self.conn.execute("DELETE FROM frontier WHERE crawl_id = ?", (crawl_id,))
+
+    def crawl_ids(self) -> List[str]:
+        return [row[0] for row in self.conn.execute("SELECT crawl_id FROM crawls ORDER BY started_at")]
+
+    def get_page(self, url: str) -> Optional[bytes]:
+        row = self.conn.execute("SELECT codec, content FROM pages WHERE url = ?", (url,)).fetchone()
+        return decompress(row[0], row[1]) if row else None
+
+    def iter_pages(self, crawl_id: str) -> Iterator[Tuple[str, bytes]]:
+        """Yield (url, raw content) for every cached page of a crawl, in the order they were visited"""
+        rows = self.conn.execute(
+            "SELECT v.url, p.codec, p.content FROM visited v JOIN pages p ON p.url = v.url "
+            "WHERE v.crawl_id = ? ORDER BY v.rowid", (crawl_id,))
+        for url, codec, blob in rows:
+            yield url, decompress(codec, blob)
+
+    def stats(self, crawl_id: str) -> dict:
+        visited, frontier = self.counts(crawl_id)
+        cached, stored = self.conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(LENGTH(p.content)), 0) FROM visited v JOIN pages p ON p.url = v.url "
+            "WHERE v.crawl_id = ?", (crawl_id,)).fetchone()
+        return {"visited": visited, "frontier": frontier, "cached_pages": cached, "stored_bytes": stored}
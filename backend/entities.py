@@ -0,0 +1,257 @@
+"""
+Entity Index for RAG Chatbot
+E-mail addresses, phone numbers, postal addresses, people with their titles and prices found at ingest time, keyed for exact lookups with chunk back-references
+"""
+
+import json
+import re
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+ENTITIES_FILE = "entities.json"
+ENTITY_INDEX_VERSION = 1
+KINDS = ("email", "phone", "address", "person", "price")
+LABELS = {"email": "Email", "phone": "Phone", "address": "Address", "person": "Person", "price": "Price"}
+
+# A question is answered from the index only when this few entries match it; more are pinned into the context instead
+MAX_DIRECT_ANSWERS = 3
+MAX_PINNED_CHUNKS = 5
+# Retrieved chunks kept after the pinned ones
+DEFAULT_PINNED_K = 10
+MAX_CONTEXT_CHARS = 160
+
+EMAIL = re.compile(r"\b[\w.+-]+@[\w-]+(?:\.[\w-]+)*\.[A-Za-z]{2,}\b")
+PHONE = re.compile(r"(?<![\w+/.])(?:\+\d{1,3}[\s.-]?)?(?:\(\d{1,4}\)[\s.-]?)?\d{2,5}(?:[\s.-]\d{2,5}){0,4}(?![\w/])")
+PHONE_LABEL = re.compile(r"\b(?:phone|tel|telephone|mobile|cell|call|fax|whatsapp)\b", re.IGNORECASE)
+YEAR = re.compile(r"(?:19|20)\d\d")
+PRICE = re.compile(
+    r"(?:[$€£₹]|\b(?:USD|EUR|GBP|INR|Rs\.?)\s?)\d[\d,]*(?:\.\d+)?(?:\s?(?:/|per)\s?[A-Za-z]+)?"
+    r"|\b\d[\d,]*(?:\.\d+)?\s?(?:USD|EUR|GBP|INR|dollars|euros|rupees)\b"
+)
+STREET = re.compile(
+    r"\b\d{1,5}\s+(?:[A-Z][\w.'-]*\s+){1,4}(?:Street|St|Avenue|Ave|Road|Rd|Boulevard|Blvd|Lane|Ln|Drive|Dr|"
+    r"Way|Court|Ct|Place|Pl|Square|Sq|Parkway|Pkwy|Highway|Hwy)\b\.?(?:,[^\n]{0,80})?"
+)
+ADDRESS_LABEL = re.compile(r"\b(?:address|located at|headquarters|head office)\s*[:-]\s*([^\n]{10,120})", re.IGNORECASE)
+
+TITLE = (r"(?:Co-?[Ff]ounder(?: & CEO| and CEO)?|Founder(?: & CEO| and CEO)?|CEO|CTO|CFO|COO|CMO|CIO|"
+         r"Chief [A-Z]\w+(?: [A-Z]\w+)? Officer|"
+         r"(?:Vice )?President|VP(?: of [A-Z]\w+)?|Chair(?:man|woman|person)?|Managing Director|"
+         r"Director(?: of [A-Z]\w+)?|Head of [A-Z]\w+|(?:[A-Z]\w+ )?Manager|Partner|Owner|"
+         r"(?:Senior |Lead |Principal |Staff )?(?:Software |Data |Cloud |DevOps |Web |Product |UX |UI )?"
+         r"(?:Engineer|Developer|Architect|Consultant|Designer|Analyst|Scientist))")
+NAME = r"[A-Z][a-z]+(?:[ ][A-Z][a-z'.-]+){1,2}"
+PERSON = re.compile(
+    rf"(?P<name>{NAME})[ \t]*(?:,|\||–|—|-|:|\n)\s*(?P<title>{TITLE})\b"
+    rf"|(?P<title2>{TITLE})[ \t]*(?:,|\||–|—|-|:|\n)\s*(?P<name2>{NAME})\b"
+)
+# Capitalized words that start headings and menus rather than names
+NOT_NAME = {"About", "Contact", "Our", "The", "Team", "Services", "Home", "Page", "Meet", "Read", "More",
+            "Learn", "View", "Get", "Join", "Call", "Email", "Phone", "Address", "Office", "Welcome"}
+
+# Question words that ask for a kind of entity; they say nothing about which entry is wanted
+INTENTS = {
+    "email": {"email", "e-mail", "mail", "contact", "touch", "reach"},
+    "phone": {"phone", "telephone", "number", "call", "mobile", "contact", "touch", "reach", "whatsapp"},
+    "address": {"address", "located", "location", "where", "office", "headquarters", "visit"},
+    "price": {"price", "prices", "pricing", "cost", "costs", "much", "fee", "fees", "charge", "rate", "rates"},
+    "person": {"who"},
+}
+GENERIC_WORDS = set().union(*INTENTS.values()) | {
+    "what", "is", "are", "the", "a", "an", "your", "you", "of", "for", "to", "can", "i", "do", "does", "how",
+    "me", "please", "tell", "give", "get", "in", "at", "on", "with", "by", "and", "or", "there", "any", "it",
+    "its", "there's", "what's", "who's", "where's", "us", "our", "find", "which", "them", "their"
+}
+WORD = re.compile(r"[\w'-]+")
+
+
+def question_words(text: str) -> List[str]:
+    return [w.strip("'-") for w in WORD.findall(text.casefold())]
+
+
+def line_context(text: str, start: int, end: int) -> str:
+    """The line around a match; a line holding little but the match (a price under a plan name) gets the line before it too"""
+    line_start = text.rfind("\n", 0, start) + 1
+    line_end = text.find("\n", end)
+    line = text[line_start:line_end if line_end != -1 else len(text)].strip()
+    rest = text[line_start:start] + text[end:line_end if line_end != -1 else len(text)]
+    if sum(map(str.isalpha, rest)) < 3 and line_start > 1:
+        previous_start = text.rfind("\n", 0, line_start - 1) + 1
+        line = f"{text[previous_start:line_start - 1].strip()} {line}"
+    return line[:MAX_CONTEXT_CHARS]
+
+
+def is_phone(match: str, context: str) -> bool:
+    digits = re.sub(r"\D", "", match)
+    if not 7 <= len(digits) <= 15:
+        return False
+    # Year ranges and dates ("2019-2023", "2024 05 01") are the usual false positives
+    groups = re.split(r"[\s.()-]+", match.strip("+() "))
+    if all(YEAR.fullmatch(g) or len(g) <= 2 for g in groups if g):
+        return False
+    return match.startswith(("+", "(")) or len(digits) >= 10 or bool(PHONE_LABEL.search(context))
+
+
+def extract_entities(text: str) -> List[Tuple[str, str, str]]:
+    """(kind, value, context) for every entity in one chunk"""
+    found = []
+    for match in EMAIL.finditer(text):
+        found.append(("email", match.group(), line_context(text, match.start(), match.end())))
+    emails = {value for _, value, _ in found}
+    for match in PHONE.finditer(text):
+        context = line_context(text, match.start(), match.end())
+        if is_phone(match.group(), context) and not any(match.group() in email for email in emails):
+            found.append(("phone", match.group().strip(), context))
+    for match in PRICE.finditer(text):
+        found.append(("price", match.group().strip(), line_context(text, match.start(), match.end())))
+    for match in STREET.finditer(text):
+        found.append(("address", match.group().strip(" ,"), line_context(text, match.start(), match.end())))
+    for match in ADDRESS_LABEL.finditer(text):
+        found.append(("address", match.group(1).strip(" ,."), line_context(text, match.start(1), match.end(1))))
+    for match in PERSON.finditer(text):
+        name = match.group("name") or match.group("name2")
+        title = match.group("title") or match.group("title2")
+        if name.split()[0] not in NOT_NAME and not (set(name.split()) & NOT_NAME):
+            found.append(("person", f"{name}, {title}", f"{name} {title}"))
+    return found
+
+
+def has_entities(text: str) -> bool:
+    """Whether a chunk holds anything the index would record; such chunks are never filtered out at ingest"""
+    return bool(extract_entities(text))
+
+
+def entity_key(kind: str, value: str) -> str:
+    if kind == "phone":
+        return ("+" if value.startswith("+") else "") + re.sub(r"\D", "", value)
+    if kind == "person":
+        return value.split(",")[0].casefold()
+    return " ".join(value.split()).casefold()
+
+
+class EntityIndex:
+    """
+    kind -> normalized value -> {"value", "context", "source", "chunks"}. Built once
+    per ingest from the chunk texts and stored beside them, so a lookup never scans
+    chunk data.
+    """
+
+    def __init__(self, output_dir: str = "../processed_data"):
+        self.path = Path(output_dir) / ENTITIES_FILE
+        self.entries: Dict[str, "OrderedDict[str, Dict[str, Any]]"] = {kind: OrderedDict() for kind in KINDS}
+
+    def exists(self) -> bool:
+        return self.path.exists()
+
+    def load(self) -> "EntityIndex":
+        with open(self.path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get("version") != ENTITY_INDEX_VERSION:
+            raise ValueError(f"Unsupported entity index version: {data.get('version')}")
+        for kind in KINDS:
+            self.entries[kind] = OrderedDict((entity_key(kind, e["value"]), e) for e in data["entities"].get(kind, []))
+        return self
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump({"version": ENTITY_INDEX_VERSION,
+                       "entities": {kind: list(entries.values()) for kind, entries in self.entries.items()}},
+                      f, indent=2, ensure_ascii=False)
+
+    def add(self, chunk_id: int, text: str, source: Optional[str] = None):
+        """Index the entities of one chunk; chunks are added in ID order as the store is written"""
+        for kind, value, context in extract_entities(text):
+            entry = self.entries[kind].setdefault(entity_key(kind, value), {
+                "value": value,
+                "context": context,
+                "source": source,
+                "chunks": []
+            })
+            if not entry["chunks"] or entry["chunks"][-1] != chunk_id:
+                entry["chunks"].append(chunk_id)
+
+    def build(self, chunks: Sequence[str], provenance: Optional[List[Dict[str, Any]]] = None) -> "EntityIndex":
+        for chunk_id, text in enumerate(chunks):
+            self.add(chunk_id, text, provenance[chunk_id]["source"] if provenance else None)
+        return self
+
+    def counts(self) -> Dict[str, int]:
+        return {kind: len(entries) for kind, entries in self.entries.items()}
+
+    def match(self, question: str) -> Optional[Dict[str, Any]]:
+        """
+        Entries a question asks for, or None if it isn't a lookup. Words beyond the
+        intent words ("email", "who", "price" ...) must appear in an entry's context;
+        a question without any ("what's your email?", "who are you?") matches every
+        entry of the kind, which only pins their chunks and is never answered directly.
+        {"kinds", "entries": [(kind, entry)], "direct": few enough to answer from the index, "chunks"}
+        """
+        words = question_words(question)
+        kinds = [kind for kind in KINDS if (set(words) & INTENTS[kind] or
+                                            (kind == "person" and re.search(TITLE, question, re.IGNORECASE)))]
+        specific = {w for w in words if w not in GENERIC_WORDS and len(w) > 1}
+        scored = [(len(specific & set(question_words(entry["context"]))) if specific else 1, kind, entry)
+                  for kind in kinds for entry in self.entries[kind].values()]
+        best_score = max((score for score, _, _ in scored), default=0)
+        if not best_score:
+            return None
+
+        # "How can I reach you?" asks for e-mail and phone alike, so every kind at the best score is kept
+        matched = [(kind, entry) for score, kind, entry in scored if score == best_score]
+        per_kind = {kind: sum(1 for k, _ in matched if k == kind) for kind, _ in matched}
+        # A shared entry (one footer e-mail on every page) points at many chunks; its first few are enough
+        chunks = list(OrderedDict.fromkeys(c for _, entry in matched for c in entry["chunks"][:2]))[:MAX_PINNED_CHUNKS]
+        return {"kinds": list(per_kind), "entries": matched,
+                "direct": bool(specific) and max(per_kind.values()) <= MAX_DIRECT_ANSWERS, "chunks": chunks}
+
+    def answer(self, question: str) -> Optional[Dict[str, Any]]:
+        """A direct answer from the index, or None when the question needs the normal path"""
+        match = self.match(question)
+        if not match or not match["direct"]:
+            return None
+        parts = []
+        for kind in match["kinds"]:
+            lines = []
+            for entry in (entry for k, entry in match["entries"] if k == kind):
+                # A bare price means little without the plan or product named beside it
+                value = entry["context"] if kind == "price" else entry["value"]
+                lines.append(value + (f" ({entry['source']})" if entry.get("source") else ""))
+            if len(lines) == 1:
+                parts.append(f"{LABELS[kind]}: {lines[0]}")
+            else:
+                parts.append(f"{LABELS[kind]}:\n" + "\n".join(f"- {line}" for line in lines))
+        return {"answer": "\n\n".join(parts), "kinds": match["kinds"], "chunks": match["chunks"]}
+
+
+def load_entity_index(output_dir: str, chunks: Sequence[str]) -> EntityIndex:
+    """The stored index, or one built in memory for data processed before entity indexing"""
+    index = EntityIndex(output_dir)
+    return index.load() if index.exists() else index.build(chunks)
+
+
+class EntityPinnedRetriever(BaseRetriever):
+    """
+    For lookup questions the chunks the matched entities came from go first, and
+    only the best k retrieved chunks follow them, so the prompt carries the exact
+    passages and a fraction of the usual context.
+    """
+    retriever: Any
+    index: Any
+    chunks: Any
+    k: int = DEFAULT_PINNED_K
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        docs = self.retriever.invoke(query, config={"callbacks": run_manager.get_child()})
+        match = self.index.match(query)
+        if not match or not match["chunks"]:
+            return docs
+        pinned = [Document(page_content=self.chunks[i], metadata={"chunk_id": i, "pinned": True})
+                  for i in match["chunks"]]
+        texts = {doc.page_content for doc in pinned}
+        return pinned + [doc for doc in docs if doc.page_content not in texts][:self.k]
@@ -0,0 +1,145 @@
+"""
+Extractive Answers for RAG Chatbot
+Answers built from the best sentences of the retrieved chunks, with no LLM call: a fallback when every API key is rate-limited, and a low-latency mode
+"""
+
+import math
+import re
+import threading
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+DEFAULT_MAX_SENTENCES = 3
+DEFAULT_MAX_CHARS = 600
+# Only the first chunks the retriever returns are read, and only the best lexical
+# candidates among their sentences are embedded, to keep an answer in the tens of milliseconds
+DEFAULT_MAX_CHUNKS = 8
+DEFAULT_MAX_CANDIDATES = 32
+DEFAULT_MIN_SCORE = 0.2
+# Weight of embedding similarity against lexical overlap when both are available
+SEMANTIC_WEIGHT = 0.6
+
+NO_ANSWER = "I couldn't find an answer to that in the processed content."
+
+SENTENCE_BREAK = re.compile(r"(?<=[.!?])\s+(?=[\"'(\[]?[A-Z0-9])|\n+")
+# Separators scraper.py puts between pages; never part of an answer
+PAGE_MARKER = re.compile(r"^--- Page: .+ ---$")
+WORD = re.compile(r"\w+")
+STOPWORDS = frozenset(
+    "a an the and or but of to in on at for from by with about as is are was were be been being "
+    "do does did have has had i you he she it we they me my your our their this that these those "
+    "what which who whom whose when where why how can could should would will shall may might "
+    "there here not no any some all so if then than into over out up down tell give list please".split()
+)
+MIN_SENTENCE_WORDS = 4
+
+
+def split_sentences(text: str) -> List[str]:
+    """Sentences and line-level items (headings, list entries) of a chunk"""
+    sentences = (s.strip() for s in SENTENCE_BREAK.split(text) if s)
+    return [s for s in sentences if len(s.split()) >= MIN_SENTENCE_WORDS and not PAGE_MARKER.match(s)]
+
+
+def content_words(text: str) -> List[str]:
+    return [w for w in WORD.findall(text.casefold()) if w not in STOPWORDS]
+
+
+class ExtractiveAnswerer:
+    """
+    Scores every sentence of the top retrieved chunks against the question and
+    returns the best few, in the order they appear in the source. Lexical score is
+    the IDF-weighted share of question words a sentence contains (IDF over the
+    candidate sentences); with embed_fn the cosine similarity to the question is
+    blended in. embed_fn takes a list of texts and must be local (it runs on every
+    answer); without one, scoring is lexical only.
+    """
+
+    def __init__(self, embed_fn: Optional[Callable[[List[str]], List[List[float]]]] = None,
+                 max_sentences: int = DEFAULT_MAX_SENTENCES, max_chars: int = DEFAULT_MAX_CHARS,
+                 max_chunks: int = DEFAULT_MAX_CHUNKS, max_candidates: int = DEFAULT_MAX_CANDIDATES,
+                 min_score: float = DEFAULT_MIN_SCORE):
+        self.embed_fn = embed_fn
+        self.max_sentences = max_sentences
+        self.max_chars = max_chars
+        self.max_chunks = max_chunks
+        self.max_candidates = max_candidates
+        self.min_score = min_score
+        self.answers = 0
+        self.unanswered = 0
+        self.total_ms = 0.0
+        self._lock = threading.Lock()
+
+    def lexical_scores(self, question: str, sentences: Sequence[str]) -> np.ndarray:
+        query = set(content_words(question))
+        if not query:
+            return np.zeros(len(sentences), dtype=np.float32)
+        words = [set(content_words(sentence)) for sentence in sentences]
+        df = Counter(w for sentence_words in words for w in sentence_words & query)
+        idf = {w: math.log(1 + len(sentences) / (1 + df[w])) for w in query}
+        total = sum(idf.values())
+        return np.array([sum(idf[w] for w in sentence_words & query) / total for sentence_words in words],
+                        dtype=np.float32)
+
+    def semantic_scores(self, question: str, sentences: Sequence[str]) -> np.ndarray:
+        vectors = np.asarray(self.embed_fn([question] + list(sentences)), dtype=np.float32)
+        vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        return vectors[1:] @ vectors[0]
+
+    def answer(self, question: str, docs: Sequence[Any]) -> Dict[str, Any]:
+        """{"answer", "source_documents", "sentences": [{"text", "score", "source"}], "elapsed_ms"}"""
+        start = time.perf_counter()
+        docs = list(docs)[:self.max_chunks]
+        candidates = []
+        seen = set()
+        for rank, doc in enumerate(docs):
+            for position, sentence in enumerate(split_sentences(getattr(doc, "page_content", str(doc)))):
+                key = " ".join(sentence.split()).casefold()
+                if key not in seen:
+                    seen.add(key)
+                    candidates.append((rank, position, sentence))
+
+        picked = []
+        if candidates:
+            scores = self.lexical_scores(question, [text for _, _, text in candidates])
+            order = np.argsort(-scores, kind='stable')[:self.max_candidates]
+            if self.embed_fn is not None:
+                semantic = self.semantic_scores(question, [candidates[i][2] for i in order])
+                scores = SEMANTIC_WEIGHT * semantic + (1 - SEMANTIC_WEIGHT) * scores[order]
+            else:
+                scores = scores[order]
+
+            length = 0
+            for i in np.argsort(-scores, kind='stable'):
+                text = candidates[order[i]][2]
+                if scores[i] < self.min_score or len(picked) >= self.max_sentences:
+                    break
+                if picked and length + len(text) > self.max_chars:
+                    continue
+                picked.append((candidates[order[i]], float(scores[i])))
+                length += len(text)
+
+        # Read in source order: by retrieval rank of the chunk, then position within it
+        picked.sort(key=lambda item: item[0][:2])
+        used = sorted({rank for (rank, _, _), _ in picked})
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        with self._lock:
+            self.answers += 1
+            self.unanswered += not picked
+            self.total_ms += elapsed_ms
+
+        return {
+            "answer": " ".join(text for (_, _, text), _ in picked) or NO_ANSWER,
+            "source_documents": [docs[rank] for rank in used],
+            "sentences": [{"text": text, "score": round(score, 3),
+                           "source": getattr(docs[rank], "metadata", {}).get("source")}
+                          for (rank, _, text), score in picked],
+            "elapsed_ms": round(elapsed_ms, 1)
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"answers": self.answers, "unanswered": self.unanswered,
+                    "mean_ms": round(self.total_ms / self.answers, 1) if self.answers else 0.0}
@@ -0,0 +1,158 @@
+"""
+Fake Gemini Endpoint for RAG Chatbot
+Local stand-in for the generateContent REST API with configurable latency and 429 injection
+"""
+
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, Optional
+from urllib.parse import urlparse, parse_qs
+
+GENERATE_PATH = re.compile(r"/v1(beta)?/models/(?P<model>[^/:]+):(?P<method>generateContent|streamGenerateContent)")
+
+
+class FakeGeminiStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.rate_limited = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.requests_by_key: Counter = Counter()
+        self.key_switches = 0
+        self._last_key: Optional[str] = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                "requests": self.requests,
+                "rate_limited": self.rate_limited,
+                "max_in_flight": self.max_in_flight,
+                "requests_by_key": {key[-6:]: count for key, count in self.requests_by_key.items()},
+                "key_switches": self.key_switches
+            }
+
+
+class FakeGeminiServer:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency_ms: float = 800,
+                 jitter_ms: float = 200, rate_limit_prob: float = 0.0, answer: str = "This is a stand-in answer.",
+                 seed: Optional[int] = None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.rate_limit_prob = rate_limit_prob
+        self.answer = answer
+        self.stats = FakeGeminiStats()
+        self.random = random.Random(seed)
+        self.httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self.httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def endpoint(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeGeminiServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        print(f"Fake Gemini listening on {self.endpoint}")
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status: int, body: Dict[str, Any]):
+                payload = json.dumps(body).encode('utf-8')
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_POST(self):
+                parsed = urlparse(self.path)
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length) or b"{}")
+                if not GENERATE_PATH.match(parsed.path):
+                    self._send(404, {"error": {"code": 404, "message": "Not found", "status": "NOT_FOUND"}})
+                    return
+                key = self.headers.get("x-goog-api-key") or parse_qs(parsed.query).get("key", [""])[0]
+                server.handle_generate(self, request, key)
+
+        return Handler
+
+    def handle_generate(self, handler, request: Dict[str, Any], key: str):
+        stats = self.stats
+        with stats.lock:
+            stats.requests += 1
+            stats.in_flight += 1
+            stats.max_in_flight = max(stats.max_in_flight, stats.in_flight)
+            stats.requests_by_key[key] += 1
+            if stats._last_key is not None and key != stats._last_key:
+                stats.key_switches += 1
+            stats._last_key = key
+            limited = self.random.random() < self.rate_limit_prob
+            delay = max(0.0, self.random.gauss(self.latency_ms, self.jitter_ms)) / 1000
+
+        try:
+            time.sleep(delay)
+            if limited:
+                with stats.lock:
+                    stats.rate_limited += 1
+                handler._send(429, {"error": {
+                    "code": 429,
+                    "message": "Resource has been exhausted (e.g. check quota).",
+                    "status": "RESOURCE_EXHAUSTED"
+                }})
+                return
+
+            prompt_chars = len(json.dumps(request.get("contents", [])))
+            handler._send(200, {
+                "candidates": [{
+                    "content": {"parts": [{"text": self.answer}], "role": "model"},
+                    "finishReason": "STOP",
+                    "index": 0
+                }],
+                "usageMetadata": {
+                    "promptTokenCount": prompt_chars // 4,
+                    "candidatesTokenCount": len(self.answer) // 4,
+                    "totalTokenCount": prompt_chars // 4 + len(self.answer) // 4
+                }
+            })
+        finally:
+            with stats.lock:
+                stats.in_flight -= 1
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run a local stand-in for the Gemini generateContent API")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=800)
+    parser.add_argument("--jitter-ms", type=float, default=200)
+    parser.add_argument("--rate-limit-prob", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = FakeGeminiServer(port=args.port, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                              rate_limit_prob=args.rate_limit_prob).start()
+    print("Set GEMINI_API_ENDPOINT to this address before starting the app. Ctrl+C to stop.")
+    try:
+        while True:
+            time.sleep(5)
+            print(server.stats.snapshot())
+    except KeyboardInterrupt:
+        server.stop()
@@ -0,0 +1,176 @@
+"""
+Hedged LLM Calls for RAG Chatbot
+Per-call deadlines, plus a duplicate request on another API key when a call runs past the usual latency; the first answer wins
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatResult
+
+from metrics import percentile
+
+DEFAULT_TIMEOUT_S = 30.0
+DEFAULT_HEDGE_PERCENTILE = 95
+# Used until enough calls have been timed to trust the percentile
+DEFAULT_HEDGE_DELAY_S = 3.0
+MIN_HEDGE_DELAY_S = 0.5
+MIN_SAMPLES = 20
+LATENCY_WINDOW = 200
+
+
+class LatencyTracker:
+    """Rolling window of successful call latencies (seconds)"""
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        with self._lock:
+            samples = list(self._samples)
+        return percentile(samples, pct) if len(samples) >= MIN_SAMPLES else None
+
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+
+
+def background_loop() -> asyncio.AbstractEventLoop:
+    """
+    One event loop per process, on a daemon thread, that every session's LLM calls
+    run on. A cancelled (losing) request can finish in the background without
+    holding up its caller.
+    """
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="llm-calls", daemon=True).start()
+        return _loop
+
+
+def run_sync(coro):
+    """Run a coroutine on the background loop and wait for its result"""
+    return asyncio.run_coroutine_threadsafe(coro, background_loop()).result()
+
+
+class HedgedChatModel(BaseChatModel):
+    """
+    Sends each call to llms[0] (the current API key). If it hasn't answered once the
+    hedge delay (the hedge_percentile of recent latencies) has passed, or it fails
+    first, the same call goes to the next model (the next key) and whichever answers
+    first is returned; the other request is cancelled. Only slow calls are doubled, so
+    with the 95th percentile about one call in twenty costs a second request. Every
+    call is bounded by timeout_s. If all attempts fail, the first error is raised, so
+    rate-limit handling upstream sees the usual exception.
+    """
+
+    llms: List[Any]
+    timeout_s: float = DEFAULT_TIMEOUT_S
+    hedge_percentile: float = DEFAULT_HEDGE_PERCENTILE
+    max_attempts: int = 2
+    tracker: Any = None
+    counters: Dict[str, int] = {}
+    counters_lock: Any = None
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        if self.tracker is None:
+            self.tracker = shared_latency_tracker()
+        self.counters = {"calls": 0, "hedged": 0, "hedge_wins": 0, "failovers": 0, "timeouts": 0}
+        # Sync callers count on their own thread, the race on the background loop's
+        self.counters_lock = threading.Lock()
+
+    @property
+    def _llm_type(self) -> str:
+        return f"hedged-{self.llms[0]._llm_type}"
+
+    @property
+    def model(self) -> str:
+        return getattr(self.llms[0], "model", "")
+
+    def _count(self, name: str):
+        with self.counters_lock:
+            self.counters[name] += 1
+
+    def hedge_delay(self) -> float:
+        observed = self.tracker.percentile(self.hedge_percentile)
+        return max(observed, MIN_HEDGE_DELAY_S) if observed is not None else DEFAULT_HEDGE_DELAY_S
+
+    async def _attempt(self, index: int, messages: List[BaseMessage], stop: Optional[List[str]],
+                       kwargs: Dict[str, Any]) -> ChatResult:
+        start = time.perf_counter()
+        result = await self.llms[index]._agenerate(messages, stop=stop, **kwargs)
+        self.tracker.record(time.perf_counter() - start)
+        return result
+
+    async def _race(self, messages: List[BaseMessage], stop: Optional[List[str]], kwargs: Dict[str, Any]) -> ChatResult:
+        attempts = min(self.max_attempts, len(self.llms))
+        tasks = {asyncio.ensure_future(self._attempt(0, messages, stop, kwargs)): 0}
+        launched = 1
+        first_error = None
+        try:
+            while tasks:
+                can_hedge = launched < attempts
+                done, _ = await asyncio.wait(tasks, timeout=self.hedge_delay() if can_hedge else None,
+                                             return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    index = tasks.pop(task)
+                    if task.exception() is None:
+                        if index:
+                            self._count("hedge_wins")
+                        return task.result()
+                    first_error = first_error or task.exception()
+                if can_hedge and (not done or not tasks):
+                    # Slow (nothing finished within the delay) or failed: try the next key
+                    self._count("hedged" if not done else "failovers")
+                    tasks[asyncio.ensure_future(self._attempt(launched, messages, stop, kwargs))] = launched
+                    launched += 1
+            raise first_error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager=None, **kwargs: Any) -> ChatResult:
+        self._count("calls")
+        try:
+            return await asyncio.wait_for(self._race(messages, stop, kwargs), self.timeout_s)
+        except asyncio.TimeoutError:
+            self._count("timeouts")
+            raise TimeoutError(f"No answer from the model within {self.timeout_s:g} s")
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager=None, **kwargs: Any) -> ChatResult:
+        # Sync callers (chain.invoke) run the same race on the shared background loop
+        return run_sync(self._agenerate(messages, stop=stop, **kwargs))
+
+    def stats(self) -> Dict[str, Any]:
+        observed = self.tracker.percentile(50)
+        with self.counters_lock:
+            counters = dict(self.counters)
+        return {**counters,
+                "p50_s": round(observed, 3) if observed is not None else None,
+                "hedge_delay_s": round(self.hedge_delay(), 3)}
+
+
+_shared_tracker: Optional[LatencyTracker] = None
+
+
+def shared_latency_tracker() -> LatencyTracker:
+    """One latency window per process, shared by every engine (one per site and API key)"""
+    global _shared_tracker
+    with _loop_lock:
+        if _shared_tracker is None:
+            _shared_tracker = LatencyTracker()
+        return _shared_tracker
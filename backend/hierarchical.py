@@ -0,0 +1,160 @@
+"""
+Hierarchical Retrieval for RAG Chatbot
+Coarse-to-fine search: section vectors pick the candidate sections, chunk search runs only inside them
+"""
+
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from langchain_community.vectorstores.utils import maximal_marginal_relevance
+
+# A section is a run of consecutive chunks from one source (a web page, or part of a long PDF)
+DEFAULT_SECTION_CHUNKS = 32
+DEFAULT_SECTION_K = 20
+EMBED_BATCH_SIZE = 256
+BLOCK_ROWS = 65536
+
+
+def group_sections(provenance: List[Dict[str, Any]], max_section_chunks: int = DEFAULT_SECTION_CHUNKS) -> List[Tuple[str, int, int]]:
+    """Split chunk IDs into (source, first, end) sections: same source, at most max_section_chunks long"""
+    sections = []
+    start = 0
+    for i in range(1, len(provenance) + 1):
+        if (i == len(provenance) or provenance[i]["source"] != provenance[start]["source"]
+                or i - start >= max_section_chunks):
+            sections.append((provenance[start]["source"], start, i))
+            start = i
+    return sections
+
+
+class HierarchicalIndex:
+    """
+    Two-level cosine index. Each section's vector is the normalized mean of its
+    chunk vectors, so no extra embedding or summarization call is needed. The
+    chunk matrix may be a read-only memmap (INDEX_MODE=mmap); only per-chunk
+    norms and the section vectors are held in memory.
+    """
+
+    def __init__(self, texts: Sequence[str], provenance: List[Dict[str, Any]], vectors: np.ndarray,
+                 max_section_chunks: int = DEFAULT_SECTION_CHUNKS):
+        if not (len(texts) == len(provenance) == len(vectors)):
+            raise ValueError(f"{len(texts)} chunks, {len(provenance)} provenance records, {len(vectors)} vectors")
+        self.texts = texts
+        self.provenance = provenance
+        self.vectors = vectors
+        self.sections = group_sections(provenance, max_section_chunks)
+        self.section_of = np.empty(len(texts), dtype=np.int32)
+        self.section_sizes = np.array([end - first for _, first, end in self.sections], dtype=np.int64)
+
+        self.norms = np.empty(len(vectors), dtype=np.float32)
+        for start in range(0, len(vectors), BLOCK_ROWS):
+            block = np.asarray(vectors[start:start + BLOCK_ROWS], dtype=np.float32)
+            self.norms[start:start + len(block)] = np.linalg.norm(block, axis=1)
+        self.norms[self.norms == 0] = 1.0
+
+        self.section_vectors = np.empty((len(self.sections), vectors.shape[1]), dtype=np.float32)
+        for s, (_, first, end) in enumerate(self.sections):
+            self.section_of[first:end] = s
+            unit = np.asarray(vectors[first:end], dtype=np.float32) / self.norms[first:end, None]
+            mean = unit.mean(axis=0)
+            self.section_vectors[s] = mean / (np.linalg.norm(mean) or 1.0)
+
+    def search_sections(self, query: np.ndarray, section_k: int, min_chunks: int = 0) -> np.ndarray:
+        """Best section_k sections, extended down the ranking until they hold at least min_chunks chunks"""
+        scores = self.section_vectors @ query
+        if len(scores) <= section_k:
+            return np.argsort(-scores)
+        top = np.argpartition(-scores, section_k)[:section_k]
+        top = top[np.argsort(-scores[top])]
+        if self.section_sizes[top].sum() >= min_chunks:
+            return top
+        # Short pages make small sections: take the next best ones until there are enough chunks
+        order = np.argsort(-scores)
+        return order[:int(np.searchsorted(np.cumsum(self.section_sizes[order]), min_chunks)) + 1]
+
+    def search_chunks(self, query: np.ndarray, fetch_k: int, section_ids: np.ndarray) -> List[int]:
+        """Chunk IDs inside the given sections, best cosine first"""
+        if len(section_ids) == 0:
+            return []
+        candidates = np.concatenate([np.arange(self.sections[s][1], self.sections[s][2]) for s in section_ids])
+        scores = (np.asarray(self.vectors[candidates], dtype=np.float32) @ query) / self.norms[candidates]
+        order = np.argsort(-scores, kind='stable')[:fetch_k]
+        return [int(candidates[i]) for i in order]
+
+    def _merge(self, first: int, last: int) -> str:
+        """Text of chunks first..last, with the overlap between neighbours removed"""
+        text = self.texts[first]
+        for i in range(first + 1, last + 1):
+            prev, cur = self.provenance[i - 1], self.provenance[i]
+            overlap = prev["end"] - cur["start"]
+            chunk = self.texts[i]
+            text += chunk[overlap:] if 0 <= overlap <= len(chunk) else "\n" + chunk
+        return text
+
+    def documents(self, chunk_ids: List[int], expand: int = 0) -> List[Document]:
+        """
+        Documents for the matched chunks, in match order. With expand > 0 each match
+        grows to include up to `expand` neighbours on either side within its section,
+        and matches whose expansions overlap are returned once.
+        """
+        docs = []
+        covered = set()
+        for chunk_id in chunk_ids:
+            if chunk_id in covered:
+                continue
+            _, section_first, section_end = self.sections[self.section_of[chunk_id]]
+            first = max(chunk_id - expand, section_first)
+            last = min(chunk_id + expand, section_end - 1)
+            covered.update(range(first, last + 1))
+            metadata = {"source": self.provenance[chunk_id]["source"], "chunk_id": chunk_id}
+            if expand:
+                metadata["expanded_from"] = [first, last]
+            docs.append(Document(page_content=self._merge(first, last), metadata=metadata))
+        return docs
+
+
+class HierarchicalRetriever(BaseRetriever):
+    """Section search, then chunk search (similarity or MMR) restricted to the winning sections"""
+    index: Any
+    embeddings: Any
+    k: int = 50
+    fetch_k: int = 100
+    section_k: int = DEFAULT_SECTION_K
+    search_type: str = "mmr"
+    lambda_mult: float = 0.5
+    expand: int = 0
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        query_vector = np.asarray(self.embeddings.embed_query(query), dtype=np.float32)
+        query_unit = query_vector / (np.linalg.norm(query_vector) or 1.0)
+
+        sections = self.index.search_sections(query_unit, self.section_k, self.k)
+        candidates = self.index.search_chunks(query_unit, self.fetch_k, sections)
+        if self.search_type == "mmr" and candidates:
+            candidate_vectors = np.asarray(self.index.vectors[candidates], dtype=np.float32)
+            selected = maximal_marginal_relevance(query_unit.reshape(1, -1), candidate_vectors,
+                                                  k=self.k, lambda_mult=self.lambda_mult)
+            chunk_ids = [candidates[i] for i in selected]
+        else:
+            chunk_ids = candidates[:self.k]
+        return self.index.documents(chunk_ids, self.expand)
+
+
+def embed_chunks(texts: Sequence[str], embeddings) -> np.ndarray:
+    vectors = []
+    for start in range(0, len(texts), EMBED_BATCH_SIZE):
+        vectors.extend(embeddings.embed_documents(list(texts[start:start + EMBED_BATCH_SIZE])))
+    return np.asarray(vectors, dtype=np.float32)
+
+
+def build_hierarchical_retriever(texts: Sequence[str], provenance: List[Dict[str, Any]], embeddings,
+                                 vectors: Optional[np.ndarray] = None, **kwargs) -> HierarchicalRetriever:
+    """Build the two-level index (embedding the chunks unless vectors are given) and wrap it as a retriever"""
+    if vectors is None:
+        vectors = embed_chunks(texts, embeddings)
+    index = HierarchicalIndex(texts, provenance, vectors)
+    print(f"Hierarchical index: {len(index.sections)} sections over {len(texts)} chunks")
+    return HierarchicalRetriever(index=index, embeddings=embeddings, **kwargs)
@@ -0,0 +1,205 @@
+"""
+HTTP Transport for RAG Chatbot
+One pooled requests.Session for all scraping, with retries, size/content-type guards and per-host politeness
+"""
+
+import random
+import threading
+import time
+from typing import Dict, Any, Optional, Tuple
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64)'
+HTML_CONTENT_TYPES = ("text/html", "application/xhtml+xml")
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+DEFAULT_MAX_BYTES = 5 * 1024 * 1024
+READ_CHUNK_BYTES = 64 * 1024
+
+try:
+    import brotli  # noqa: F401  (lets urllib3 decode "br")
+    ACCEPT_ENCODING = "gzip, deflate, br"
+except ImportError:
+    ACCEPT_ENCODING = "gzip, deflate"
+
+
+class TransportError(Exception):
+    """A page that could not be fetched or was rejected by a guard"""
+
+
+class HostPolicy:
+    """
+    Politeness delay for one host. The delay follows the observed response time
+    (latency_factor x smoothed latency), doubles on every 429 and decays back afterwards.
+    """
+
+    def __init__(self, min_delay: float, max_delay: float, latency_factor: float):
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.latency_factor = latency_factor
+        self.delay = min_delay
+        self.latency: Optional[float] = None
+        self.next_allowed = 0.0
+        self.lock = threading.Lock()
+
+    def wait(self):
+        """Block until this host may be contacted again, reserving the next slot"""
+        with self.lock:
+            now = time.monotonic()
+            start = max(now, self.next_allowed)
+            self.next_allowed = start + self.delay
+        if start > now:
+            time.sleep(start - now)
+
+    def observe(self, seconds: float, throttled: bool = False, retry_after: Optional[float] = None):
+        with self.lock:
+            self.latency = seconds if self.latency is None else 0.8 * self.latency + 0.2 * seconds
+            target = max(self.min_delay, self.latency_factor * self.latency)
+            if throttled:
+                self.delay = max(self.delay * 2, target, retry_after or 0.0, 0.5)
+            else:
+                # Ease back towards the latency-based delay instead of dropping straight to it
+                self.delay = max(target, 0.75 * self.delay)
+            self.delay = min(self.delay, self.max_delay)
+
+
+class HttpTransport:
+    def __init__(self, pool_size: int = 10, timeout: float = 20, max_retries: int = 3,
+                 backoff_base: float = 0.5, max_bytes: int = DEFAULT_MAX_BYTES,
+                 allowed_content_types: Tuple[str, ...] = HTML_CONTENT_TYPES,
+                 min_delay: float = 0.0, max_delay: float = 30.0, latency_factor: float = 0.5,
+                 user_agent: str = DEFAULT_USER_AGENT):
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.max_bytes = max_bytes
+        self.allowed_content_types = allowed_content_types
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.latency_factor = latency_factor
+
+        self.session = requests.Session()
+        # Retries are done here (with jitter and Retry-After), not by urllib3
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({
+            "User-Agent": user_agent,
+            "Accept": "text/html,application/xhtml+xml;q=0.9,*/*;q=0.1",
+            "Accept-Encoding": ACCEPT_ENCODING
+        })
+
+        self._hosts: Dict[str, HostPolicy] = {}
+        self._lock = threading.Lock()
+        self.counters = {"requests": 0, "retries": 0, "throttled": 0, "rejected": 0, "bytes": 0}
+
+    def _count(self, name: str, amount: int = 1):
+        with self._lock:
+            self.counters[name] += amount
+
+    def host_policy(self, url: str) -> HostPolicy:
+        host = urlparse(url).netloc
+        with self._lock:
+            if host not in self._hosts:
+                self._hosts[host] = HostPolicy(self.min_delay, self.max_delay, self.latency_factor)
+            return self._hosts[host]
+
+    def _backoff(self, attempt: int, retry_after: Optional[float]) -> float:
+        if retry_after is not None:
+            return min(retry_after, self.max_delay)
+        # Full jitter: uniform in [0, base * 2^attempt]
+        return random.uniform(0, self.backoff_base * (2 ** attempt))
+
+    @staticmethod
+    def _retry_after(response: requests.Response) -> Optional[float]:
+        try:
+            return float(response.headers.get("Retry-After", ""))
+        except ValueError:
+            return None
+
+    def _read_body(self, response: requests.Response, url: str) -> bytes:
+        """Read at most max_bytes of the (decoded) body"""
+        declared = response.headers.get("Content-Length")
+        if declared and declared.isdigit() and int(declared) > self.max_bytes:
+            raise TransportError(f"{url} is {int(declared)} bytes (limit {self.max_bytes})")
+
+        body = bytearray()
+        for chunk in response.iter_content(READ_CHUNK_BYTES):
+            body.extend(chunk)
+            if len(body) > self.max_bytes:
+                raise TransportError(f"{url} exceeds {self.max_bytes} bytes")
+        return bytes(body)
+
+    def _check_content_type(self, response: requests.Response, url: str):
+        content_type = response.headers.get("Content-Type", "").split(";")[0].strip().lower()
+        # A missing header is let through; servers that omit it mostly serve HTML
+        if content_type and self.allowed_content_types and content_type not in self.allowed_content_types:
+            raise TransportError(f"{url} is {content_type}, not HTML")
+
+    def get(self, url: str) -> bytes:
+        """Fetch url and return the body, raising TransportError on failure or rejection"""
+        policy = self.host_policy(url)
+        last_error = None
+
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                self._count("retries")
+            policy.wait()
+            self._count("requests")
+            t0 = time.monotonic()
+            try:
+                with self.session.get(url, timeout=self.timeout, stream=True) as response:
+                    if response.status_code in RETRY_STATUSES:
+                        retry_after = self._retry_after(response)
+                        throttled = response.status_code == 429
+                        if throttled:
+                            self._count("throttled")
+                        policy.observe(time.monotonic() - t0, throttled, retry_after)
+                        last_error = TransportError(f"{url} returned HTTP {response.status_code}")
+                        if attempt < self.max_retries:
+                            time.sleep(self._backoff(attempt, retry_after))
+                        continue
+
+                    response.raise_for_status()
+                    try:
+                        self._check_content_type(response, url)
+                        body = self._read_body(response, url)
+                    except TransportError:
+                        self._count("rejected")
+                        raise
+                    policy.observe(time.monotonic() - t0)
+                    self._count("bytes", len(body))
+                    return body
+            except (requests.ConnectionError, requests.Timeout) as e:
+                policy.observe(time.monotonic() - t0)
+                last_error = TransportError(f"{url}: {e}")
+                if attempt < self.max_retries:
+                    time.sleep(self._backoff(attempt, None))
+            except requests.HTTPError as e:
+                raise TransportError(str(e)) from e
+
+        raise last_error
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.counters)
+            stats["host_delays"] = {host: round(policy.delay, 3) for host, policy in self._hosts.items()}
+        return stats
+
+    def close(self):
+        self.session.close()
+
+
+_shared_transport: Optional[HttpTransport] = None
+_shared_lock = threading.Lock()
+
+
+def shared_transport() -> HttpTransport:
+    """Process-wide transport, so every crawl reuses the same connection pool and host delays"""
+    global _shared_transport
+    with _shared_lock:
+        if _shared_transport is None:
+            _shared_transport = HttpTransport()
+        return _shared_transport
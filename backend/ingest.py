@@ -0,0 +1,382 @@
+"""
+Ingestion Engine for RAG Chatbot
+One pipeline for crawled websites, PDF directories and local HTML/Markdown/text trees
+"""
+
+import hashlib
+import json
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, List, Dict, Any, Optional, Set, Tuple
+
+from chunker import TokenChunker, split_provenance
+from chunk_store import ChunkStore
+from crawl_cache import CrawlCache
+from entities import has_entities
+from pdf_loader import iter_pdf_pages
+from scraper import WebsiteScraper, html_to_text
+from snapshots import SnapshotStore
+from text_quality import ChunkFilter, normalize_text
+
+DEFAULT_MAX_WORKERS = 4
+
+# A document is (source id used in provenance, path or URL, iterable of (page number, text))
+Document = Tuple[str, str, Iterable[Tuple[Any, str]]]
+# A partition is an independent unit of work; it reports progress as a 0-1 fraction
+Partition = Callable[[Callable[[float, str], None]], Iterator[Document]]
+
+
+class IngestSource:
+    """Base class for source adapters"""
+    kind = "source"
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def partitions(self) -> List[Partition]:
+        """Split the source into units that can run on separate workers"""
+        raise NotImplementedError
+
+    def describe(self) -> Dict[str, Any]:
+        return {"type": self.kind, "name": self.name}
+
+
+class WebSource(IngestSource):
+    """Crawls one site; every page becomes its own document"""
+    kind = "web"
+
+    def __init__(self, url: str, max_pages: Optional[int] = 50, stop_check=None, cache_path: Optional[str] = None,
+                 large_crawl: bool = False):
+        super().__init__(url)
+        self.url = url
+        self.max_pages = max_pages
+        self.stop_check = stop_check
+        self.cache_path = cache_path
+        self.large_crawl = large_crawl
+
+    def partitions(self) -> List[Partition]:
+        def crawl(progress):
+            scraper = WebsiteScraper(max_pages=self.max_pages, cache_path=self.cache_path,
+                                     large_crawl=self.large_crawl)
+            pages = scraper.crawl_pages(self.url, lambda percent, message: progress(percent / 100, message), self.stop_check)
+            for page_url, page_text in pages:
+                yield page_url, page_url, [(None, page_text)]
+        return [crawl]
+
+
+class CachedCrawlSource(IngestSource):
+    """Pages of an earlier crawl read back from the crawl cache, with no network access"""
+    kind = "web"
+
+    def __init__(self, url: str, cache_path: str = "../crawl_cache.sqlite"):
+        super().__init__(url)
+        self.url = url
+        self.cache_path = cache_path
+
+    def partitions(self) -> List[Partition]:
+        def replay(progress):
+            cache = CrawlCache(self.cache_path)
+            try:
+                for page_url, content in cache.iter_pages(self.url):
+                    yield page_url, page_url, [(None, html_to_text(content))]
+            finally:
+                cache.close()
+            progress(1.0, f"Replayed cached crawl of {self.url}")
+        return [replay]
+
+
+class PDFDirectorySource(IngestSource):
+    """Every *.pdf in a directory, one partition per file"""
+    kind = "pdf"
+
+    def __init__(self, pdf_dir: str, only: Optional[List[str]] = None):
+        super().__init__(str(pdf_dir))
+        self.pdf_dir = Path(pdf_dir)
+        # Restrict to these paths (incremental runs); None means every PDF
+        self.only = set(only) if only is not None else None
+
+    def files(self) -> List[Path]:
+        files = sorted(self.pdf_dir.glob("*.pdf"))
+        if self.only is not None:
+            files = [f for f in files if str(f) in self.only]
+        return files
+
+    def partitions(self) -> List[Partition]:
+        def read(pdf_file):
+            def run(progress):
+                yield pdf_file.name, str(pdf_file), iter_pdf_pages(pdf_file, progress)
+            return run
+        return [read(pdf_file) for pdf_file in self.files()]
+
+
+class LocalDocumentSource(IngestSource):
+    """HTML, Markdown and plain-text files under a directory tree"""
+    kind = "local"
+    EXTENSIONS = {".html", ".htm", ".md", ".markdown", ".txt"}
+
+    def __init__(self, root: str):
+        super().__init__(str(root))
+        self.root = Path(root)
+
+    def files(self) -> List[Path]:
+        return sorted(p for p in self.root.rglob("*") if p.is_file() and p.suffix.lower() in self.EXTENSIONS)
+
+    def partitions(self) -> List[Partition]:
+        def read(path):
+            def run(progress):
+                raw = path.read_text(encoding='utf-8', errors='ignore')
+                if path.suffix.lower() in {".html", ".htm"}:
+                    text = html_to_text(raw)
+                else:
+                    text = normalize_text(raw, keep_paragraphs=True)
+                progress(1.0, f"Read {path.name}")
+                yield str(path.relative_to(self.root)), str(path), [(None, text)]
+            return run
+        return [read(path) for path in self.files()]
+
+
+class IngestEngine:
+    """
+    Runs every source partition on one shared worker pool and merges the chunks.
+    Low-value chunks are dropped before they reach the chunk store (and so the
+    embedder) unless filter_chunks is False.
+    """
+
+    def __init__(self, sources: List[IngestSource], max_workers: int = DEFAULT_MAX_WORKERS,
+                 progress_callback=None, chunker: Optional[TokenChunker] = None,
+                 chunk_filter: Optional[ChunkFilter] = None, filter_chunks: bool = True):
+        self.sources = sources
+        self.max_workers = max_workers
+        self.progress_callback = progress_callback
+        self.chunker = chunker or TokenChunker()
+        # A short "Contact us at ..." chunk is exactly what the entity index needs, so the default keeps those
+        self.chunk_filter = (chunk_filter or ChunkFilter(keep_if=has_entities)) if filter_chunks else None
+        self._lock = threading.Lock()
+        self._progress: Dict[int, float] = {}
+        self._total = 1
+
+    def _report(self, index: int, fraction: float, message: str):
+        if not self.progress_callback:
+            return
+        with self._lock:
+            self._progress[index] = min(max(fraction, 0.0), 1.0)
+            overall = sum(self._progress.values()) / self._total
+        self.progress_callback(overall, message)
+
+    def _run_partition(self, index: int, partition: Partition,
+                       emit: Callable[[Dict[str, Any]], Any]) -> List[Dict[str, Any]]:
+        """Chunk every document a partition produces, handing each kept record to emit; returns document stats"""
+        documents = []
+        progress = lambda fraction, message: self._report(index, fraction, message)
+
+        for doc_id, location, pages in partition(progress):
+            # Files are stat'ed before their pages are read, so the manifest describes the version that was chunked
+            path = Path(location)
+            stat = path.stat() if path.is_file() else None
+            characters = 0
+            content_hash = hashlib.sha256()
+
+            def counted(pages=pages):
+                nonlocal characters
+                for page_number, text in pages:
+                    characters += len(text)
+                    content_hash.update(text.encode('utf-8', errors='ignore'))
+                    yield page_number, text
+
+            produced = kept = 0
+            for record in self.chunker.chunk_stream(counted(), source=doc_id):
+                produced += 1
+                if self.chunk_filter and not self.chunk_filter.accept(record):
+                    continue
+                emit(record)
+                kept += 1
+            document = {
+                "source": doc_id,
+                "path": location,
+                "characters": characters,
+                "chunks": kept,
+                "dropped_chunks": produced - kept,
+                "content_hash": content_hash.hexdigest()
+            }
+            if stat is not None:
+                document.update(file_size=stat.st_size, file_mtime=stat.st_mtime)
+            documents.append(document)
+
+        self._report(index, 1.0, "Partition complete")
+        return documents
+
+    def _spool_partition(self, index: int, partition: Partition, spool_dir: Path) -> Tuple[Path, List[Dict[str, Any]]]:
+        path = spool_dir / f"{index}.jsonl"
+        with open(path, 'w', encoding='utf-8') as f:
+            documents = self._run_partition(
+                index, partition, lambda record: f.write(json.dumps(record, ensure_ascii=False) + "\n"))
+        return path, documents
+
+    def run(self, store: Optional[ChunkStore] = None) -> Dict[str, Any]:
+        """
+        Ingest all sources. Without a store, returns chunks, provenance and metadata in
+        memory. With one, chunks are written to it as they are produced and only the
+        metadata is returned, so memory doesn't grow with the corpus.
+        """
+        jobs = [(source, partition) for source in self.sources for partition in source.partitions()]
+        self._total = max(len(jobs), 1)
+        print(f"Ingesting {len(self.sources)} sources as {len(jobs)} partitions on {self.max_workers} workers")
+        source_stats = {id(source): {**source.describe(), "documents": []} for source in self.sources}
+
+        if store is None:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                futures = []
+                for i, (_, partition) in enumerate(jobs):
+                    records: List[Dict[str, Any]] = []
+                    futures.append((records, pool.submit(self._run_partition, i, partition, records.append)))
+                # Results are merged in submission order so output is deterministic
+                results = [(records, future.result()) for records, future in futures]
+
+            all_records = []
+            for (source, _), (records, documents) in zip(jobs, results):
+                self._assign_chunk_ranges(documents, len(all_records))
+                all_records.extend(records)
+                source_stats[id(source)]["documents"].extend(documents)
+            chunks, provenance = split_provenance(all_records)
+            metadata = self._build_metadata(len(chunks), list(source_stats.values()))
+            self._log_filter(metadata)
+            return {"chunks": chunks, "provenance": provenance, "metadata": metadata}
+
+        metadata: Dict[str, Any] = {}
+        with store.writer(metadata) as writer:
+            spool_dir = Path(tempfile.mkdtemp(prefix=".ingest-", dir=store.output_dir))
+            try:
+                with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                    # The first partition writes straight into the store; the others spool to disk
+                    # until it is their turn, so chunk IDs follow submission order
+                    futures = [pool.submit(self._run_partition, 0, partition,
+                                           lambda record: writer.add(record["text"], record))
+                               if i == 0 else pool.submit(self._spool_partition, i, partition, spool_dir)
+                               for i, (_, partition) in enumerate(jobs)]
+                    try:
+                        for i, ((source, _), future) in enumerate(zip(jobs, futures)):
+                            start = len(writer)
+                            if i == 0:
+                                documents = future.result()
+                            else:
+                                path, documents = future.result()
+                                with open(path, 'r', encoding='utf-8') as f:
+                                    writer.add_records(json.loads(line) for line in f)
+                                path.unlink()
+                            self._assign_chunk_ranges(documents, start)
+                            source_stats[id(source)]["documents"].extend(documents)
+                    except BaseException:
+                        for future in futures:
+                            future.cancel()
+                        raise
+            finally:
+                shutil.rmtree(spool_dir, ignore_errors=True)
+            metadata.update(self._build_metadata(len(writer), list(source_stats.values())))
+            self._log_filter(metadata)
+        return {"metadata": metadata}
+
+    @staticmethod
+    def _assign_chunk_ranges(documents: List[Dict[str, Any]], start: int):
+        for document in documents:
+            # Chunk ID range [chunk_start, chunk_end) this document owns
+            document["chunk_start"] = start
+            document["chunk_end"] = start + document["chunks"]
+            start = document["chunk_end"]
+
+    def _log_filter(self, metadata: Dict[str, Any]):
+        if self.chunk_filter:
+            metadata["chunk_filter"] = self.chunk_filter.stats()
+            print(f"Chunk filter: kept {metadata['chunk_filter']['kept']}, "
+                  f"dropped {metadata['chunk_filter']['dropped']} {metadata['chunk_filter']['reasons']}")
+
+    @staticmethod
+    def _build_metadata(chunk_count: int, sources: List[Dict[str, Any]]) -> Dict[str, Any]:
+        metadata = {
+            "processing_date": datetime.now().isoformat(),
+            "sources": sources,
+            "total_chunks": chunk_count,
+            "total_characters": sum(d["characters"] for s in sources for d in s["documents"])
+        }
+
+        # Keys older readers (chunk_loader, freshness check) look for
+        web_sources = [s for s in sources if s["type"] == "web"]
+        if len(web_sources) == 1:
+            metadata["source_url"] = web_sources[0]["name"]
+        pdf_documents = [d for s in sources if s["type"] == "pdf" for d in s["documents"] if d["characters"]]
+        if pdf_documents:
+            metadata["pdf_files"] = [
+                {"filename": d["source"], "path": d["path"], "characters": d["characters"]}
+                for d in pdf_documents
+            ]
+        return metadata
+
+
+def merge_results(previous: Dict[str, Any], fresh: Dict[str, Any], keep_paths: Set[str],
+                  store: Optional[ChunkStore] = None) -> Dict[str, Any]:
+    """
+    Combine a previous ingest with a partial re-ingest: documents in keep_paths
+    reuse their stored chunks (by chunk ID range), everything else comes from fresh.
+    With a store the merged chunks are written to it and only the metadata is returned.
+    "carried" lists the reused ranges as (new chunk ID, previous chunk ID, count), so
+    their vectors can be copied from the previous index instead of re-embedded.
+    """
+    sources: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    carried: List[Tuple[int, int, int]] = []
+    documents = [(previous, document, source) for source in previous["metadata"].get("sources", [])
+                 for document in source["documents"] if document["path"] in keep_paths]
+    documents += [(fresh, document, source) for source in fresh["metadata"].get("sources", [])
+                  for document in source["documents"]]
+
+    def merged() -> Iterator[Tuple[str, Dict[str, Any]]]:
+        count = 0
+        for result, document, source in documents:
+            key = (source["type"], source["name"])
+            if key not in sources:
+                sources[key] = {k: v for k, v in source.items() if k != "documents"}
+                sources[key]["documents"] = []
+            start, end = document["chunk_start"], document["chunk_end"]
+            document = dict(document, chunk_start=count, chunk_end=count + (end - start))
+            if result is previous:
+                # Read in an earlier run; the manifest fingerprints it as of the diff that kept it
+                document.pop("file_size", None)
+                document.pop("file_mtime", None)
+                if end > start:
+                    carried.append((count, start, end - start))
+            sources[key]["documents"].append(document)
+            count += end - start
+            for i in range(start, end):
+                yield result["chunks"][i], result["provenance"][i]
+
+    if store is None:
+        pairs = list(merged())
+        metadata = IngestEngine._build_metadata(len(pairs), list(sources.values()))
+        return {"chunks": [text for text, _ in pairs], "provenance": [record for _, record in pairs],
+                "metadata": metadata, "carried": carried}
+
+    metadata: Dict[str, Any] = {}
+    with store.writer(metadata) as writer:
+        for text, record in merged():
+            writer.add(text, record)
+        metadata.update(IngestEngine._build_metadata(len(writer), list(sources.values())))
+    return {"metadata": metadata, "carried": carried}
+
+
+def ingest(sources: List[IngestSource], output_dir: str = "../processed_data",
+           max_workers: int = DEFAULT_MAX_WORKERS, progress_callback=None,
+           embeddings=None, embedding_model: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Convenience function to ingest sources into a new snapshot of output_dir and publish
+    it; returns the metadata. With embeddings the shared index (INDEX_MODE=mmap) is
+    built into the snapshot before it is published.
+    """
+    with SnapshotStore(output_dir).build() as snapshot_dir:
+        result = IngestEngine(sources, max_workers, progress_callback).run(ChunkStore(str(snapshot_dir)))
+        if embeddings is not None:
+            from shared_index import build_shared_index
+
+            build_shared_index(str(snapshot_dir), embeddings, embedding_model)
+    return result
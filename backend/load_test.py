@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Load Test for RAG Chatbot
+Drives N concurrent simulated Streamlit sessions through the query path against a fake Gemini endpoint
+"""
+
+import argparse
+import gc
+import json
+import os
+import threading
+import time
+from typing import List, Dict, Any
+
+from fake_gemini import FakeGeminiServer
+from metrics import percentile
+
+DEFAULT_QUESTIONS = [
+    "What skills are listed?",
+    "Which certifications are mentioned?",
+    "Tell me about the projects",
+    "What is the education background?",
+    "How can I get in touch?"
+]
+
+
+def current_rss_bytes() -> int:
+    """Resident memory of this process (0 if it can't be measured on this platform)"""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return 0
+
+
+class SimulatedSession:
+    """One browser tab: its own AppTest instance, hence its own st.session_state"""
+
+    def __init__(self, app_path: str, index: int, timeout: float):
+        from streamlit.testing.v1 import AppTest
+
+        self.index = index
+        self.app = AppTest.from_file(app_path, default_timeout=timeout)
+        self.latencies: List[float] = []
+        self.errors = 0
+        self.keys_seen = set()
+
+    def open(self):
+        self.app.run()
+        # Sessions normally become "processed" after a scrape; the data is already on disk here
+        self.app.session_state["processed"] = True
+
+    def ask(self, question: str):
+        t0 = time.perf_counter()
+        self.app.text_input(key="user_input_box").set_value(question)
+        # The send button; a "Show older messages" button may precede it in long sessions
+        send = next(button for button in self.app.button if button.label == "✈️")
+        send.click().run()
+        self.latencies.append((time.perf_counter() - t0) * 1000)
+
+        last = self.app.session_state["messages"][-1]["text"]
+        if last.startswith("⚠️"):
+            self.errors += 1
+        self.keys_seen.add(self.app.session_state["current_key_index"])
+
+
+def run_load_test(sessions: int, questions_per_session: int, latency_ms: float, jitter_ms: float,
+                  rate_limit_prob: float, app_path: str = "app.py", timeout: float = 120) -> Dict[str, Any]:
+    server = FakeGeminiServer(latency_ms=latency_ms, jitter_ms=jitter_ms, rate_limit_prob=rate_limit_prob).start()
+    os.environ["GEMINI_API_ENDPOINT"] = server.endpoint
+
+    try:
+        # Open one session first so model loading and index building aren't counted per session
+        warmup = SimulatedSession(app_path, -1, timeout)
+        warmup.open()
+        del warmup
+        gc.collect()
+
+        baseline_rss = current_rss_bytes()
+        simulated = [SimulatedSession(app_path, i, timeout) for i in range(sessions)]
+        for session in simulated:
+            session.open()
+        gc.collect()
+        per_session_bytes = (current_rss_bytes() - baseline_rss) / sessions if sessions else 0
+
+        def drive(session: SimulatedSession):
+            for q in range(questions_per_session):
+                session.ask(DEFAULT_QUESTIONS[(session.index + q) % len(DEFAULT_QUESTIONS)])
+
+        threads = [threading.Thread(target=drive, args=(s,)) for s in simulated]
+        t0 = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall = time.perf_counter() - t0
+
+        latencies = [ms for s in simulated for ms in s.latencies]
+        server_stats = server.stats.snapshot()
+        return {
+            "sessions": sessions,
+            "queries": len(latencies),
+            "wall_s": wall,
+            "throughput_qps": len(latencies) / wall if wall else 0.0,
+            "p50_ms": percentile(latencies, 50),
+            "p95_ms": percentile(latencies, 95),
+            "p99_ms": percentile(latencies, 99),
+            "errors": sum(s.errors for s in simulated),
+            "per_session_rss_mb": per_session_bytes / 1e6,
+            "final_rss_mb": current_rss_bytes() / 1e6,
+            # Contention: API_KEYS index is per session but GOOGLE_API_KEY and the
+            # cached chain are process-wide, so one session's 429 moves everyone
+            "sessions_that_switched_keys": sum(1 for s in simulated if len(s.keys_seen) > 1),
+            "server": server_stats
+        }
+    finally:
+        server.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent-session load test against a fake Gemini endpoint")
+    parser.add_argument("--sessions", type=int, default=10)
+    parser.add_argument("--questions", type=int, default=5, help="questions per session")
+    parser.add_argument("--latency-ms", type=float, default=800, help="mean fake LLM latency")
+    parser.add_argument("--jitter-ms", type=float, default=200, help="latency standard deviation")
+    parser.add_argument("--rate-limit-prob", type=float, default=0.05, help="probability of a 429 per call")
+    parser.add_argument("--app", default="app.py")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    args = parser.parse_args()
+
+    print("Load Test")
+    print("=" * 50)
+    results = run_load_test(args.sessions, args.questions, args.latency_ms, args.jitter_ms,
+                            args.rate_limit_prob, args.app)
+
+    for key, value in results.items():
+        if isinstance(value, float):
+            print(f"   {key}: {value:.2f}")
+        else:
+            print(f"   {key}: {value}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
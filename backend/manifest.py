@@ -0,0 +1,122 @@
+"""
+Source Manifest for RAG Chatbot
+Per-source size, mtime, content hash and chunk ID range, so freshness checks never read chunk data
+"""
+
+import hashlib
+import json
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple
+
+MANIFEST_FILE = "manifest.json"
+MANIFEST_VERSION = 1
+
+
+def file_sha256(path: Path, block_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def file_fingerprint(path: Path, previous: Optional[Dict[str, Any]] = None,
+                     read_stat: Optional[Tuple[int, float]] = None) -> Dict[str, Any]:
+    """
+    Size, mtime and hash as of read_stat, the (size, mtime) the file had when it was
+    read (default: now). The hash of a previous entry with the same size and mtime is
+    reused; a file modified since it was read gets no hash, so the next diff sees it
+    as changed.
+    """
+    stat = path.stat()
+    size, mtime = read_stat if read_stat else (stat.st_size, stat.st_mtime)
+    if previous and previous.get("sha256") and size == previous.get("size") and mtime == previous.get("mtime"):
+        sha256 = previous["sha256"]
+    elif (size, mtime) == (stat.st_size, stat.st_mtime):
+        sha256 = file_sha256(path)
+    else:
+        sha256 = None
+    return {"size": size, "mtime": mtime, "sha256": sha256}
+
+
+class SourceManifest:
+    def __init__(self, output_dir: str = "../processed_data"):
+        self.path = Path(output_dir) / MANIFEST_FILE
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.dirty = False
+
+    def exists(self) -> bool:
+        return self.path.exists()
+
+    def load(self) -> "SourceManifest":
+        with open(self.path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get("version") != MANIFEST_VERSION:
+            raise ValueError(f"Unsupported manifest version: {data.get('version')}")
+        self.entries = data["sources"]
+        return self
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump({"version": MANIFEST_VERSION, "sources": self.entries}, f, indent=2)
+        self.dirty = False
+
+    def build(self, metadata: Dict[str, Any], previous: Optional["SourceManifest"] = None) -> "SourceManifest":
+        """Record every ingested document; local files also get a file fingerprint as of when they were read"""
+        self.entries = {}
+        for source in metadata.get("sources", []):
+            for document in source["documents"]:
+                entry = {
+                    "type": source["type"],
+                    "source": document["source"],
+                    "content_hash": document.get("content_hash"),
+                    "chunk_start": document["chunk_start"],
+                    "chunk_end": document["chunk_end"]
+                }
+                path = Path(document["path"])
+                if source["type"] != "web" and path.is_file():
+                    read_stat = (document["file_size"], document["file_mtime"]) if "file_size" in document else None
+                    entry.update(file_fingerprint(path, previous.entries.get(document["path"]) if previous else None,
+                                                  read_stat))
+                self.entries[document["path"]] = entry
+        self.dirty = True
+        return self
+
+    def diff(self, paths: List[Path], source_type: str) -> Dict[str, List[str]]:
+        """
+        Compare files on disk against the manifest entries of one source type.
+        Size/mtime match is trusted; otherwise the file hash decides, and a
+        hash match just refreshes the stored mtime.
+        """
+        changes = {"added": [], "changed": [], "deleted": [], "unchanged": []}
+        current = {str(p): p for p in paths}
+
+        for key, path in current.items():
+            entry = self.entries.get(key)
+            if entry is None or entry.get("type") != source_type:
+                changes["added"].append(key)
+                continue
+            stat = path.stat()
+            if stat.st_size == entry.get("size") and stat.st_mtime == entry.get("mtime"):
+                changes["unchanged"].append(key)
+            elif stat.st_size == entry.get("size") and file_sha256(path) == entry.get("sha256"):
+                entry["mtime"] = stat.st_mtime
+                self.dirty = True
+                changes["unchanged"].append(key)
+            else:
+                changes["changed"].append(key)
+
+        for key, entry in self.entries.items():
+            if entry.get("type") == source_type and key not in current:
+                changes["deleted"].append(key)
+
+        return changes
+
+    def chunk_range(self, key: str) -> Optional[range]:
+        entry = self.entries.get(key)
+        return range(entry["chunk_start"], entry["chunk_end"]) if entry else None
+
+
+def has_changes(changes: Dict[str, List[str]]) -> bool:
+    return bool(changes["added"] or changes["changed"] or changes["deleted"])
@@ -0,0 +1,17 @@
+"""
+Metrics Helpers for RAG Chatbot
+Small statistics shared by the serving code and the benchmark scripts
+"""
+
+from typing import Sequence
+
+
+def percentile(values: Sequence[float], pct: float) -> float:
+    """Linearly interpolated percentile (pct in 0-100); 0.0 for no values"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
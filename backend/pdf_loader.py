@@ -1,60 +1,41 @@
 from pathlib import Path
+from typing import Iterator, Tuple
 from PyPDF2 import PdfReader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+from text_quality import normalize_text
 
-def load_pdfs(pdf_dir: str, progress_callback=None):
+def iter_pdf_pages(file: Path, progress_callback=None) -> Iterator[Tuple[int, str]]:
     """
-    Load PDFs with optimized chunking for faster processing
+    Yield (page number, text) one page at a time so only the current page is held in memory
     """
-    all_texts = []
-    pdf_path = Path(pdf_dir)
+    reader = PdfReader(file)
+    page_count = len(reader.pages)
 
-    pdf_files = list(pdf_path.glob("*.pdf"))
-    print(f"DEBUG: Found {len(pdf_files)} PDF files in {pdf_dir}")
-
-    if not pdf_files:
-        print("DEBUG: No PDF files found!")
-        return []
-
-    for i, file in enumerate(pdf_files):
-        print(f"DEBUG: Processing file: {file.name}")
-        reader = PdfReader(file)
-        text = ""
-
-        
-        for page_num, page in enumerate(reader.pages):
-            page_text = page.extract_text()
+    for page_num in range(page_count):
+        try:
+            page_text = normalize_text(reader.pages[page_num].extract_text() or "", keep_paragraphs=True)
             print(f"DEBUG: Page {page_num + 1} extracted {len(page_text)} characters")
-            if page_text.strip():  
-                text += page_text + "\n"
-
-        print(f"DEBUG: Total text extracted from {file.name}: {len(text)} characters")
-        if text.strip():  
-            all_texts.append(text.strip())
-            print(f"DEBUG: Added text from {file.name} to processing list")
-        else:
-            print(f"DEBUG: No text extracted from {file.name}")
+            if page_text:
+                yield page_num + 1, page_text
+        except Exception as e:
+            print(f"DEBUG: Page {page_num + 1}: Error extracting text - {e}")
+        finally:
+            if progress_callback:
+                progress_callback((page_num + 1) / page_count, f"Processing {file.name} (page {page_num + 1}/{page_count})...")
 
-        if progress_callback:
-            progress_callback((i + 1) / len(pdf_files), f"Processing {file.name}...")
-
-    print(f"DEBUG: Total documents to chunk: {len(all_texts)}")
+def load_pdfs(pdf_dir: str, progress_callback=None):
+    """
+    Load PDFs with optimized chunking for faster processing
+    """
+    from ingest import IngestEngine, PDFDirectorySource
 
-    
-    splitter = RecursiveCharacterTextSplitter(
-        chunk_size=600,  
-        chunk_overlap=100,  
-        separators=["\n\n", "\n", ". ", ": ", " ", ""]  
-    )
+    result = IngestEngine([PDFDirectorySource(pdf_dir)], progress_callback=progress_callback).run()
+    chunks = result["chunks"]
 
-    chunks = []
-    for doc in all_texts:
-        doc_chunks = splitter.split_text(doc)
-        print(f"DEBUG: Document split into {len(doc_chunks)} chunks")
-        chunks.extend(doc_chunks)
+    if not chunks:
+        print("DEBUG: No text extracted from any PDF!")
+        return []
 
     print(f"DEBUG: Total chunks created: {len(chunks)}")
-    if chunks:
-        print(f"DEBUG: First chunk preview: {chunks[0][:200]}...")
+    print(f"DEBUG: First chunk preview: {chunks[0][:200]}...")
 
     return chunks
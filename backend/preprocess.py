@@ -4,137 +4,119 @@ PDF Preprocessing Script for RAG Chatbot
 Processes PDFs once and saves chunks to disk for faster loading
 """
 
-import os
+import sys
 import json
 import pickle
 from pathlib import Path
-from typing import List, Dict, Any
-from PyPDF2 import PdfReader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from datetime import datetime
+from typing import List, Dict, Any, Iterator, Optional, Tuple
+from chunk_store import ChunkStore, MmapChunks, read_metadata, read_provenance, stored_chunks_file
+from ingest import IngestEngine, PDFDirectorySource, merge_results
+from manifest import SourceManifest, has_changes
+from pdf_loader import iter_pdf_pages
+from snapshots import SnapshotStore
 
 class PDFProcessor:
-    def __init__(self, pdf_dir: str = "../pdfs", output_dir: str = "../processed_data"):
+    def __init__(self, pdf_dir: str = "../pdfs", output_dir: str = "../processed_data", max_workers: int = 4,
+                 write_json: bool = False, embeddings=None, embedding_model: Optional[str] = None):
         self.pdf_dir = Path(pdf_dir)
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(exist_ok=True)
+        self.max_workers = max_workers
+        # Also write the whole corpus to chunks.json, for reading and debugging
+        self.write_json = write_json
+        # Builds the shared index (INDEX_MODE=mmap) into every new snapshot
+        self.embeddings = embeddings
+        self.embedding_model = embedding_model
+        self.snapshots = SnapshotStore(output_dir)
+        self._manifest: Optional[SourceManifest] = None
+
+    @property
+    def data_dir(self) -> Path:
+        """The current snapshot, which is what readers see"""
+        return self.snapshots.current()
+
+    def iter_pages(self, pdf_path: Path, progress_callback=None) -> Iterator[Tuple[int, str]]:
+        """Yield (page number, text) pairs from a single PDF file, one page at a time"""
+        print(f"[PDF] Processing: {pdf_path.name}")
+        return iter_pdf_pages(pdf_path, progress_callback)
 
-        
-        self.splitter = RecursiveCharacterTextSplitter(
-            chunk_size=600,
-            chunk_overlap=100,
-            separators=["\n\n", "\n", ". ", ": ", " ", ""]
-        )
+    def extract_pages(self, pdf_path: Path) -> List[Tuple[int, str]]:
+        """Extract (page number, text) pairs from a single PDF file"""
+        return list(self.iter_pages(pdf_path))
 
     def extract_text_from_pdf(self, pdf_path: Path) -> str:
         """Extract text from a single PDF file"""
-        print(f"[PDF] Processing: {pdf_path.name}")
-
-        reader = PdfReader(pdf_path)
-        text = ""
-
-        for page_num, page in enumerate(reader.pages):
-            try:
-                page_text = page.extract_text()
-                if page_text and page_text.strip():
-                    # Handle encoding issues
-                    try:
-                        page_text = page_text.encode('utf-8', errors='ignore').decode('utf-8')
-                    except:
-                        page_text = page_text.encode('latin-1', errors='ignore').decode('utf-8', errors='ignore')
-                    text += page_text + "\n"
-                print(f"  Page {page_num + 1}: {len(page_text) if page_text else 0} characters")
-            except Exception as e:
-                print(f"  Page {page_num + 1}: Error extracting text - {e}")
-                continue
-
-        return text.strip()
+        return "\n".join(text for _, text in self.extract_pages(pdf_path)).strip()
 
-    def process_all_pdfs(self) -> Dict[str, Any]:
-        """Process all PDFs in the directory"""
+    def process_all_pdfs(self, progress_callback=None, store: Optional[ChunkStore] = None) -> Dict[str, Any]:
+        """
+        Process all PDFs in the directory through the shared ingestion engine. With a
+        store the chunks are streamed into it and only the metadata is returned.
+        """
         print("Scanning for PDF files...")
 
-        pdf_files = list(self.pdf_dir.glob("*.pdf"))
+        source = PDFDirectorySource(self.pdf_dir)
+        pdf_files = source.files()
         print(f"Found {len(pdf_files)} PDF files")
 
         if not pdf_files:
             raise FileNotFoundError(f"No PDF files found in {self.pdf_dir}")
 
-        all_texts = []
-        metadata = {
-            "processing_date": datetime.now().isoformat(),
-            "pdf_files": [],
-            "total_chunks": 0,
-            "total_characters": 0
-        }
-
-        
-        for pdf_file in pdf_files:
-            print(f"\nProcessing {pdf_file.name}...")
-            text = self.extract_text_from_pdf(pdf_file)
-
-            if text:
-                all_texts.append(text)
-                metadata["pdf_files"].append({
-                    "filename": pdf_file.name,
-                    "path": str(pdf_file),
-                    "characters": len(text)
-                })
-                metadata["total_characters"] += len(text)
-            else:
-                print(f"Warning: No text extracted from {pdf_file.name}")
+        result = IngestEngine([source], self.max_workers, progress_callback).run(store)
 
-        if not all_texts:
+        if not result["metadata"]["total_chunks"]:
             raise ValueError("No text could be extracted from any PDF files")
 
-        
-        print("\nCreating text chunks...")
-        all_chunks = []
-        for text in all_texts:
-            chunks = self.splitter.split_text(text)
-            all_chunks.extend(chunks)
-            print(f"  Created {len(chunks)} chunks from document")
-
-        metadata["total_chunks"] = len(all_chunks)
+        for document in result["metadata"]["sources"][0]["documents"]:
+            if document["characters"]:
+                print(f"  Created {document['chunks']} chunks from {document['source']}")
+            else:
+                print(f"Warning: No text extracted from {document['source']}")
 
         print(f"\nProcessing complete!")
-        print(f"   Total chunks: {len(all_chunks)}")
-        print(f"   Total characters: {metadata['total_characters']}")
-
-        return {
-            "chunks": all_chunks,
-            "metadata": metadata
-        }
-
-    def save_chunks(self, chunks: List[str], metadata: Dict[str, Any]):
-        """Save chunks and metadata to disk"""
-        
-        chunks_file = self.output_dir / "chunks.json"
-        with open(chunks_file, 'w', encoding='utf-8') as f:
-            json.dump({
-                "chunks": chunks,
-                "metadata": metadata
-            }, f, indent=2, ensure_ascii=False)
+        print(f"   Total chunks: {result['metadata']['total_chunks']}")
+        print(f"   Total characters: {result['metadata']['total_characters']}")
 
-        
-        pickle_file = self.output_dir / "chunks.pkl"
-        with open(pickle_file, 'wb') as f:
-            pickle.dump({
-                "chunks": chunks,
-                "metadata": metadata
-            }, f)
+        return result
+
+    def save_chunks(self, chunks: List[str], metadata: Dict[str, Any],
+                    provenance: Optional[List[Dict[str, Any]]] = None):
+        """Save chunks, their provenance and metadata as a new snapshot and make it current"""
+        with self.snapshots.build() as snapshot_dir:
+            ChunkStore(str(snapshot_dir), write_json=self.write_json).save(chunks, metadata, provenance)
+
+    def update(self, force: bool = False, progress_callback=None) -> Dict[str, Any]:
+        """
+        Ingest straight into a new snapshot and make it current: every PDF with force,
+        otherwise only what changed. Returns the metadata.
+        """
+        with self.snapshots.build() as snapshot_dir:
+            store = ChunkStore(str(snapshot_dir), write_json=self.write_json, previous_manifest=self.current_manifest())
+            if force:
+                result = self.process_all_pdfs(progress_callback, store)
+            else:
+                result = self.process_changes(progress_callback, store)
+            if self.embeddings is not None:
+                from shared_index import build_shared_index
 
-        print(f"Chunks saved to:")
-        print(f"   JSON: {chunks_file}")
-        print(f"   Pickle: {pickle_file}")
+                # Unchanged PDFs keep their vectors; only new and changed chunks are embedded
+                build_shared_index(str(snapshot_dir), self.embeddings, self.embedding_model,
+                                   previous_dir=result.get("previous_dir"), carried=result.get("carried"))
+        return result
 
     def load_chunks(self) -> Dict[str, Any]:
-        """Load pre-processed chunks from disk"""
-        pickle_file = self.output_dir / "chunks.pkl"
-        json_file = self.output_dir / "chunks.json"
-
-        
-        if pickle_file.exists():
+        """Load pre-processed chunks from disk; chunk texts of the current layout are read lazily from the mmap store"""
+        pickle_file = self.data_dir / "chunks.pkl"
+        json_file = self.data_dir / "chunks.json"
+
+        metadata = read_metadata(str(self.data_dir))
+        if metadata is not None and MmapChunks.available(str(self.data_dir)):
+            print(f"Loading chunks from the chunk store: {self.data_dir}")
+            data = {"chunks": MmapChunks(str(self.data_dir)), "metadata": metadata}
+            provenance = read_provenance(str(self.data_dir))
+            if provenance is not None:
+                data["provenance"] = provenance
+        elif pickle_file.exists():
             print(f"Loading chunks from pickle: {pickle_file}")
             with open(pickle_file, 'rb') as f:
                 data = pickle.load(f)
@@ -143,64 +125,123 @@ class PDFProcessor:
             with open(json_file, 'r', encoding='utf-8') as f:
                 data = json.load(f)
         else:
-            raise FileNotFoundError(f"No processed chunks found in {self.output_dir}")
+            raise FileNotFoundError(f"No processed chunks found in {self.data_dir}")
 
         print(f"Loaded {data['metadata']['total_chunks']} chunks")
         return data
 
-    def is_processed_data_fresh(self) -> bool:
-        """Check if processed data exists and is up-to-date"""
-        pickle_file = self.output_dir / "chunks.pkl"
-        json_file = self.output_dir / "chunks.json"
+    def current_manifest(self) -> Optional[SourceManifest]:
+        """The current snapshot's manifest, loaded once per snapshot; None if there is no usable manifest"""
+        data_dir = self.data_dir
+        if self._manifest is None or self._manifest.path.parent != data_dir:
+            manifest = SourceManifest(str(data_dir))
+            if not manifest.exists():
+                return None
+            try:
+                manifest.load()
+            except Exception as e:
+                print(f"Warning: Could not read manifest: {e}")
+                return None
+            self._manifest = manifest
+        return self._manifest
+
+    def source_changes(self) -> Optional[Dict[str, List[str]]]:
+        """Diff the PDF directory against the manifest; None if there is no usable manifest"""
+        manifest = self.current_manifest()
+        if manifest is None:
+            return None
+        # Refreshed mtimes stay in memory: a published snapshot is never written to, and the
+        # next snapshot's manifest is built with them (see update)
+        return manifest.diff(PDFDirectorySource(self.pdf_dir).files(), "pdf")
 
-        if not (pickle_file.exists() or json_file.exists()):
+    def is_processed_data_fresh(self) -> bool:
+        """Check if processed data exists and is up-to-date (reads only the manifest)"""
+        if stored_chunks_file(str(self.data_dir)) is None:
             return False
 
-        
-        try:
-            data = self.load_chunks()
-            processing_date = datetime.fromisoformat(data['metadata']['processing_date'])
-
-            
-            for pdf_info in data['metadata']['pdf_files']:
-                pdf_path = Path(pdf_info['path'])
-                if pdf_path.exists() and pdf_path.stat().st_mtime > processing_date.timestamp():
-                    print(f"{pdf_path.name} has been modified since last processing")
-                    return False
-
-            return True
-        except Exception as e:
-            print(f"Warning: Error checking data freshness: {e}")
+        changes = self.source_changes()
+        if changes is None:
             return False
+        for kind in ("added", "changed", "deleted"):
+            for path in changes[kind]:
+                print(f"{Path(path).name} has been {kind} since last processing")
+        return not has_changes(changes)
+
+    def process_changes(self, progress_callback=None, store: Optional[ChunkStore] = None) -> Dict[str, Any]:
+        """Re-extract only added and changed PDFs; reuse stored chunks for the rest"""
+        changes = self.source_changes()
+        if changes is None:
+            print("No manifest found, processing every PDF")
+            return self.process_all_pdfs(progress_callback, store)
+
+        previous_dir = self.data_dir
+        try:
+            previous = self.load_chunks()
+        except FileNotFoundError:
+            return self.process_all_pdfs(progress_callback, store)
+        if "provenance" not in previous or "sources" not in previous["metadata"]:
+            print("Processed data predates the manifest, processing every PDF")
+            return self.process_all_pdfs(progress_callback, store)
+
+        to_extract = changes["added"] + changes["changed"]
+        print(f"Incremental update: {len(changes['added'])} added, {len(changes['changed'])} changed, "
+              f"{len(changes['deleted'])} deleted, {len(changes['unchanged'])} unchanged")
+
+        source = PDFDirectorySource(self.pdf_dir, only=to_extract)
+        fresh = IngestEngine([source], self.max_workers, progress_callback).run()
+        result = merge_results(previous, fresh, set(changes["unchanged"]), store)
+        result["previous_dir"] = str(previous_dir)
+
+        if not result["metadata"]["total_chunks"]:
+            raise ValueError("No text could be extracted from any PDF files")
+        return result
 
 def main():
     """Main function to run PDF preprocessing"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Preprocess the PDFs in ../pdfs into ../processed_data")
+    parser.add_argument("--force", action="store_true", help="reprocess every PDF even if nothing changed")
+    parser.add_argument("--json", action="store_true", help="also write every chunk to chunks.json for inspection")
+    parser.add_argument("--index", action="store_true", help="also build the shared vector index (INDEX_MODE=mmap)")
+    args = parser.parse_args()
+
     print("PDF Preprocessing Script")
     print("=" * 50)
 
-    processor = PDFProcessor()
+    embeddings, embedding_model = None, None
+    if args.index:
+        from langchain_community.embeddings import HuggingFaceEmbeddings
+
+        embedding_model = "sentence-transformers/all-MiniLM-L6-v2"
+        embeddings = HuggingFaceEmbeddings(model_name=embedding_model)
+    processor = PDFProcessor(write_json=args.json, embeddings=embeddings, embedding_model=embedding_model)
 
     try:
         
         if processor.is_processed_data_fresh():
             print("Processed data is up-to-date!")
-            choice = input("Reprocess anyway? (y/N): ").lower().strip()
+            # Only ask when someone is at the terminal; batch jobs never block here
+            if args.force:
+                choice = 'y'
+            elif sys.stdin.isatty():
+                choice = input("Reprocess anyway? (y/N): ").lower().strip()
+            else:
+                choice = 'n'
             if choice != 'y':
                 print("Loading existing processed data...")
                 data = processor.load_chunks()
-                print(f"Summary: {data['metadata']['total_chunks']} chunks from {len(data['metadata']['pdf_files'])} PDFs")
+                print(f"Summary: {data['metadata']['total_chunks']} chunks from {len(data['metadata'].get('pdf_files', []))} PDFs")
                 return
 
-        
-        print("\nStarting PDF processing...")
-        result = processor.process_all_pdfs()
-
-        
-        print("\nSaving processed data...")
-        processor.save_chunks(result['chunks'], result['metadata'])
+            print("\nReprocessing every PDF...")
+            result = processor.update(force=True)
+        else:
+            print("\nStarting PDF processing...")
+            result = processor.update()
 
         print("\nPreprocessing complete!")
-        print(f"   Output directory: {processor.output_dir}")
+        print(f"   Output directory: {processor.data_dir}")
         print(f"   Total chunks: {result['metadata']['total_chunks']}")
         print(f"   Total characters: {result['metadata']['total_characters']}")
 
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Prompt Benchmark for RAG Chatbot
+Answers the golden questions with the full and the compact prompt over the same context and reports how often the answers agree
+"""
+
+import argparse
+import json
+import os
+import time
+from typing import Any, Dict, List, Sequence
+
+from langchain_core.prompts import PromptTemplate
+
+from benchmark import check_golden_set, is_relevant, load_corpus, load_golden_set
+from chunker import TokenChunker
+from extractive import ExtractiveAnswerer, content_words
+from prompts import PROMPT_MODES, get_prompt_template
+from token_usage import estimate_tokens
+
+DEFAULT_CONTEXT_CHUNKS = 5
+# Two answers agree when both refuse, or both answer with at least this share of content words in common (Jaccard)
+AGREEMENT_THRESHOLD = 0.5
+REFUSAL = "i don't know"
+
+
+def select_context(question: str, chunks: Sequence[str], k: int = DEFAULT_CONTEXT_CHUNKS) -> List[str]:
+    """Best k chunks by IDF-weighted word overlap; no embedding model needed, and both modes see the same chunks"""
+    scores = ExtractiveAnswerer().lexical_scores(question, chunks)
+    return [chunks[i] for i in scores.argsort(kind='stable')[::-1][:k]]
+
+
+def is_refusal(answer: str) -> bool:
+    return REFUSAL in answer.casefold().replace("’", "'")
+
+
+def answer_similarity(a: str, b: str) -> float:
+    words_a, words_b = set(content_words(a)), set(content_words(b))
+    if not words_a and not words_b:
+        return 1.0
+    return len(words_a & words_b) / len(words_a | words_b)
+
+
+def answers_agree(a: str, b: str) -> bool:
+    if is_refusal(a) or is_refusal(b):
+        return is_refusal(a) == is_refusal(b)
+    return answer_similarity(a, b) >= AGREEMENT_THRESHOLD
+
+
+def compare_prompt_modes(llm, documents, questions: List[Dict[str, Any]],
+                         k: int = DEFAULT_CONTEXT_CHUNKS) -> Dict[str, Any]:
+    """Ask every question once per prompt mode with identical context and history; llm is any LangChain chat model"""
+    chunker = TokenChunker()
+    chunks = [record["text"] for source, text in documents for record in chunker.chunk_text(text, source)]
+    templates = {mode: PromptTemplate.from_template(get_prompt_template(mode)) for mode in PROMPT_MODES}
+
+    rows = []
+    for item in questions:
+        context = "\n\n".join(select_context(item["question"], chunks, k))
+        row = {"question": item["question"]}
+        for mode, template in templates.items():
+            prompt = template.format(context=context, chat_history="", question=item["question"])
+            start = time.perf_counter()
+            answer = llm.invoke(prompt).content
+            row[mode] = {"answer": answer, "prompt_tokens": estimate_tokens(prompt),
+                         "seconds": round(time.perf_counter() - start, 2),
+                         "refused": is_refusal(answer), "has_snippet": is_relevant(answer, item["relevant"])}
+        row["similarity"] = round(answer_similarity(row["full"]["answer"], row["compact"]["answer"]), 3)
+        row["agree"] = answers_agree(row["full"]["answer"], row["compact"]["answer"])
+        rows.append(row)
+        print(f"{'agree' if row['agree'] else 'DIFFER':<7} {row['similarity']:.2f}  {item['question']}")
+
+    summary = {"questions": len(rows),
+               "agreement": sum(row["agree"] for row in rows) / len(rows) if rows else 0.0,
+               "mean_similarity": sum(row["similarity"] for row in rows) / len(rows) if rows else 0.0}
+    for mode in PROMPT_MODES:
+        summary[mode] = {
+            "snippet_hits": sum(row[mode]["has_snippet"] for row in rows),
+            "refusals": sum(row[mode]["refused"] for row in rows),
+            "mean_prompt_tokens": sum(row[mode]["prompt_tokens"] for row in rows) / len(rows) if rows else 0
+        }
+    return {"summary": summary, "rows": rows}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that PROMPT_MODE=compact answers like the full prompt")
+    parser.add_argument("--corpus", default="../benchmarks/corpus.json", help="chunks.json-style corpus file (default: the fixed benchmark fixture)")
+    parser.add_argument("--golden", default="../benchmarks/golden_set.json", help="golden question set")
+    parser.add_argument("--model", default="gemini-1.5-flash", help="Gemini model to answer with")
+    parser.add_argument("--k", type=int, default=DEFAULT_CONTEXT_CHUNKS, help="context chunks per question")
+    parser.add_argument("--endpoint", help="Gemini API endpoint (e.g. the fake_gemini.py stand-in)")
+    parser.add_argument("--output", help="write every answer and the summary as JSON to this file")
+    args = parser.parse_args()
+
+    from dotenv import load_dotenv
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+    load_dotenv()
+    llm_kwargs = {"transport": "rest", "client_options": {"api_endpoint": args.endpoint}} if args.endpoint else {}
+    llm = ChatGoogleGenerativeAI(model=args.model, google_api_key=os.getenv("GOOGLE_API_KEY"), temperature=0.0,
+                                 max_tokens=300, **llm_kwargs)
+
+    documents = load_corpus(args.corpus)
+    questions = load_golden_set(args.golden)
+    check_golden_set(documents, questions)
+    print("Prompt Benchmark")
+    print("=" * 50)
+    print(f"Golden set: {args.golden} ({len(questions)} questions), model {args.model}\n")
+
+    results = compare_prompt_modes(llm, documents, questions, args.k)
+    summary = results["summary"]
+    print(f"\nAgreement: {summary['agreement']:.0%} of questions, mean answer similarity {summary['mean_similarity']:.2f}")
+    for mode in PROMPT_MODES:
+        print(f"   {mode}: {summary[mode]['mean_prompt_tokens']:.0f} prompt tokens, "
+              f"{summary[mode]['snippet_hits']} answers quote the golden snippet, {summary[mode]['refusals']} refusals")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        print(f"\nResults saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Text Quality Benchmark for RAG Chatbot
+Extraction / normalization throughput and chunks removed by the quality filter, on cached crawls
+"""
+
+import argparse
+import json
+import random
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+from bs4 import BeautifulSoup
+
+from chunker import TokenChunker
+from chunk_store import MmapChunks
+from crawl_cache import CrawlCache
+from scraper import html_to_text
+from snapshots import resolve_data_dir
+from text_quality import ChunkFilter, normalize_text
+
+
+def legacy_html_to_text(content) -> str:
+    """html_to_text as it was before the normalization stage, for comparison"""
+    soup = BeautifulSoup(content, 'lxml')
+    for script in soup(["script", "style", "noscript"]):
+        script.decompose()
+    text = soup.get_text(separator="\n")
+    lines = (line.strip() for line in text.splitlines())
+    text = "\n".join(line for line in lines if line)
+    return text.encode('utf-8', errors='ignore').decode('utf-8')
+
+
+def legacy_normalize(text: str) -> str:
+    lines = (line.strip() for line in text.splitlines())
+    text = "\n".join(line for line in lines if line)
+    return text.encode('utf-8', errors='ignore').decode('utf-8')
+
+
+def load_cached_pages(cache_path: str, url: str = None) -> List[Tuple[str, bytes]]:
+    """Raw pages of one crawl, or of every crawl in the cache"""
+    if not Path(cache_path).exists():
+        return []
+    cache = CrawlCache(cache_path)
+    try:
+        crawl_ids = [url] if url else cache.crawl_ids()
+        return [page for crawl_id in crawl_ids for page in cache.iter_pages(crawl_id)]
+    finally:
+        cache.close()
+
+
+def load_html_dir(path: str) -> List[Tuple[str, bytes]]:
+    return [(str(p), p.read_bytes()) for p in sorted(Path(path).rglob("*.htm*"))]
+
+
+def synthetic_pages(count: int, seed: int = 0) -> List[Tuple[str, bytes]]:
+    """Site-like pages: shared menu, cookie banner and footer around a few paragraphs of text"""
+    rng = random.Random(seed)
+    words = ("data model search page python service project team result system user query "
+             "design build test deploy cloud report analysis network").split()
+    menu = "".join(f'<li><a href="/section-{i}">Section {i}</a></li>' for i in range(25))
+    pages = []
+    for n in range(count):
+        paragraphs = "".join(
+            "<p>" + " ".join(rng.choice(words) for _ in range(rng.randint(40, 120))) + ".</p>"
+            for _ in range(rng.randint(2, 8)))
+        related = "".join(f'<li><a href="/page-{rng.randrange(count)}">https://example.com/page-{rng.randrange(count)}</a></li>'
+                          for _ in range(10))
+        html = (f'<html><head><title>Page {n}</title><style>p {{margin: 0}}</style></head><body>'
+                f'<nav><ul>{menu}</ul></nav>'
+                f'<div id="cookie-consent">We use cookies to improve your experience. Accept all&nbsp;cookies</div>'
+                f'<main><h1>Page {n}</h1>{paragraphs}<h3>Related</h3><ul>{related}</ul></main>'
+                f'<footer><a href="/privacy">Privacy</a> | <a href="/terms">Terms</a> | © 2024 Example</footer>'
+                f'</body></html>')
+        pages.append((f"https://example.com/page-{n}", html.encode('utf-8')))
+    return pages
+
+
+def time_extraction(pages: List[Tuple[str, bytes]], extract) -> Tuple[List[str], float]:
+    start = time.perf_counter()
+    texts = [extract(content) for _, content in pages]
+    return texts, time.perf_counter() - start
+
+
+def chunk_all(texts: List[str], chunker: TokenChunker) -> List[Dict[str, Any]]:
+    return [record for i, text in enumerate(texts) for record in chunker.chunk_text(text, source=str(i))]
+
+
+def run_benchmark(pages: List[Tuple[str, bytes]]) -> Dict[str, Any]:
+    html_mb = sum(len(content) for _, content in pages) / 1e6
+    print(f"{len(pages)} pages, {html_mb:.1f} MB of HTML")
+
+    legacy_texts, legacy_seconds = time_extraction(pages, legacy_html_to_text)
+    texts, seconds = time_extraction(pages, html_to_text)
+
+    raw_texts = [BeautifulSoup(content, 'lxml').get_text(separator="\n") for _, content in pages]
+    raw_mb = sum(len(t) for t in raw_texts) / 1e6
+    start = time.perf_counter()
+    for text in raw_texts:
+        legacy_normalize(text)
+    legacy_norm_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    for text in raw_texts:
+        normalize_text(text)
+    norm_seconds = time.perf_counter() - start
+
+    chunker = TokenChunker()
+    legacy_chunks = chunk_all(legacy_texts, chunker)
+    chunks = chunk_all(texts, chunker)
+    chunk_filter = ChunkFilter()
+    start = time.perf_counter()
+    kept = chunk_filter.filter(chunks)
+    filter_seconds = time.perf_counter() - start
+
+    results = {
+        "pages": len(pages),
+        "html_mb": round(html_mb, 2),
+        "extract_pages_per_s": {"legacy": round(len(pages) / legacy_seconds, 1),
+                                "current": round(len(pages) / seconds, 1)},
+        "normalize_mb_per_s": {"legacy": round(raw_mb / legacy_norm_seconds, 1),
+                               "current": round(raw_mb / norm_seconds, 1)},
+        "filter_chunks_per_s": round(len(chunks) / filter_seconds, 1) if filter_seconds else None,
+        "chunks": {"legacy": len(legacy_chunks), "extracted": len(chunks), "embedded": len(kept)},
+        "characters_embedded": {"legacy": sum(len(c["text"]) for c in legacy_chunks),
+                                "current": sum(len(c["text"]) for c in kept)},
+        "filter": chunk_filter.stats()
+    }
+
+    print(f"Extraction:    {results['extract_pages_per_s']['legacy']} -> "
+          f"{results['extract_pages_per_s']['current']} pages/s (includes boilerplate stripping)")
+    print(f"Normalization: {results['normalize_mb_per_s']['legacy']} -> "
+          f"{results['normalize_mb_per_s']['current']} MB/s of extracted text")
+    print(f"Chunk filter:  {results['filter_chunks_per_s']} chunks/s")
+    print(f"Chunks to embed: {len(legacy_chunks)} before, {len(chunks)} after boilerplate stripping, "
+          f"{len(kept)} after the filter {results['filter']['reasons']}")
+    print(f"Characters to embed: {results['characters_embedded']['legacy']} -> "
+          f"{results['characters_embedded']['current']}")
+    return results
+
+
+def run_stored_chunks(path: str) -> Dict[str, Any]:
+    """Normalize and filter stored chunks: a processed data directory (e.g. ../processed_data) or a chunks.json"""
+    if Path(path).is_dir():
+        chunks = MmapChunks(str(resolve_data_dir(path)))
+    else:
+        with open(path, 'r', encoding='utf-8') as f:
+            chunks = json.load(f)["chunks"]
+    chunk_filter = ChunkFilter()
+    start = time.perf_counter()
+    records = chunk_filter.filter([{"text": normalize_text(text)} for text in chunks])
+    seconds = time.perf_counter() - start
+    results = {"chunks": len(chunks), "embedded": len(records), "filter": chunk_filter.stats(),
+               "chunks_per_s": round(len(chunks) / seconds, 1) if seconds else None}
+    print(f"{len(chunks)} stored chunks: {len(records)} kept, {results['filter']['reasons']} dropped")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark text normalization and the low-value chunk filter")
+    parser.add_argument("--cache", default="../crawl_cache.sqlite", help="crawl cache to read pages from")
+    parser.add_argument("--url", help="only this crawl (start URL); default every crawl in the cache")
+    parser.add_argument("--html-dir", help="read *.html files from this directory instead of the cache")
+    parser.add_argument("--synthetic", type=int, default=0, help="generate this many site-like pages instead")
+    parser.add_argument("--chunks", help="only filter these stored chunks (processed data directory or chunks.json)")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    args = parser.parse_args()
+
+    print("Text Quality Benchmark")
+    print("=" * 50)
+    if args.chunks:
+        results = run_stored_chunks(args.chunks)
+    else:
+        results = run_benchmark(load_pages(args))
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults saved to {args.output}")
+
+
+def load_pages(args) -> List[Tuple[str, bytes]]:
+    if args.synthetic:
+        pages = synthetic_pages(args.synthetic)
+    elif args.html_dir:
+        pages = load_html_dir(args.html_dir)
+    else:
+        pages = load_cached_pages(args.cache, args.url)
+    if not pages:
+        raise SystemExit("No pages found; crawl a site with CRAWL_CACHE set, or use --html-dir / --synthetic")
+    return pages
+
+
+if __name__ == "__main__":
+    main()
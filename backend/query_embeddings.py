@@ -0,0 +1,162 @@
+"""
+Query Embedding Cache for RAG Chatbot
+LRU cache of question vectors plus batching of concurrent cache misses into one encode call
+"""
+
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Callable, Dict, Any, List, Optional, Tuple
+
+from langchain_core.embeddings import Embeddings
+
+DEFAULT_CACHE_SIZE = 10000
+DEFAULT_MAX_BATCH = 32
+
+
+def normalize_query(text: str) -> str:
+    return " ".join(text.split()).casefold()
+
+
+class QueryEmbeddingCache:
+    """Process-wide LRU of (model, normalized question) -> vector"""
+
+    def __init__(self, max_size: int = DEFAULT_CACHE_SIZE):
+        self.max_size = max_size
+        self._cache: "OrderedDict[Tuple[str, str], List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Tuple[str, str]) -> Optional[List[float]]:
+        with self._lock:
+            vector = self._cache.get(key)
+            if vector is None:
+                self.misses += 1
+                return None
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return vector
+
+    def put(self, key: Tuple[str, str], vector: List[float]):
+        with self._lock:
+            self._cache[key] = vector
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_size:
+                self._cache.popitem(last=False)
+                self.evictions += 1
+
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            size = len(self._cache)
+        return {"size": size, "hits": self.hits, "misses": self.misses,
+                "evictions": self.evictions, "hit_rate": round(self.hit_rate(), 3)}
+
+
+class QueryBatcher:
+    """
+    Encodes texts submitted from different threads, batching the ones that arrive
+    while an encode_fn call is running. A caller that finds no encode running encodes
+    the queue at once (just its own text when it is alone, so it never waits for
+    company); texts queued meanwhile go out together in the next call, made by one of
+    their callers. Identical texts in flight share one result.
+    """
+
+    def __init__(self, encode_fn: Callable[[List[str]], List[List[float]]], max_batch: int = DEFAULT_MAX_BATCH):
+        self.encode_fn = encode_fn
+        self.max_batch = max_batch
+        self._pending: "OrderedDict[str, Future]" = OrderedDict()
+        self._ready = threading.Condition()
+        self._encoding = False
+        self.batches = 0
+        self.batched_texts = 0
+
+    def encode(self, text: str) -> List[float]:
+        with self._ready:
+            future = self._pending.get(text)
+            if future is None:
+                future = Future()
+                self._pending[text] = future
+            while not future.done():
+                if self._encoding:
+                    self._ready.wait()
+                    continue
+                self._encoding = True
+                batch = [self._pending.popitem(last=False) for _ in range(min(self.max_batch, len(self._pending)))]
+                self._ready.release()
+                try:
+                    self._encode(batch)
+                finally:
+                    self._ready.acquire()
+                    self._encoding = False
+                    # Wakes the callers served by this batch and, for what is still queued, the next encoder
+                    self._ready.notify_all()
+        return future.result()
+
+    def _encode(self, batch: List[Tuple[str, Future]]):
+        try:
+            vectors = self.encode_fn([text for text, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        with self._ready:
+            self.batches += 1
+            self.batched_texts += len(batch)
+        for (_, future), vector in zip(batch, vectors):
+            future.set_result(list(vector))
+
+    def mean_batch_size(self) -> float:
+        return self.batched_texts / self.batches if self.batches else 0.0
+
+
+class CachedQueryEmbeddings(Embeddings):
+    """
+    Wraps an embeddings object: embed_query goes through the shared cache and the
+    batcher, embed_documents is passed through unchanged. batch_fn must embed a list
+    of questions exactly like embed_query would; without one, misses call the base
+    embed_query directly.
+    """
+
+    def __init__(self, base: Embeddings, model_name: str, cache: Optional[QueryEmbeddingCache] = None,
+                 batch_fn: Optional[Callable[[List[str]], List[List[float]]]] = None,
+                 max_batch: int = DEFAULT_MAX_BATCH):
+        self.base = base
+        self.model_name = model_name
+        self.cache = cache or shared_query_cache()
+        self.batcher = QueryBatcher(batch_fn, max_batch) if batch_fn else None
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.base.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        key = (self.model_name, normalize_query(text))
+        vector = self.cache.get(key)
+        if vector is None:
+            vector = self.batcher.encode(text) if self.batcher else self.base.embed_query(text)
+            self.cache.put(key, vector)
+        return list(vector)
+
+    def stats(self) -> Dict[str, Any]:
+        stats = self.cache.stats()
+        stats["batches"] = self.batcher.batches if self.batcher else 0
+        stats["mean_batch_size"] = round(self.batcher.mean_batch_size(), 2) if self.batcher else 0.0
+        return stats
+
+
+_shared_cache: Optional[QueryEmbeddingCache] = None
+_shared_lock = threading.Lock()
+
+
+def shared_query_cache() -> QueryEmbeddingCache:
+    """One cache per process, shared by every engine (one per site and API key)"""
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = QueryEmbeddingCache()
+        return _shared_cache
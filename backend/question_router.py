@@ -0,0 +1,112 @@
+"""
+Question Router for RAG Chatbot
+Skips the question-condensing LLM call when a follow-up is already standalone
+"""
+
+import re
+from typing import Any, Callable, Dict, List, Optional
+from langchain.chains.base import Chain
+
+# Words that usually point back at something said in an earlier turn
+REFERRING_WORDS = {
+    "it", "its", "they", "them", "their", "theirs", "this", "that", "these", "those",
+    "he", "him", "his", "she", "her", "hers", "there", "same", "former", "latter",
+    "above", "previous", "else", "another", "other", "others", "one", "ones"
+}
+# Openers that continue the previous question instead of asking a new one
+FOLLOW_UP_PREFIXES = (
+    "and ", "also ", "what about", "how about", "then ", "so ", "but ", "or ",
+    "why?", "how?", "more", "tell me more", "elaborate", "explain more", "and?"
+)
+# Questions this short carry too little to retrieve on by themselves
+SHORT_QUESTION_WORDS = 3
+
+WORD_PATTERN = re.compile(r"[a-z']+")
+
+
+def last_human_turn(chat_history: str) -> str:
+    """Pull the most recent user question out of a formatted chat history"""
+    for line in reversed(chat_history.splitlines()):
+        if line.startswith("Human:"):
+            return line[len("Human:"):].strip()
+    return ""
+
+
+def cosine_similarity(a: List[float], b: List[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm_a = sum(x * x for x in a) ** 0.5
+    norm_b = sum(y * y for y in b) ** 0.5
+    return dot / (norm_a * norm_b) if norm_a and norm_b else 0.0
+
+
+def needs_condensing(question: str, chat_history: str,
+                     embed_fn: Optional[Callable[[str], List[float]]] = None,
+                     similarity_threshold: float = 0.5) -> bool:
+    """Decide whether a question depends on earlier turns"""
+    if not chat_history.strip():
+        return False
+
+    lowered = question.strip().lower()
+    words = WORD_PATTERN.findall(lowered)
+
+    if any(word in REFERRING_WORDS for word in words):
+        return True
+    if lowered.startswith(FOLLOW_UP_PREFIXES):
+        return True
+
+    if len(words) <= SHORT_QUESTION_WORDS:
+        previous = last_human_turn(chat_history)
+        if embed_fn and previous:
+            # A short question on the same topic as the last turn is an ellipsis
+            # ("pricing?" after "what services do you offer"); a new topic is not
+            return cosine_similarity(embed_fn(question), embed_fn(previous)) >= similarity_threshold
+        return True
+
+    return False
+
+
+class FastPathQuestionGenerator(Chain):
+    """Drop-in question_generator that only calls the LLM when rewriting is needed"""
+
+    condense_chain: Chain
+    embed_fn: Optional[Callable[[str], List[float]]] = None
+    similarity_threshold: float = 0.5
+    skipped: int = 0
+    condensed: int = 0
+
+    @property
+    def input_keys(self) -> List[str]:
+        return ["question", "chat_history"]
+
+    @property
+    def output_keys(self) -> List[str]:
+        return ["text"]
+
+    def _call(self, inputs: Dict[str, Any], run_manager=None) -> Dict[str, str]:
+        question = inputs["question"]
+        chat_history = inputs["chat_history"]
+
+        if needs_condensing(question, chat_history, self.embed_fn, self.similarity_threshold):
+            self.condensed += 1
+            callbacks = run_manager.get_child() if run_manager else None
+            text = self.condense_chain.run(question=question, chat_history=chat_history, callbacks=callbacks)
+            return {"text": text}
+
+        self.skipped += 1
+        return {"text": question}
+
+    def skip_rate(self) -> float:
+        total = self.skipped + self.condensed
+        return self.skipped / total if total else 0.0
+
+
+def enable_fast_path(qa_chain, embed_fn: Optional[Callable[[str], List[float]]] = None,
+                     similarity_threshold: float = 0.5):
+    """Wrap a ConversationalRetrievalChain's condense step with the fast path"""
+    if not isinstance(qa_chain.question_generator, FastPathQuestionGenerator):
+        qa_chain.question_generator = FastPathQuestionGenerator(
+            condense_chain=qa_chain.question_generator,
+            embed_fn=embed_fn,
+            similarity_threshold=similarity_threshold
+        )
+    return qa_chain
@@ -0,0 +1,106 @@
+"""
+Cross-Encoder Reranker for RAG Chatbot
+Re-scores retrieved chunks locally so only the best few reach the LLM
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, List, Optional, Sequence, Tuple
+from langchain_core.documents import BaseDocumentCompressor, Document
+
+DEFAULT_RERANK_MODEL = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+
+
+class CrossEncoderReranker:
+    def __init__(self, model_name: str = DEFAULT_RERANK_MODEL, top_n: int = 8,
+                 min_score: Optional[float] = None, batch_size: int = 32, cache_size: int = 20000):
+        from sentence_transformers import CrossEncoder
+
+        self.model = CrossEncoder(model_name)
+        self.model_name = model_name
+        self.top_n = top_n
+        self.min_score = min_score
+        self.batch_size = batch_size
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[Tuple[str, str], float]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(query: str, text: str) -> Tuple[str, str]:
+        return query.strip().lower(), hashlib.sha1(text.encode('utf-8', errors='ignore')).hexdigest()
+
+    def score(self, query: str, texts: List[str]) -> List[float]:
+        """Score (query, text) pairs, predicting only uncached pairs in one batched call"""
+        keys = [self._key(query, text) for text in texts]
+        scores: List[Optional[float]] = [None] * len(texts)
+        missing = []
+
+        with self._lock:
+            for i, key in enumerate(keys):
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                    scores[i] = self._cache[key]
+                else:
+                    missing.append(i)
+            self.hits += len(texts) - len(missing)
+            self.misses += len(missing)
+
+        if missing:
+            predicted = self.model.predict([(query, texts[i]) for i in missing], batch_size=self.batch_size)
+            with self._lock:
+                for i, value in zip(missing, predicted):
+                    scores[i] = float(value)
+                    self._cache[keys[i]] = scores[i]
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+
+        return scores
+
+    def rerank(self, query: str, documents: Sequence[Document]) -> List[Document]:
+        """Return the top_n documents by cross-encoder score, dropping any below min_score"""
+        if not documents:
+            return []
+        scores = self.score(query, [doc.page_content for doc in documents])
+        ranked = sorted(zip(documents, scores), key=lambda pair: pair[1], reverse=True)
+
+        results = []
+        for doc, value in ranked[:self.top_n]:
+            if self.min_score is not None and value < self.min_score:
+                break
+            # A copy: retrieved documents are shared with the vector store and other sessions
+            results.append(Document(page_content=doc.page_content,
+                                    metadata={**doc.metadata, "rerank_score": value}))
+        return results
+
+    def cache_hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class RerankCompressor(BaseDocumentCompressor):
+    """LangChain adapter so the reranker can sit inside a ContextualCompressionRetriever"""
+
+    reranker: Any
+
+    def compress_documents(self, documents: Sequence[Document], query: str, callbacks=None) -> Sequence[Document]:
+        return self.reranker.rerank(query, documents)
+
+
+def build_reranking_retriever(base_retriever, top_n: int = 8, min_score: Optional[float] = None,
+                              model_name: str = DEFAULT_RERANK_MODEL):
+    """Wrap a retriever with cross-encoder reranking; returns the base retriever if the model can't load"""
+    from langchain.retrievers import ContextualCompressionRetriever
+
+    try:
+        reranker = CrossEncoderReranker(model_name, top_n=top_n, min_score=min_score)
+    except Exception as e:
+        print(f"Reranker unavailable, using plain retrieval: {e}")
+        return base_retriever
+
+    return ContextualCompressionRetriever(
+        base_compressor=RerankCompressor(reranker=reranker),
+        base_retriever=base_retriever
+    )
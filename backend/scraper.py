@@ -4,8 +4,8 @@ Website Scraper for RAG Chatbot
 Scrapes all internal pages of a website and saves as PDF
 """
 
+import json
 import os
-import requests
 from bs4 import BeautifulSoup
 from reportlab.lib.pagesizes import letter
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
@@ -13,83 +13,201 @@ from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
 from reportlab.lib.units import inch
 from urllib.parse import urljoin, urlparse
 from collections import deque
+from typing import Iterator, List, Dict, Any, Optional, Tuple
+from chunker import TokenChunker
+from crawl_cache import BloomFilter, CrawlCache
+from http_transport import HttpTransport, shared_transport
+from text_quality import normalize_text, strip_boilerplate
+
+def html_to_text(content) -> str:
+    """Extract readable text from an HTML document"""
+    soup = BeautifulSoup(content, 'lxml')
+
+    # Remove script and style, then menus and cookie banners
+    for script in soup(["script", "style", "noscript"]):
+        script.decompose()
+    strip_boilerplate(soup)
+
+    return normalize_text(soup.get_text(separator="\n"))
+
+def extract_links(content, url: str, base_domain: str) -> List[str]:
+    """Internal http(s) links found on a page"""
+    links = []
+    try:
+        soup = BeautifulSoup(content, 'lxml')
+        for link in soup.find_all("a", href=True):
+            new_url = urljoin(url, link["href"])
+            if urlparse(new_url).netloc == base_domain and new_url.startswith("http"):
+                links.append(new_url)
+    except Exception:
+        pass
+    return links
 
 class WebsiteScraper:
-    def __init__(self, pdf_dir: str = "../pdfs", max_pages: int = 50):
+    def __init__(self, pdf_dir: str = "../pdfs", max_pages: Optional[int] = 50, cache_path: Optional[str] = None,
+                 transport: Optional[HttpTransport] = None, large_crawl: bool = False,
+                 bloom_capacity: int = 2_000_000):
         self.pdf_dir = pdf_dir
-        self.max_pages = max_pages  # avoid huge sites
+        self.max_pages = max_pages  # avoid huge sites; None = no limit
+        # SQLite crawl checkpoint + page cache; None keeps everything in memory
+        self.cache_path = cache_path
+        self.transport = transport or shared_transport()
+        # Large crawls keep the frontier on disk and the visited set in a Bloom filter
+        self.large_crawl = large_crawl
+        self.bloom_capacity = bloom_capacity
         os.makedirs(pdf_dir, exist_ok=True)
 
-    def scrape_page(self, url: str) -> str:
-        """Scrape a single page"""
-        try:
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64)'
-            }
-            response = requests.get(url, headers=headers, timeout=20)
-            response.raise_for_status()
-            soup = BeautifulSoup(response.content, 'lxml')
-
-            # Remove script and style
-            for script in soup(["script", "style", "noscript"]):
-                script.decompose()
-
-            text = soup.get_text(separator="\n")
-            lines = (line.strip() for line in text.splitlines())
-            text = "\n".join(line for line in lines if line)
+    def _limit_reached(self, visited: int) -> bool:
+        return self.max_pages is not None and visited >= self.max_pages
 
-            # Clean encoding issues
-            text = text.encode('utf-8', errors='ignore').decode('utf-8')
+    def _report(self, progress_callback, visited: int, queued: int, url: str):
+        """Progress against what is actually known: pages done plus pages queued, capped by max_pages"""
+        if not progress_callback:
+            return
+        total = visited + queued
+        if self.max_pages is not None:
+            total = min(total, self.max_pages)
+        progress_callback(min(visited / max(total, 1) * 100, 100), f"Scraping page {visited}/{total} ({queued} queued): {url}")
 
-            return text
+    def fetch(self, url: str) -> Optional[bytes]:
+        """Fetch raw page content, or None on failure"""
+        try:
+            return self.transport.get(url)
         except Exception as e:
             print(f"Failed to scrape {url}: {e}")
-            return ""
+            return None
+
+    def scrape_page(self, url: str) -> str:
+        """Scrape a single page"""
+        content = self.fetch(url)
+        return html_to_text(content) if content else ""
+
+    def crawl_pages(self, start_url: str, progress_callback=None, stop_check=None) -> Iterator[Tuple[str, str]]:
+        """
+        Crawl internal pages up to max_pages, yielding (url, text) as each page is scraped.
+        With a cache_path, every page is checkpointed; an unfinished crawl of the same
+        start URL resumes where it stopped (already-fetched pages are replayed from the cache).
+        """
+        if self.large_crawl:
+            yield from self.crawl_pages_large(start_url, progress_callback, stop_check)
+            return
 
-    def crawl_website(self, start_url: str, progress_callback=None, stop_check=None) -> str:
-        """Crawl all internal pages up to max_pages"""
         parsed_start = urlparse(start_url)
         base_domain = parsed_start.netloc
+        cache = CrawlCache(self.cache_path) if self.cache_path else None
 
-        visited = set()
-        queue = deque([start_url])
-        all_text = []
+        if cache and cache.is_resumable(start_url):
+            queue, visited = cache.restore(start_url)
+            print(f"Resuming crawl of {start_url}: {len(visited)} pages done, {len(queue)} queued")
+            for url, content in cache.iter_pages(start_url):
+                page_text = html_to_text(content)
+                if page_text:
+                    yield url, page_text
+        else:
+            visited = set()
+            queue = deque([start_url])
+            if cache:
+                cache.start(start_url, start_url)
 
-        total_pages = min(self.max_pages, 50)  # estimate
+        stopped = False
 
-        while queue and len(visited) < self.max_pages:
+        while queue and not self._limit_reached(len(visited)):
             if stop_check and stop_check():
+                stopped = True
                 break
 
             url = queue.popleft()
             if url in visited:
                 continue
             visited.add(url)
-
-            progress = len(visited) / total_pages * 100
-            if progress_callback:
-                progress_callback(progress, f"Scraping page {len(visited)}/{total_pages}: {url}")
+            # The in-memory queue may hold duplicates, so this total is an upper bound
+            self._report(progress_callback, len(visited), len(queue), url)
 
             print(f"Scraping: {url}")
-            page_text = self.scrape_page(url)
+            content = self.fetch(url)
+            new_links = [link for link in extract_links(content, url, base_domain) if link not in visited] if content else []
+            queue.extend(new_links)
+            if cache:
+                cache.record_page(start_url, url, content, new_links)
+
+            page_text = html_to_text(content) if content else ""
+            if page_text:
+                yield url, page_text
+
+        if cache:
+            if not stopped:
+                cache.finish(start_url)
+            cache.close()
+
+        if progress_callback:
+            progress_callback(100, "Scraping complete")
+
+    def crawl_pages_large(self, start_url: str, progress_callback=None, stop_check=None) -> Iterator[Tuple[str, str]]:
+        """
+        Crawl for sites with 100k+ pages. The frontier lives in the crawl cache on disk
+        and every URL is queued at most once, checked against a fixed-size Bloom filter
+        (a false positive skips a URL, about 0.1% at capacity). Memory stays flat as the
+        crawl grows; it always checkpoints and resumes.
+        """
+        base_domain = urlparse(start_url).netloc
+        cache = CrawlCache(self.cache_path or "../crawl_cache.sqlite")
+        seen = BloomFilter(self.bloom_capacity)
+
+        if cache.is_resumable(start_url):
+            for url in cache.iter_known_urls(start_url):
+                seen.add(url)
+            visited, queued = cache.counts(start_url)
+            print(f"Resuming large crawl of {start_url}: {visited} pages done, {queued} queued")
+            for url, content in cache.iter_pages(start_url):
+                page_text = html_to_text(content)
+                if page_text:
+                    yield url, page_text
+        else:
+            cache.start(start_url, start_url)
+            seen.add(start_url)
+            visited, queued = 0, 1
+
+        stopped = False
+        while not self._limit_reached(visited):
+            if stop_check and stop_check():
+                stopped = True
+                break
+            url = cache.next_url(start_url)
+            if url is None:
+                break
+
+            self._report(progress_callback, visited + 1, queued - 1, url)
+            content = self.fetch(url)
+            new_links = [link for link in extract_links(content, url, base_domain) if seen.add(link)] if content else []
+            cache.record_page(start_url, url, content, new_links)
+            visited += 1
+            queued += len(new_links) - 1
+
+            page_text = html_to_text(content) if content else ""
             if page_text:
-                all_text.append(f"\n\n--- Page: {url} ---\n\n{page_text}")
-
-            # Extract links
-            try:
-                soup = BeautifulSoup(requests.get(url).content, 'lxml')
-                for link in soup.find_all("a", href=True):
-                    new_url = urljoin(url, link["href"])
-                    parsed_new = urlparse(new_url)
-                    if parsed_new.netloc == base_domain and new_url not in visited:
-                        if new_url.startswith("http"):
-                            queue.append(new_url)
-            except:
-                pass
+                yield url, page_text
+
+        if not stopped:
+            cache.finish(start_url)
+        cache.close()
 
         if progress_callback:
             progress_callback(100, "Scraping complete")
 
+    def crawl_to_jsonl(self, start_url: str, output_path: str, progress_callback=None, stop_check=None) -> int:
+        """Stream crawled pages to a JSON Lines file ({"url", "text"} per line) instead of holding them; returns the page count"""
+        pages = 0
+        with open(output_path, 'w', encoding='utf-8') as f:
+            for url, page_text in self.crawl_pages(start_url, progress_callback, stop_check):
+                f.write(json.dumps({"url": url, "text": page_text}, ensure_ascii=False) + "\n")
+                pages += 1
+        return pages
+
+    def crawl_website(self, start_url: str, progress_callback=None, stop_check=None) -> str:
+        """Crawl all internal pages up to max_pages"""
+        all_text = []
+        for url, page_text in self.crawl_pages(start_url, progress_callback, stop_check):
+            all_text.append(f"\n\n--- Page: {url} ---\n\n{page_text}")
         return "\n".join(all_text)
 
     def save_as_pdf(self, text: str, url: str, filename: str = None):
@@ -124,21 +242,17 @@ class WebsiteScraper:
         text = self.crawl_website(url, progress_callback, stop_check)
         return self.save_as_pdf(text, url)
 
+    def scrape_to_records(self, url: str, progress_callback=None, stop_check=None) -> List[Dict[str, Any]]:
+        """Scrape website and return chunk records tagged with the page URL they came from"""
+        chunker = TokenChunker()
+        records = []
+        for page_url, page_text in self.crawl_pages(url, progress_callback, stop_check):
+            records.extend(chunker.chunk_text(page_text, source=page_url))
+        return records
+
     def scrape_to_chunks(self, url: str, progress_callback=None, stop_check=None) -> list:
         """Scrape website and return text chunks directly (faster than PDF)"""
-        from langchain.text_splitter import RecursiveCharacterTextSplitter
-
-        text = self.crawl_website(url, progress_callback, stop_check)
-
-        # Split text into chunks (optimized for content preservation)
-        splitter = RecursiveCharacterTextSplitter(
-            chunk_size=800,  # Increased for better context preservation
-            chunk_overlap=100,  # Increased overlap for continuity
-            separators=["\n\n", "\nSkills\n", "\nCertifications\n", "\nProjects\n", "\nEducation\n", "\n", ". ", ": ", " ", ""]
-        )
-
-        chunks = splitter.split_text(text)
-        return chunks
+        return [r["text"] for r in self.scrape_to_records(url, progress_callback, stop_check)]
 
 if __name__ == "__main__":
     scraper = WebsiteScraper(max_pages=20)  # adjust pages as needed
@@ -0,0 +1,81 @@
+"""
+Session Store for RAG Chatbot
+Compact on-disk store for per-session state (chat history, visible messages, settings) with idle eviction
+"""
+
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id TEXT PRIMARY KEY,
+    updated_at REAL NOT NULL,
+    state BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sessions_updated ON sessions (updated_at);
+"""
+
+# Keys of st.session_state that make up a session; everything else is rebuilt or shared
+SESSION_KEYS = ("chat_history", "messages", "processed", "current_url", "current_key_index")
+
+
+class SessionStore:
+    def __init__(self, db_path: str = "../sessions.sqlite"):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def load(self, session_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self.conn.execute("SELECT state FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+        if row is None:
+            return None
+        state = json.loads(zlib.decompress(row[0]))
+        # JSON turns the (question, answer) tuples LangChain expects into lists
+        state["chat_history"] = [tuple(turn) for turn in state.get("chat_history", [])]
+        return state
+
+    def save(self, session_id: str, state: Dict[str, Any]):
+        blob = zlib.compress(json.dumps(state, ensure_ascii=False).encode('utf-8'), 6)
+        with self._lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO sessions (session_id, updated_at, state) VALUES (?, ?, ?)",
+                              (session_id, time.time(), blob))
+
+    def delete(self, session_id: str):
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+
+    def evict_idle(self, max_idle_seconds: float) -> List[str]:
+        """Remove sessions not saved for max_idle_seconds; returns their IDs"""
+        cutoff = time.time() - max_idle_seconds
+        with self._lock, self.conn:
+            evicted = [row[0] for row in self.conn.execute(
+                "SELECT session_id FROM sessions WHERE updated_at < ?", (cutoff,))]
+            self.conn.execute("DELETE FROM sessions WHERE updated_at < ?", (cutoff,))
+        return evicted
+
+    def active(self, max_idle_seconds: float) -> Set[str]:
+        """IDs of sessions saved within the last max_idle_seconds"""
+        cutoff = time.time() - max_idle_seconds
+        with self._lock:
+            return {row[0] for row in self.conn.execute(
+                "SELECT session_id FROM sessions WHERE updated_at >= ?", (cutoff,))}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            count, size = self.conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(state)), 0) FROM sessions").fetchone()
+        return {"sessions": count, "stored_bytes": size}
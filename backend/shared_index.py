@@ -0,0 +1,237 @@
+"""
+Shared Index for RAG Chatbot
+Read-only, memory-mapped vector index so replicas on one host share a single copy of the embeddings
+"""
+
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+from langchain_community.vectorstores.utils import maximal_marginal_relevance
+
+from chunk_store import MmapChunks, stored_chunks_hash, write_chunk_texts
+from snapshots import SnapshotStore
+
+INDEX_DIR = "index"
+VECTORS_FILE = "vectors.npy"
+NORMS_FILE = "norms.npy"
+META_FILE = "index_meta.json"
+EMBED_BATCH_SIZE = 256
+# Rows scored per block, so a query never allocates more than this many distances at once
+SEARCH_BLOCK_ROWS = 65536
+
+
+def chunks_fingerprint(processed_dir: str) -> str:
+    """Identifies the chunk store an index was built from: the content hash of its texts and boundaries"""
+    return stored_chunks_hash(processed_dir)
+
+
+def build_shared_index(processed_dir: str, embeddings: Embeddings, model_name: str,
+                       previous_dir: Optional[str] = None,
+                       carried: Optional[Sequence[Tuple[int, int, int]]] = None) -> Path:
+    """
+    Embed every chunk into processed_dir/index. Only call this on a snapshot that is
+    still being built (inside SnapshotStore.build()): published snapshots are read-only,
+    since replicas may be mapping their files. Chunks carried over from previous_dir,
+    as (chunk ID, previous chunk ID, count) ranges, copy their vectors from its index
+    when that index is current for the same model; only the rest are embedded.
+    """
+    processed = Path(processed_dir)
+    chunks = MmapChunks(processed_dir)
+    index_dir = processed / INDEX_DIR
+    if index_dir.exists():
+        raise FileExistsError(f"{index_dir} already exists; build the index into a new snapshot")
+    if not len(chunks):
+        raise ValueError("No chunks to index")
+    tmp_dir = processed / f"{INDEX_DIR}.tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    tmp_dir.mkdir(parents=True)
+
+    vectors = None
+    missing = np.ones(len(chunks), dtype=bool)
+    previous = load_index_vectors(previous_dir, model_name) if previous_dir and carried else None
+    if previous is not None:
+        vectors = np.lib.format.open_memmap(tmp_dir / VECTORS_FILE, mode='w+', dtype=np.float32,
+                                            shape=(len(chunks), previous.shape[1]))
+        for start, previous_start, count in carried:
+            vectors[start:start + count] = previous[previous_start:previous_start + count]
+            missing[start:start + count] = False
+    to_embed = np.flatnonzero(missing)
+
+    print(f"Building shared index for {len(chunks)} chunks ({len(chunks) - len(to_embed)} reused, "
+          f"{len(to_embed)} to embed)...")
+    for start in range(0, len(to_embed), EMBED_BATCH_SIZE):
+        ids = to_embed[start:start + EMBED_BATCH_SIZE]
+        batch = np.asarray(embeddings.embed_documents([chunks[int(i)] for i in ids]), dtype=np.float32)
+        if vectors is None:
+            vectors = np.lib.format.open_memmap(tmp_dir / VECTORS_FILE, mode='w+', dtype=np.float32,
+                                                shape=(len(chunks), batch.shape[1]))
+        vectors[ids] = batch
+    vectors.flush()
+    np.save(tmp_dir / NORMS_FILE, np.einsum('ij,ij->i', vectors, vectors))
+
+    with open(tmp_dir / META_FILE, 'w', encoding='utf-8') as f:
+        json.dump({
+            "model": model_name,
+            "count": len(chunks),
+            "dim": int(vectors.shape[1]),
+            "chunks_sha256": chunks_fingerprint(processed_dir)
+        }, f, indent=2)
+    del vectors
+
+    os.rename(tmp_dir, index_dir)
+    print(f"Shared index saved to: {index_dir}")
+    return index_dir
+
+
+def read_index_meta(processed_dir: str) -> Optional[Dict[str, Any]]:
+    meta_file = Path(processed_dir) / INDEX_DIR / META_FILE
+    if not meta_file.exists():
+        return None
+    with open(meta_file, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def is_index_current(processed_dir: str, model_name: str) -> bool:
+    meta = read_index_meta(processed_dir)
+    if meta is None or not MmapChunks.available(processed_dir):
+        return False
+    return meta.get("model") == model_name and meta.get("chunks_sha256") == chunks_fingerprint(processed_dir)
+
+
+def load_index_vectors(processed_dir: str, model_name: str) -> Optional[np.ndarray]:
+    """The stored chunk vectors (memory-mapped) if the index is current, else None"""
+    if not is_index_current(processed_dir, model_name):
+        return None
+    return np.load(Path(processed_dir) / INDEX_DIR / VECTORS_FILE, mmap_mode='r')
+
+
+class MmapVectorStore(VectorStore):
+    """
+    Exact L2 search (same results as the flat FAISS index) over vectors mapped
+    read-only from disk. Supports similarity and MMR search; adding texts is not supported.
+    """
+
+    def __init__(self, processed_dir: str, embedding: Embeddings):
+        index_dir = Path(processed_dir) / INDEX_DIR
+        self.processed_dir = processed_dir
+        self.embedding = embedding
+        self.texts = MmapChunks(processed_dir)
+        self.vectors = np.load(index_dir / VECTORS_FILE, mmap_mode='r')
+        self.norms = np.load(index_dir / NORMS_FILE, mmap_mode='r')
+        if len(self.vectors) != len(self.texts):
+            raise ValueError(f"Index has {len(self.vectors)} vectors but the chunk store has {len(self.texts)} chunks")
+
+    @property
+    def embeddings(self) -> Optional[Embeddings]:
+        return self.embedding
+
+    def _select_relevance_score_fn(self):
+        return self._euclidean_relevance_score_fn
+
+    def _nearest(self, vector: np.ndarray, k: int) -> List[Tuple[int, float]]:
+        """Indices and squared L2 distances of the k nearest vectors"""
+        query_norm = float(vector @ vector)
+        best_ids = np.empty(0, dtype=np.int64)
+        best_dist = np.empty(0, dtype=np.float32)
+        for start in range(0, len(self.vectors), SEARCH_BLOCK_ROWS):
+            block = self.vectors[start:start + SEARCH_BLOCK_ROWS]
+            dist = self.norms[start:start + len(block)] - 2 * (block @ vector) + query_norm
+            ids = np.arange(start, start + len(block))
+            if len(dist) > k:
+                keep = np.argpartition(dist, k)[:k]
+                dist, ids = dist[keep], ids[keep]
+            best_ids = np.concatenate([best_ids, ids])
+            best_dist = np.concatenate([best_dist, dist])
+        order = np.argsort(best_dist, kind='stable')[:k]
+        return [(int(best_ids[i]), max(float(best_dist[i]), 0.0)) for i in order]
+
+    def _document(self, index: int) -> Document:
+        return Document(page_content=self.texts[index], metadata={"chunk_id": index})
+
+    def similarity_search_with_score_by_vector(self, embedding: List[float], k: int = 4,
+                                               **kwargs: Any) -> List[Tuple[Document, float]]:
+        vector = np.asarray(embedding, dtype=np.float32)
+        return [(self._document(i), dist) for i, dist in self._nearest(vector, k)]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, **kwargs: Any) -> List[Tuple[Document, float]]:
+        return self.similarity_search_with_score_by_vector(self.embedding.embed_query(query), k)
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score_by_vector(embedding, k)]
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k)]
+
+    def max_marginal_relevance_search_by_vector(self, embedding: List[float], k: int = 4, fetch_k: int = 20,
+                                                lambda_mult: float = 0.5, **kwargs: Any) -> List[Document]:
+        vector = np.asarray(embedding, dtype=np.float32)
+        candidates = [i for i, _ in self._nearest(vector, fetch_k)]
+        if not candidates:
+            return []
+        selected = maximal_marginal_relevance(vector.reshape(1, -1), self.vectors[candidates], k=k,
+                                              lambda_mult=lambda_mult)
+        return [self._document(candidates[i]) for i in selected]
+
+    def max_marginal_relevance_search(self, query: str, k: int = 4, fetch_k: int = 20,
+                                      lambda_mult: float = 0.5, **kwargs: Any) -> List[Document]:
+        return self.max_marginal_relevance_search_by_vector(self.embedding.embed_query(query), k, fetch_k,
+                                                            lambda_mult)
+
+    def add_texts(self, texts: Iterable[str], metadatas: Optional[List[dict]] = None, **kwargs: Any) -> List[str]:
+        raise NotImplementedError("MmapVectorStore is read-only; rebuild it with build_shared_index")
+
+    @classmethod
+    def from_texts(cls, texts: List[str], embedding: Embeddings, metadatas: Optional[List[dict]] = None,
+                   **kwargs: Any) -> "MmapVectorStore":
+        raise NotImplementedError("Write chunks with ChunkStore and call load_shared_index instead")
+
+
+def load_shared_index(processed_dir: str, embeddings: Embeddings, model_name: str) -> MmapVectorStore:
+    """
+    Open the index built when the snapshot was ingested. Nothing is built or written
+    here; a missing or stale index raises FileNotFoundError / ValueError.
+    """
+    if read_index_meta(processed_dir) is None or not MmapChunks.available(processed_dir):
+        raise FileNotFoundError(f"No shared index in {processed_dir}; ingest with INDEX_MODE=mmap "
+                                f"or run shared_index.py")
+    if not is_index_current(processed_dir, model_name):
+        raise ValueError(f"The shared index in {processed_dir} was built from other chunks or for another "
+                         f"embedding model than {model_name}; run shared_index.py")
+    return MmapVectorStore(processed_dir, embeddings)
+
+
+def reindex_current_snapshot(root: str, embeddings: Embeddings, model_name: str) -> Path:
+    """
+    Publish a copy of the current snapshot with a fresh index. The chunk files are
+    hard-linked (they never change once published), so only the index is new.
+    """
+    from chunk_loader import load_processed_chunks
+
+    store = SnapshotStore(root)
+    current = store.current()
+    with store.pin(current), store.build() as snapshot_dir:
+        for path in current.iterdir():
+            if path.is_file() and not path.name.startswith("."):
+                try:
+                    os.link(path, snapshot_dir / path.name)
+                except OSError:
+                    shutil.copy2(path, snapshot_dir / path.name)
+        if not MmapChunks.available(str(snapshot_dir)):
+            # Data processed before the mmap layout existed
+            write_chunk_texts(load_processed_chunks(str(current)) or [], snapshot_dir)
+        build_shared_index(str(snapshot_dir), embeddings, model_name)
+    return store.current()
+
+
+if __name__ == "__main__":
+    from langchain_community.embeddings import HuggingFaceEmbeddings
+
+    model = "sentence-transformers/all-MiniLM-L6-v2"
+    reindex_current_snapshot("../processed_data", HuggingFaceEmbeddings(model_name=model), model)
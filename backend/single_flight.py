@@ -0,0 +1,133 @@
+"""
+Single-Flight LLM Calls for RAG Chatbot
+Identical prompts that are in flight at the same time share one LLM call instead of each paying for their own
+"""
+
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+
+def normalize_prompt(messages: List[BaseMessage]) -> Tuple[Tuple[str, str], ...]:
+    """
+    Role and whitespace-collapsed text of every message. Case is kept: unlike the
+    embedding cache key, the LLM sees the prompt verbatim and case can change the answer.
+    """
+    return tuple((message.type, " ".join(str(message.content).split())) for message in messages)
+
+
+class SingleFlight:
+    """
+    Per-key call coalescing. The first caller for a key runs the function; callers
+    arriving with the same key while it runs wait for that result (or exception)
+    instead of starting their own. Nothing is kept once the call finishes, so this
+    is not a cache: a later identical call runs again.
+    """
+
+    def __init__(self):
+        self._in_flight: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.executed = 0
+        self.coalesced = 0
+        self.max_waiters = 0
+        self._waiters: Dict[Hashable, int] = {}
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """fn()'s result and whether it was shared from another caller's call"""
+        lead = False
+        with self._lock:
+            self.calls += 1
+            future = self._in_flight.get(key)
+            if future is not None:
+                self.coalesced += 1
+                self._waiters[key] += 1
+                self.max_waiters = max(self.max_waiters, self._waiters[key])
+            else:
+                future = self._in_flight[key] = Future()
+                self._waiters[key] = 0
+                self.executed += 1
+                lead = True
+        if not lead:
+            return future.result(), True
+
+        try:
+            future.set_result(fn())
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+                del self._waiters[key]
+        return future.result(), False
+
+    def coalescing_rate(self) -> float:
+        """Share of calls that were served by another caller's in-flight call"""
+        return self.coalesced / self.calls if self.calls else 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            in_flight = len(self._in_flight)
+        return {"calls": self.calls, "executed": self.executed, "coalesced": self.coalesced,
+                "coalescing_rate": round(self.coalescing_rate(), 3), "max_waiters": self.max_waiters,
+                "in_flight": in_flight}
+
+
+class SingleFlightChatModel(BaseChatModel):
+    """
+    Wraps a chat model so concurrent calls with the same (namespace, model, normalized
+    prompt, call options) share one request. The namespace is the data snapshot the
+    chain answers from, so identical prompts built from different data never mix.
+    Callers that got a shared result see no provider token usage (nothing was spent
+    on their behalf) and "coalesced": True in llm_output.
+    """
+
+    llm: Any
+    namespace: str = ""
+    group: Any = None
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        if self.group is None:
+            self.group = shared_single_flight()
+
+    @property
+    def _llm_type(self) -> str:
+        return f"single-flight-{self.llm._llm_type}"
+
+    def _key(self, messages: List[BaseMessage], stop: Optional[List[str]], kwargs: Dict[str, Any]) -> Hashable:
+        model = getattr(self.llm, "model", None) or getattr(self.llm, "model_name", "")
+        options = tuple(sorted((name, repr(value)) for name, value in kwargs.items()))
+        return (self.namespace, model, normalize_prompt(messages), tuple(stop or ()), options)
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager=None, **kwargs: Any) -> ChatResult:
+        result, shared = self.group.do(
+            self._key(messages, stop, kwargs),
+            lambda: self.llm._generate(messages, stop=stop, **kwargs)
+        )
+        if not shared:
+            return result
+        generations = [
+            ChatGeneration(message=generation.message.model_copy(update={"usage_metadata": None}),
+                           generation_info=generation.generation_info)
+            for generation in result.generations
+        ]
+        return ChatResult(generations=generations, llm_output={"coalesced": True})
+
+
+_shared_group: Optional[SingleFlight] = None
+_shared_lock = threading.Lock()
+
+
+def shared_single_flight() -> SingleFlight:
+    """One group per process, so sessions on different chain instances still coalesce"""
+    global _shared_group
+    with _shared_lock:
+        if _shared_group is None:
+            _shared_group = SingleFlight()
+        return _shared_group
@@ -0,0 +1,192 @@
+"""
+Snapshot Store for RAG Chatbot
+Each ingest builds a new versioned data directory; readers switch over by an atomic pointer swap and old versions are collected later
+"""
+
+import json
+import os
+import pickle
+import shutil
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator, List, Union
+
+from chunk_store import JSON_FILE, PICKLE_FILE, PROVENANCE_FILE, MmapChunks, read_metadata
+
+CURRENT_FILE = "CURRENT"
+VERSIONS_DIR = "versions"
+RETIRED_FILE = ".retired"
+BUILD_PREFIX = ".build-"
+LEGACY_VERSION = "legacy"
+
+DEFAULT_KEEP = 1
+# Readers in other processes can't pin a version, so a retired one lives at least this long
+DEFAULT_GRACE_SECONDS = 600
+# Builds left behind by a crash are removed once they are this old
+STALE_BUILD_SECONDS = 24 * 3600
+
+
+def resolve_data_dir(path: Union[str, Path]) -> Path:
+    """The directory readers should use: the current snapshot of a snapshot root, else the path itself"""
+    root = Path(path)
+    try:
+        version = (root / CURRENT_FILE).read_text(encoding='utf-8').strip()
+    except FileNotFoundError:
+        return root
+    return root / VERSIONS_DIR / version
+
+
+def validate_snapshot(path: Path) -> int:
+    """Check a built snapshot is complete and self-consistent; returns its chunk count"""
+    metadata = read_metadata(str(path))
+    if metadata is not None:
+        if not MmapChunks.available(str(path)):
+            raise ValueError(f"Snapshot {path.name} has no chunk text store")
+        count = len(MmapChunks(str(path)))
+        provenance_count = None
+        if (path / PROVENANCE_FILE).exists():
+            with open(path / PROVENANCE_FILE, 'rb') as f:
+                provenance_count = sum(1 for _ in f)
+    else:
+        # A bundle built before the streaming chunk store
+        pickle_file, json_file = path / PICKLE_FILE, path / JSON_FILE
+        if pickle_file.exists():
+            with open(pickle_file, 'rb') as f:
+                data = pickle.load(f)
+        elif json_file.exists():
+            with open(json_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        else:
+            raise ValueError(f"Snapshot {path.name} has no chunks file")
+        count, metadata = len(data["chunks"]), data["metadata"]
+        provenance_count = len(data["provenance"]) if "provenance" in data else None
+        if MmapChunks.available(str(path)) and len(MmapChunks(str(path))) != count:
+            raise ValueError(f"Snapshot {path.name}: chunk text store doesn't match the chunks file")
+
+    if not count:
+        raise ValueError(f"Snapshot {path.name} has no chunks")
+    if metadata.get("total_chunks", count) != count:
+        raise ValueError(f"Snapshot {path.name}: metadata says {metadata['total_chunks']} chunks, found {count}")
+    if provenance_count is not None and provenance_count != count:
+        raise ValueError(f"Snapshot {path.name}: {provenance_count} provenance records for {count} chunks")
+    return count
+
+
+class SnapshotStore:
+    """
+    Versions live in root/versions/<version>; root/CURRENT names the one readers use
+    and is replaced atomically (os.replace), so a reader sees either the old or the
+    new version, never a half-written one. Data written before snapshots existed
+    (files directly in root) is served as the "legacy" version until the first publish.
+    """
+
+    def __init__(self, root: str = "../processed_data", keep: int = DEFAULT_KEEP,
+                 grace_seconds: float = DEFAULT_GRACE_SECONDS):
+        self.root = Path(root)
+        self.versions_dir = self.root / VERSIONS_DIR
+        self.keep = keep
+        self.grace_seconds = grace_seconds
+        self._pins: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def current(self) -> Path:
+        return resolve_data_dir(self.root)
+
+    def current_version(self) -> str:
+        current = self.current()
+        return current.name if current != self.root else LEGACY_VERSION
+
+    def versions(self) -> List[str]:
+        if not self.versions_dir.exists():
+            return []
+        return sorted(p.name for p in self.versions_dir.iterdir() if p.is_dir() and not p.name.startswith("."))
+
+    @contextmanager
+    def pin(self, version: Union[str, Path]) -> Iterator[None]:
+        """Keep a version from being collected while this process is reading it"""
+        name = Path(version).name
+        with self._lock:
+            self._pins[name] += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._pins[name] -= 1
+                if self._pins[name] <= 0:
+                    del self._pins[name]
+
+    @contextmanager
+    def build(self) -> Iterator[Path]:
+        """
+        Yield an empty directory to write a new version into. When the block finishes
+        the version is validated and published; if it raises (or validation fails)
+        the directory is removed and the current version stays in place.
+        """
+        version = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+        build_dir = self.versions_dir / f"{BUILD_PREFIX}{version}-{os.getpid()}"
+        build_dir.mkdir(parents=True)
+        try:
+            yield build_dir
+            validate_snapshot(build_dir)
+            os.rename(build_dir, self.versions_dir / version)
+        except BaseException:
+            shutil.rmtree(build_dir, ignore_errors=True)
+            raise
+        self.activate(version)
+        self.gc()
+
+    def activate(self, version: str):
+        """Point readers at an existing version (publishing, or rolling back to a kept one)"""
+        if not (self.versions_dir / version).is_dir():
+            raise FileNotFoundError(f"No snapshot version {version!r}")
+        previous = self.current_version()
+        tmp_file = self.root / f"{CURRENT_FILE}.tmp-{os.getpid()}-{threading.get_ident()}"
+        tmp_file.write_text(version, encoding='utf-8')
+        os.replace(tmp_file, self.root / CURRENT_FILE)
+        (self.versions_dir / version / RETIRED_FILE).unlink(missing_ok=True)
+        if previous not in (version, LEGACY_VERSION):
+            (self.versions_dir / previous / RETIRED_FILE).write_text(str(time.time()), encoding='utf-8')
+        print(f"Snapshot {version} is now current (was {previous})")
+
+    def gc(self) -> List[str]:
+        """
+        Delete retired versions beyond the newest `keep` once their grace period has
+        passed and nothing in this process has them pinned; also clears abandoned builds.
+        """
+        if not self.versions_dir.exists():
+            return []
+        now = time.time()
+        current = self.current_version()
+        removed = []
+
+        retired = []
+        for path in self.versions_dir.iterdir():
+            if path.name.startswith(BUILD_PREFIX):
+                if now - path.stat().st_mtime > STALE_BUILD_SECONDS:
+                    shutil.rmtree(path, ignore_errors=True)
+                    removed.append(path.name)
+                continue
+            if path.name == current or not path.is_dir():
+                continue
+            try:
+                retired_at = float((path / RETIRED_FILE).read_text(encoding='utf-8'))
+            except (FileNotFoundError, ValueError):
+                # Never published, or published by an older process: age by directory time
+                retired_at = path.stat().st_mtime
+            retired.append((retired_at, path))
+
+        retired.sort(reverse=True)
+        with self._lock:
+            pinned = set(self._pins)
+        for retired_at, path in retired[self.keep:]:
+            if path.name in pinned or now - retired_at < self.grace_seconds:
+                continue
+            shutil.rmtree(path, ignore_errors=True)
+            removed.append(path.name)
+        if removed:
+            print(f"Removed old snapshots: {', '.join(removed)}")
+        return removed
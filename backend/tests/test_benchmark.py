@@ -0,0 +1,23 @@
+from pathlib import Path
+
+import pytest
+
+from benchmark import check_golden_set, load_corpus, load_golden_set, score_retrieval
+
+BENCHMARKS = Path(__file__).resolve().parents[2] / "benchmarks"
+
+
+def test_fixture_corpus_covers_every_golden_question():
+    documents = load_corpus(str(BENCHMARKS / "corpus.json"))
+    check_golden_set(documents, load_golden_set(str(BENCHMARKS / "golden_set.json")))
+
+
+def test_missing_snippet_is_reported():
+    with pytest.raises(ValueError, match="Who wrote it"):
+        check_golden_set([("doc", "some text")], [{"question": "Who wrote it?", "relevant": ["Jane Doe"]}])
+
+
+def test_score_retrieval_recall_and_rank():
+    retrieved = ["nothing here", "Python - 70% and CSS - 45%"]
+    assert score_retrieval(retrieved, ["python - 70%", "Java"]) == (0.5, 0.5)
+    assert score_retrieval(retrieved, ["Go"]) == (0.0, 0.0)
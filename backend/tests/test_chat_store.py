@@ -0,0 +1,43 @@
+import os
+import time
+
+from chat_store import MessagePager, prune_sessions
+from session_store import SessionStore
+
+
+def archive(root, session_id, age_seconds):
+    pager = MessagePager(session_id, root=str(root), window=2, page_size=2)
+    pager.spill([{"role": "user", "text": str(i)} for i in range(4)])
+    old = time.time() - age_seconds
+    os.utime(pager.dir, (old, old))
+    return pager
+
+
+def test_spilled_pages_come_back_oldest_first(tmp_path):
+    pager = MessagePager("s", root=str(tmp_path), window=2, page_size=2)
+    messages = [{"role": "user", "text": str(i)} for i in range(7)]
+    pager.spill(messages)
+    assert [m["text"] for m in messages] == ["6"]
+    assert pager.pages == 3
+    assert [m["text"] for m in pager.older(2)] == ["2", "3", "4", "5"]
+    # A pager opened after a restart finds the pages already on disk
+    assert MessagePager("s", root=str(tmp_path), window=2, page_size=2).archived_count() == 6
+
+
+def test_prune_keeps_archives_of_recently_saved_sessions(tmp_path):
+    store = SessionStore(str(tmp_path / "sessions.sqlite"))
+    archive(tmp_path / "archives", "active", age_seconds=3600)
+    archive(tmp_path / "archives", "idle", age_seconds=3600)
+    store.save("active", {"chat_history": []})
+
+    removed = prune_sessions(str(tmp_path / "archives"), max_age_seconds=60, active=store.active(60))
+    assert removed == 1
+    assert sorted(p.name for p in (tmp_path / "archives").iterdir()) == ["active"]
+    store.close()
+
+
+def test_prune_without_a_session_store_uses_the_directory_time(tmp_path):
+    archive(tmp_path, "old", age_seconds=3600)
+    archive(tmp_path, "new", age_seconds=0)
+    assert prune_sessions(str(tmp_path), max_age_seconds=60) == 1
+    assert [p.name for p in tmp_path.iterdir()] == ["new"]
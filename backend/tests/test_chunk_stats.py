@@ -0,0 +1,66 @@
+from chunk_stats import (ChunkStatsBuilder, compute_chunk_stats, length_histogram, load_chunk_stats,
+                         save_chunk_stats, STATS_FILE)
+from chunk_store import ChunkStore
+from chunker import count_tokens
+
+
+def test_length_histogram_buckets():
+    histogram = length_histogram([0, 99, 100, 249, 1999, 2000, 50000])
+    assert histogram["0-99"] == 2
+    assert histogram["100-249"] == 2
+    assert histogram["1500-1999"] == 1
+    assert histogram["2000+"] == 2
+    assert sum(histogram.values()) == 7
+
+
+def test_stats_with_provenance_count_sources_and_duplicates():
+    chunks = ["Intro " * 30, "Footer text", "Body " * 100, "Footer text"]
+    provenance = [{"source": "a.html", "tokens": 30}, {"source": "a.html", "tokens": 2},
+                  {"source": "b.html", "tokens": 100}, {"source": "b.html", "tokens": 2}]
+    stats = compute_chunk_stats(chunks, {"processing_date": "2026-01-01"}, provenance)
+
+    lengths = sorted(len(c) for c in chunks)
+    assert stats["total_chunks"] == 4
+    assert stats["total_characters"] == sum(lengths)
+    assert stats["min_chunk_length"] == lengths[0]
+    assert stats["max_chunk_length"] == lengths[-1]
+    assert stats["median_chunk_length"] == (lengths[1] + lengths[2]) / 2
+    assert stats["total_tokens"] == 134
+    assert stats["duplicate_chunks"] == 1
+    assert stats["duplicate_ratio"] == 0.25
+    assert stats["total_sources"] == 2
+    assert stats["top_sources"][0] == {"source": "a.html", "chunks": 2,
+                                       "characters": len(chunks[0]) + len(chunks[1])}
+
+
+def test_stats_without_provenance_use_metadata_sources():
+    chunks = ["first chunk of text", "second chunk of text"]
+    metadata = {"source_url": "https://example.com", "total_characters": 999}
+    stats = compute_chunk_stats(chunks, metadata)
+    assert stats["total_tokens"] == sum(count_tokens(c) for c in chunks)
+    assert stats["total_characters"] == 999
+    assert stats["source_url"] == "https://example.com"
+    assert stats["top_sources"] == [{"source": "https://example.com", "chunks": 2,
+                                     "characters": sum(len(c) for c in chunks)}]
+
+
+def test_empty_corpus():
+    stats = ChunkStatsBuilder().result({})
+    assert stats["total_chunks"] == 0
+    assert stats["avg_chunk_length"] == 0
+    assert stats["duplicate_ratio"] == 0.0
+
+
+def test_round_trip(tmp_path):
+    stats = compute_chunk_stats(["some text here"], {})
+    assert save_chunk_stats(str(tmp_path), stats).name == STATS_FILE
+    assert load_chunk_stats(str(tmp_path)) == stats
+    assert load_chunk_stats(str(tmp_path / "missing")) is None
+
+
+def test_chunk_store_writes_the_same_stats(tmp_path):
+    chunks = ["Alpha " * 40, "Beta " * 20, "Beta " * 20]
+    provenance = [{"source": "doc.txt", "tokens": count_tokens(c)} for c in chunks]
+    metadata = {"total_chunks": 3}
+    ChunkStore(str(tmp_path)).save(chunks, metadata, provenance)
+    assert load_chunk_stats(str(tmp_path)) == compute_chunk_stats(chunks, metadata, provenance)
@@ -0,0 +1,20 @@
+from chunk_store import (CHUNKS_HASH_KEY, ChunkStore, MmapChunks, read_metadata, stored_chunks_hash,
+                         write_chunk_texts)
+
+
+def test_hash_covers_the_text_not_just_the_chunk_lengths(tmp_path):
+    ChunkStore(str(tmp_path / "a")).save(["alpha", "beta"], {"total_chunks": 2})
+    ChunkStore(str(tmp_path / "b")).save(["omega", "zeta"], {"total_chunks": 2})
+    ChunkStore(str(tmp_path / "c")).save(["alphab", "eta"], {"total_chunks": 2})
+    hashes = {stored_chunks_hash(str(tmp_path / name)) for name in "abc"}
+    assert len(hashes) == 3
+
+
+def test_hash_is_recorded_in_metadata_and_matches_the_files(tmp_path):
+    ChunkStore(str(tmp_path / "stored")).save(["alpha", "beta"], {"total_chunks": 2})
+    recorded = read_metadata(str(tmp_path / "stored"))[CHUNKS_HASH_KEY]
+    (tmp_path / "plain").mkdir()
+    assert write_chunk_texts(["alpha", "beta"], tmp_path / "plain") == recorded
+    # Data without metadata.json is hashed from its files
+    assert stored_chunks_hash(str(tmp_path / "plain")) == recorded
+    assert list(MmapChunks(str(tmp_path / "plain"))) == ["alpha", "beta"]
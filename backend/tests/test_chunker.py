@@ -0,0 +1,70 @@
+import pytest
+
+from chunker import TokenChunker, chunk_records, count_tokens, split_provenance
+
+TEXT = ("Skills\nPython, AWS, HTML and CSS.\n\nProjects\n"
+        + "Built a scalable web service for thousands of users. " * 120
+        + "\n\nContact\nWrite to us any time.")
+
+
+def test_offsets_point_at_the_chunk_text():
+    records = chunk_records(TEXT, source="cv.txt", chunk_size=60, chunk_overlap=10)
+    assert len(records) > 5
+    for record in records:
+        assert TEXT[record["start"]:record["end"]] == record["text"]
+        assert record["source"] == "cv.txt"
+        assert record["tokens"] == count_tokens(record["text"])
+        assert record["tokens"] <= 60
+
+
+def test_chunks_cover_the_text_in_order_with_overlap():
+    records = chunk_records(TEXT, chunk_size=60, chunk_overlap=10)
+    assert records[0]["start"] == 0
+    assert records[-1]["end"] == len(TEXT)
+    for previous, record in zip(records, records[1:]):
+        assert previous["start"] < record["start"] < previous["end"]
+
+
+def test_short_text_is_one_chunk():
+    assert chunk_records("Hello there, world.") == [
+        {"text": "Hello there, world.", "source": "", "start": 0, "end": 19, "tokens": 5}]
+
+
+def test_page_offsets_are_into_the_pages_joined_with_newlines():
+    pages = [(1, "First page. " * 60), (2, ""), (3, "Third page. " * 60)]
+    joined = "\n".join(text for _, text in pages if text.strip())
+    records = list(TokenChunker(50, 5).chunk_pages(pages, source="doc.pdf"))
+
+    for record in records:
+        assert joined[record["start"]:record["end"]] == record["text"]
+    assert records[0]["page"] == 1
+    assert records[-1]["page_end"] == 3
+    spanning = [r for r in records if r["page"] != r["page_end"]]
+    assert all((r["page"], r["page_end"]) == (1, 3) for r in spanning)
+
+
+def test_streaming_matches_whole_text():
+    pages = [(i, f"Section {i}.\n" + "Words of the page go here. " * 30) for i in range(1, 6)]
+    joined = "\n".join(text for _, text in pages)
+    chunker = TokenChunker(40, 8)
+    streamed = [{k: v for k, v in r.items() if k not in ("page", "page_end")}
+                for r in chunker.chunk_pages(pages)]
+    assert streamed == list(chunker.chunk_text(joined))
+
+
+def test_cuts_prefer_blank_lines():
+    text = ("alpha " * 40).strip() + "\n\n" + ("beta " * 40).strip()
+    first = chunk_records(text, chunk_size=60, chunk_overlap=5)[0]
+    assert first["text"].endswith("alpha")
+
+
+def test_overlap_must_be_smaller_than_chunk_size():
+    with pytest.raises(ValueError):
+        TokenChunker(10, 10)
+
+
+def test_split_provenance_drops_only_the_text():
+    records = chunk_records(TEXT, source="cv.txt", chunk_size=60, chunk_overlap=10)
+    texts, provenance = split_provenance(records)
+    assert texts == [r["text"] for r in records]
+    assert all("text" not in p and p["source"] == "cv.txt" for p in provenance)
@@ -0,0 +1,85 @@
+import pytest
+
+from crawl_cache import CrawlCache, compress, decompress
+from scraper import WebsiteScraper
+
+START = "https://example.com/"
+PAGES = {
+    START: ["/a", "/b"],
+    "https://example.com/a": ["/c", "/"],
+    "https://example.com/b": ["/c", "/d"],
+    "https://example.com/c": [],
+    "https://example.com/d": ["https://other.org/x"],
+}
+
+
+class FakeTransport:
+    def __init__(self):
+        self.fetched = []
+
+    def get(self, url):
+        self.fetched.append(url)
+        links = "".join(f'<a href="{href}">link</a>' for href in PAGES[url])
+        return f"<html><body><p>Page {url} has useful text.</p>{links}</body></html>".encode()
+
+
+def scraper(tmp_path, transport, **kwargs):
+    return WebsiteScraper(pdf_dir=str(tmp_path / "pdfs"), max_pages=None, cache_path=str(tmp_path / "crawl.sqlite"),
+                          transport=transport, **kwargs)
+
+
+def stop_after(pages):
+    calls = {"n": 0}
+
+    def check():
+        calls["n"] += 1
+        return calls["n"] > pages
+    return check
+
+
+@pytest.mark.parametrize("large_crawl", [False, True])
+def test_interrupted_crawl_resumes_without_refetching(tmp_path, large_crawl):
+    first = FakeTransport()
+    done = [url for url, _ in scraper(tmp_path, first, large_crawl=large_crawl).crawl_pages(
+        START, stop_check=stop_after(2))]
+    assert done == first.fetched and len(done) == 2
+
+    cache = CrawlCache(str(tmp_path / "crawl.sqlite"))
+    assert cache.is_resumable(START)
+    cache.close()
+
+    second = FakeTransport()
+    resumed = [url for url, _ in scraper(tmp_path, second, large_crawl=large_crawl).crawl_pages(START)]
+    # Pages from before the interruption come back from the cache, the rest from the network
+    assert resumed[:2] == done
+    assert sorted(resumed) == sorted(PAGES)
+    assert not set(second.fetched) & set(first.fetched)
+    assert sorted(first.fetched + second.fetched) == sorted(PAGES)
+
+    cache = CrawlCache(str(tmp_path / "crawl.sqlite"))
+    assert not cache.is_resumable(START)
+    assert cache.stats(START)["cached_pages"] == len(PAGES)
+    cache.close()
+
+
+def test_finished_crawl_starts_over(tmp_path):
+    list(scraper(tmp_path, FakeTransport()).crawl_pages(START))
+    again = FakeTransport()
+    list(scraper(tmp_path, again).crawl_pages(START))
+    assert sorted(again.fetched) == sorted(PAGES)
+
+
+def test_cached_pages_replay_in_visit_order(tmp_path):
+    list(scraper(tmp_path, FakeTransport()).crawl_pages(START))
+    cache = CrawlCache(str(tmp_path / "crawl.sqlite"))
+    replayed = [url for url, content in cache.iter_pages(START)]
+    cache.close()
+    assert replayed[0] == START
+    assert sorted(replayed) == sorted(PAGES)
+
+
+def test_page_content_round_trips_through_compression():
+    content = b"<html>" + b"repeated text " * 500 + b"</html>"
+    codec, blob = compress(content)
+    assert len(blob) < len(content)
+    assert decompress(codec, blob) == content
@@ -0,0 +1,107 @@
+import pytest
+
+from entities import EntityIndex, extract_entities, has_entities
+from text_quality import ChunkFilter
+
+CHUNKS = [
+    "Contact us at sales@acme.io or call +1 415 555 0134.",
+    "Our team\nJane Doe, CEO\nJohn Smith - CTO",
+    "Pricing\nStarter\n$9 per month\nPro\n$29 per month",
+    "Visit our office at 221 Baker Street, London NW1 6XE.",
+    "Copyright 2019-2023 Acme. All rights reserved.",
+]
+
+
+def build_index(tmp_path, chunks=CHUNKS):
+    return EntityIndex(str(tmp_path)).build(chunks, [{"source": f"page-{i}"} for i in range(len(chunks))])
+
+
+def test_extracts_each_kind():
+    kinds = {kind for text in CHUNKS for kind, _, _ in extract_entities(text)}
+    assert kinds == {"email", "phone", "person", "price", "address"}
+
+
+def test_years_are_not_phone_numbers():
+    assert extract_entities(CHUNKS[4]) == []
+
+
+def test_generic_question_pins_every_entry_of_the_kind(tmp_path):
+    index = build_index(tmp_path)
+    match = index.match("What's your email?")
+    assert match["kinds"] == ["email"]
+    assert not match["direct"]
+    assert match["chunks"] == [0]
+    assert index.answer("What's your email?") is None
+
+
+@pytest.mark.parametrize("question", ["who are you?", "Who is this?", "What is this?", "What do you do?",
+                                      "How can I reach you?", "How do I contact you?", "How much?"])
+def test_generic_who_what_how_questions_are_never_answered(tmp_path, question):
+    assert build_index(tmp_path).answer(question) is None
+
+
+def test_specific_words_must_appear_in_the_context(tmp_path):
+    index = build_index(tmp_path)
+    answer = index.answer("How much is the Pro plan?")
+    assert answer["answer"] == "Price: Pro $29 per month (page-2)"
+    assert index.match("How much is the Enterprise plan?") is None
+
+
+def test_person_by_title(tmp_path):
+    answer = build_index(tmp_path).answer("Who is the CTO?")
+    assert answer["kinds"] == ["person"]
+    assert answer["answer"] == "Person: John Smith, CTO (page-1)"
+
+
+def test_reach_question_pins_email_and_phone(tmp_path):
+    match = build_index(tmp_path).match("How can I reach you?")
+    assert set(match["kinds"]) == {"email", "phone"}
+    assert match["chunks"] == [0]
+
+
+def test_specific_word_answers_a_contact_question(tmp_path):
+    answer = build_index(tmp_path).answer("What is the sales email?")
+    assert answer["answer"] == "Email: sales@acme.io (page-0)"
+
+
+def test_non_lookup_questions_are_not_answered(tmp_path):
+    assert build_index(tmp_path).answer("Tell me about your company history") is None
+
+
+def test_too_many_matches_are_pinned_not_answered(tmp_path):
+    chunks = [f"Write to team{i}@acme.io" for i in range(5)]
+    index = build_index(tmp_path, chunks)
+    assert len(index.match("What is the acme email?")["entries"]) == 5
+    assert not index.match("What is the acme email?")["direct"]
+    assert index.answer("What is the acme email?") is None
+
+
+def test_shared_entry_keeps_each_chunk_once(tmp_path):
+    index = EntityIndex(str(tmp_path))
+    index.add(0, "Footer: hello@acme.io")
+    index.add(0, "Footer: hello@acme.io")
+    index.add(3, "Footer: hello@acme.io")
+    assert index.entries["email"]["hello@acme.io"]["chunks"] == [0, 3]
+
+
+def test_save_and_load_round_trip(tmp_path):
+    build_index(tmp_path).save()
+    loaded = EntityIndex(str(tmp_path)).load()
+    assert loaded.counts() == build_index(tmp_path).counts()
+    assert loaded.answer("Who is the CEO?")["answer"] == "Person: Jane Doe, CEO (page-1)"
+
+
+def test_short_contact_chunk_survives_the_ingest_filter():
+    text = "Contact us at sales@acme.io"
+    assert has_entities(text)
+    assert ChunkFilter().reason(text) == "too_short"
+    assert ChunkFilter(keep_if=has_entities).reason(text) is None
+    assert ChunkFilter(keep_if=has_entities).reason("Read more") == "too_short"
+
+
+def test_digit_heavy_contact_chunk_survives_the_ingest_filter():
+    text = "Tel: +44 20 7946 0958, +44 20 7946 0959, +44 20 7946 0960"
+    assert has_entities(text)
+    assert ChunkFilter().reason(text) == "low_alpha"
+    assert ChunkFilter(keep_if=has_entities).reason(text) is None
+    assert ChunkFilter(keep_if=has_entities).reason("---- |||| 2024-01-01 ==== ++++ 42% ####") == "low_alpha"
@@ -0,0 +1,132 @@
+import asyncio
+import threading
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+import hedging
+from hedging import HedgedChatModel, LatencyTracker
+from metrics import percentile
+
+HEDGE_DELAY_S = 0.05
+
+
+class FakeLLM:
+    """Answers `text` after `delay` seconds, or raises `error`"""
+    _llm_type = "fake"
+
+    def __init__(self, text, delay=0.0, error=None):
+        self.text = text
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+        self.cancelled = False
+
+    async def _agenerate(self, messages, stop=None, **kwargs):
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        if self.error:
+            raise self.error
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.text))])
+
+
+class FixedTracker(LatencyTracker):
+    def percentile(self, pct):
+        return HEDGE_DELAY_S
+
+
+@pytest.fixture(autouse=True)
+def short_hedge_delay(monkeypatch):
+    monkeypatch.setattr(hedging, "MIN_HEDGE_DELAY_S", 0.0)
+
+
+def hedged(*llms, **kwargs):
+    return HedgedChatModel(llms=list(llms), tracker=FixedTracker(), **kwargs)
+
+
+def ask(model):
+    return model.invoke([HumanMessage(content="What do you do?")]).content
+
+
+def test_fast_call_is_not_hedged():
+    first, second = FakeLLM("first"), FakeLLM("second")
+    model = hedged(first, second)
+    assert ask(model) == "first"
+    assert second.calls == 0
+    assert model.stats()["hedged"] == 0
+
+
+def test_slow_call_is_hedged_and_the_faster_answer_wins():
+    first, second = FakeLLM("first", delay=1.0), FakeLLM("second")
+    model = hedged(first, second)
+    assert ask(model) == "second"
+    stats = model.stats()
+    assert (stats["hedged"], stats["hedge_wins"], stats["failovers"]) == (1, 1, 0)
+
+
+def test_losing_request_is_cancelled():
+    first, second = FakeLLM("first", delay=1.0), FakeLLM("second")
+    ask(hedged(first, second))
+    # The cancellation runs on the background loop right after the winner returns
+    hedging.run_sync(asyncio.sleep(0.01))
+    assert first.cancelled
+
+
+def test_primary_answer_still_wins_after_hedging():
+    first, second = FakeLLM("first", delay=0.1), FakeLLM("second", delay=1.0)
+    model = hedged(first, second)
+    assert ask(model) == "first"
+    assert model.stats()["hedged"] == 1
+    assert model.stats()["hedge_wins"] == 0
+
+
+def test_failure_fails_over_to_the_next_key_at_once():
+    first = FakeLLM("first", error=RuntimeError("429 Resource exhausted"))
+    second = FakeLLM("second")
+    model = hedged(first, second)
+    assert ask(model) == "second"
+    assert model.stats()["failovers"] == 1
+    assert model.stats()["hedged"] == 0
+
+
+def test_first_error_is_raised_when_every_attempt_fails():
+    first = FakeLLM("first", error=RuntimeError("quota exceeded on key 1"))
+    second = FakeLLM("second", error=ValueError("key 2 rejected"))
+    with pytest.raises(RuntimeError, match="key 1"):
+        ask(hedged(first, second))
+
+
+def test_deadline_bounds_the_whole_call():
+    model = hedged(FakeLLM("first", delay=5.0), FakeLLM("second", delay=5.0), timeout_s=0.2)
+    with pytest.raises(TimeoutError):
+        ask(model)
+    assert model.stats()["timeouts"] == 1
+
+
+def test_hedging_off_sends_one_request():
+    first, second = FakeLLM("first", delay=0.2), FakeLLM("second")
+    model = hedged(first, second, max_attempts=1)
+    assert ask(model) == "first"
+    assert second.calls == 0
+
+
+def test_counters_are_exact_across_threads():
+    model = hedged(FakeLLM("first"), FakeLLM("second"))
+    threads = [threading.Thread(target=lambda: [ask(model) for _ in range(25)]) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert model.stats()["calls"] == 200
+
+
+def test_percentile_interpolates():
+    assert percentile([], 95) == 0.0
+    assert percentile([3.0], 50) == 3.0
+    assert percentile([1, 2, 3, 4], 50) == 2.5
+    assert percentile([4, 1, 3, 2], 100) == 4
@@ -0,0 +1,78 @@
+import numpy as np
+
+from hierarchical import HierarchicalIndex, HierarchicalRetriever, group_sections
+
+
+class FixedEmbeddings:
+    def __init__(self, vector):
+        self.vector = vector
+
+    def embed_query(self, text):
+        return self.vector
+
+
+def page(source, count, axis, dims=4):
+    """`count` chunks of one page, all pointing roughly along `axis`"""
+    provenance, vectors = [], []
+    for i in range(count):
+        provenance.append({"source": source, "start": i * 10, "end": i * 10 + 10})
+        vector = np.full(dims, 0.05, dtype=np.float32)
+        vector[axis] = 1.0 - 0.01 * i
+        vectors.append(vector)
+    return provenance, vectors
+
+
+def build(pages):
+    provenance, vectors = [], []
+    for source, count, axis in pages:
+        p, v = page(source, count, axis)
+        provenance += p
+        vectors += v
+    texts = [f"{record['source']} chunk {i}" for i, record in enumerate(provenance)]
+    return HierarchicalIndex(texts, provenance, np.array(vectors))
+
+
+def retriever(index, axis, **kwargs):
+    query = np.zeros(4, dtype=np.float32)
+    query[axis] = 1.0
+    return HierarchicalRetriever(index=index, embeddings=FixedEmbeddings(query), search_type="similarity", **kwargs)
+
+
+def test_sections_follow_source_and_size_limit():
+    provenance = page("a", 5, 0)[0] + page("b", 2, 1)[0]
+    assert group_sections(provenance, max_section_chunks=3) == [("a", 0, 3), ("a", 3, 5), ("b", 5, 7)]
+
+
+def test_chunks_come_from_the_top_sections():
+    index = build([("fees", 4, 0), ("hours", 4, 1), ("staff", 4, 2)])
+
+    docs = retriever(index, axis=1, k=3, section_k=1).invoke("When are you open?")
+
+    assert [doc.metadata["source"] for doc in docs] == ["hours"] * 3
+    # Best cosine first within the section
+    assert [doc.metadata["chunk_id"] for doc in docs] == [4, 5, 6]
+
+
+def test_small_top_section_falls_back_to_the_next_best():
+    # The best page has a single chunk, fewer than k
+    index = build([("fees", 1, 0), ("hours", 4, 1), ("staff", 4, 2)])
+    query = np.array([1.0, 0.5, 0.0, 0.0], dtype=np.float32)
+    query /= np.linalg.norm(query)
+
+    assert list(index.search_sections(query, section_k=1)) == [0]
+    assert list(index.search_sections(query, section_k=1, min_chunks=3)) == [0, 1]
+
+    docs = HierarchicalRetriever(index=index, embeddings=FixedEmbeddings(query), search_type="similarity",
+                                 k=3, section_k=1).invoke("How much is it?")
+    assert len(docs) == 3
+    assert docs[0].metadata["source"] == "fees"
+    assert {doc.metadata["source"] for doc in docs[1:]} == {"hours"}
+
+
+def test_expand_merges_neighbours_within_the_section():
+    index = build([("fees", 3, 0), ("hours", 3, 1)])
+
+    docs = retriever(index, axis=0, k=1, section_k=1, expand=1).invoke("fees")
+
+    assert docs[0].metadata["chunk_id"] == 0
+    assert docs[0].metadata["expanded_from"] == [0, 1]
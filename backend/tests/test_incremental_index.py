@@ -0,0 +1,74 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+import ingest
+from preprocess import PDFProcessor
+from shared_index import INDEX_DIR, VECTORS_FILE
+
+A = "Alpha handbook. " + "The alpha team ships reliable pipelines every week. " * 40
+B = "Beta handbook. " + "The beta team answers support tickets within a day. " * 40
+
+
+class CountingEmbeddings:
+    def __init__(self):
+        self.embedded = []
+
+    def embed_documents(self, texts):
+        self.embedded.extend(texts)
+        return [[float(len(text)), float(sum(map(ord, text)) % 997)] for text in texts]
+
+
+@pytest.fixture(autouse=True)
+def text_pdfs(monkeypatch):
+    # The fixture "PDFs" are plain text files
+    monkeypatch.setattr(ingest, "iter_pdf_pages", lambda path, progress=None: iter([(1, Path(path).read_text())]))
+
+
+def processor(tmp_path, embeddings):
+    (tmp_path / "pdfs").mkdir(exist_ok=True)
+    return PDFProcessor(str(tmp_path / "pdfs"), str(tmp_path / "data"), embeddings=embeddings, embedding_model="fake")
+
+
+def vectors(data_dir):
+    return np.load(Path(data_dir) / INDEX_DIR / VECTORS_FILE)
+
+
+def test_only_changed_pdfs_are_embedded_again(tmp_path):
+    embeddings = CountingEmbeddings()
+    pdfs = processor(tmp_path, embeddings)
+    (tmp_path / "pdfs" / "a.pdf").write_text(A)
+    (tmp_path / "pdfs" / "b.pdf").write_text(B)
+    first = pdfs.update(force=True)
+    total = first["metadata"]["total_chunks"]
+    assert len(embeddings.embedded) == total
+    old_vectors, old_dir = vectors(pdfs.data_dir), pdfs.data_dir
+
+    embeddings.embedded.clear()
+    (tmp_path / "pdfs" / "b.pdf").write_text(B.replace("day", "week"))
+    second = pdfs.update()
+
+    assert pdfs.data_dir != old_dir
+    documents = {d["source"]: d for d in second["metadata"]["sources"][0]["documents"]}
+    assert len(embeddings.embedded) == documents["b.pdf"]["chunks"]
+    assert all("week" in text for text in embeddings.embedded)
+    a_old = next(d for d in first["metadata"]["sources"][0]["documents"] if d["source"] == "a.pdf")
+    a_new = documents["a.pdf"]
+    np.testing.assert_array_equal(vectors(pdfs.data_dir)[a_new["chunk_start"]:a_new["chunk_end"]],
+                                  old_vectors[a_old["chunk_start"]:a_old["chunk_end"]])
+
+
+def test_pdf_edited_while_it_is_read_stays_changed(tmp_path, monkeypatch):
+    pdfs = processor(tmp_path, None)
+    path = tmp_path / "pdfs" / "a.pdf"
+    path.write_text(A)
+
+    def read_then_edit(pdf_path, progress=None):
+        text = Path(pdf_path).read_text()
+        path.write_text(A + "Edited after it was read.")
+        yield 1, text
+
+    monkeypatch.setattr(ingest, "iter_pdf_pages", read_then_edit)
+    pdfs.update(force=True)
+    assert pdfs.source_changes()["changed"] == [str(path)]
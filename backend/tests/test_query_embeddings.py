@@ -0,0 +1,104 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from langchain_core.embeddings import Embeddings
+
+from query_embeddings import CachedQueryEmbeddings, QueryEmbeddingCache
+
+
+class FakeEmbeddings(Embeddings):
+    """Vector = [text length]; every embed call is recorded and can be held open"""
+
+    def __init__(self):
+        self.calls = []
+        self.release = threading.Event()
+        self.release.set()
+        self.started = threading.Event()
+
+    def embed_documents(self, texts):
+        self.calls.append(list(texts))
+        self.started.set()
+        self.release.wait()
+        return [[float(len(text))] for text in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+def cached(base, cache=None):
+    return CachedQueryEmbeddings(base, "fake-model", cache or QueryEmbeddingCache(), batch_fn=base.embed_documents)
+
+
+def test_repeated_question_is_a_cache_hit():
+    base = FakeEmbeddings()
+    embeddings = cached(base)
+
+    assert embeddings.embed_query("What are the fees?") == [18.0]
+    # Same question up to whitespace and case
+    assert embeddings.embed_query("  what are the   FEES? ") == [18.0]
+
+    assert base.calls == [["What are the fees?"]]
+    assert embeddings.stats()["hits"] == 1
+    assert embeddings.stats()["misses"] == 1
+
+
+def test_least_recently_used_question_is_evicted():
+    base = FakeEmbeddings()
+    embeddings = cached(base, QueryEmbeddingCache(max_size=2))
+
+    embeddings.embed_query("a")
+    embeddings.embed_query("bb")
+    embeddings.embed_query("a")  # "bb" is now the least recently used
+    embeddings.embed_query("ccc")
+
+    assert embeddings.cache.stats()["evictions"] == 1
+    embeddings.embed_query("a")
+    assert base.calls == [["a"], ["bb"], ["ccc"]]
+    embeddings.embed_query("bb")
+    assert base.calls[-1] == ["bb"]
+
+
+def test_lone_miss_is_encoded_without_waiting():
+    base = FakeEmbeddings()
+    embeddings = cached(base)
+
+    embeddings.embed_query("Where is the office?")
+
+    assert base.calls == [["Where is the office?"]]
+    assert embeddings.stats()["batches"] == 1
+
+
+def test_concurrent_misses_share_one_embed_documents_call():
+    base = FakeEmbeddings()
+    base.release.clear()
+    embeddings = cached(base)
+    questions = [f"question {i}" for i in range(5)]
+
+    with ThreadPoolExecutor(len(questions)) as pool:
+        first = pool.submit(embeddings.embed_query, questions[0])
+        base.started.wait()
+        rest = [pool.submit(embeddings.embed_query, q) for q in questions[1:]]
+        # The others queue up while the first call is running
+        while len(embeddings.batcher._pending) < len(questions) - 1:
+            time.sleep(0.001)
+        base.release.set()
+        vectors = [first.result()] + [f.result() for f in rest]
+
+    assert vectors == [[float(len(q))] for q in questions]
+    assert base.calls[0] == [questions[0]]
+    assert sorted(base.calls[1]) == questions[1:]
+    assert embeddings.stats()["batches"] == 2
+
+
+def test_failed_encode_is_raised_and_not_cached():
+    class Failing(FakeEmbeddings):
+        def embed_documents(self, texts):
+            raise RuntimeError("quota exceeded")
+
+    embeddings = cached(Failing())
+    with pytest.raises(RuntimeError, match="quota"):
+        embeddings.embed_query("anything")
+    # Nothing was cached, so the next call tries again
+    assert embeddings.cache.stats()["size"] == 0
@@ -0,0 +1,80 @@
+from types import SimpleNamespace
+from typing import Any, Dict, List
+
+from langchain.chains.base import Chain
+
+from question_router import FastPathQuestionGenerator, enable_fast_path, last_human_turn, needs_condensing
+
+HISTORY = "Human: What services do you offer?\nAssistant: Web design and hosting."
+
+
+class FakeCondenseChain(Chain):
+    """Stands in for the LLM condense step and counts its calls"""
+    calls: int = 0
+
+    @property
+    def input_keys(self) -> List[str]:
+        return ["question", "chat_history"]
+
+    @property
+    def output_keys(self) -> List[str]:
+        return ["text"]
+
+    def _call(self, inputs: Dict[str, Any], run_manager=None) -> Dict[str, str]:
+        self.calls += 1
+        return {"text": "How much does web hosting cost?"}
+
+
+def topic_embedding(text):
+    """Two topics: anything about services or pricing, and anything else"""
+    lowered = text.lower()
+    return [1.0, 0.0] if any(word in lowered for word in ("service", "pricing", "cost")) else [0.0, 1.0]
+
+
+def test_first_question_is_never_condensed():
+    assert not needs_condensing("What does it cost?", "")
+
+
+def test_last_human_turn():
+    assert last_human_turn(HISTORY) == "What services do you offer?"
+    assert last_human_turn("") == ""
+
+
+def test_referring_words_and_follow_up_openers_need_condensing():
+    assert needs_condensing("How much does it cost per month?", HISTORY)
+    assert needs_condensing("What about the opening hours on weekends?", HISTORY)
+
+
+def test_standalone_question_skips_condensing():
+    assert not needs_condensing("Where is your main office located?", HISTORY)
+
+
+def test_short_question_uses_topic_similarity_when_available():
+    # Without embeddings a short question is assumed to lean on the previous turn
+    assert needs_condensing("Pricing?", HISTORY)
+    assert needs_condensing("Pricing?", HISTORY, embed_fn=topic_embedding)
+    assert not needs_condensing("Office address?", HISTORY, embed_fn=topic_embedding)
+
+
+def test_fast_path_only_calls_the_llm_for_follow_ups():
+    condense = FakeCondenseChain()
+    generator = FastPathQuestionGenerator(condense_chain=condense)
+
+    standalone = generator.invoke({"question": "Where is your main office located?", "chat_history": HISTORY})
+    follow_up = generator.invoke({"question": "How much does it cost?", "chat_history": HISTORY})
+
+    assert standalone["text"] == "Where is your main office located?"
+    assert follow_up["text"] == "How much does web hosting cost?"
+    assert condense.calls == 1
+    assert generator.skip_rate() == 0.5
+
+
+def test_enable_fast_path_wraps_once():
+    condense = FakeCondenseChain()
+    qa_chain = SimpleNamespace(question_generator=condense)
+
+    enable_fast_path(qa_chain)
+    enable_fast_path(qa_chain)
+
+    assert isinstance(qa_chain.question_generator, FastPathQuestionGenerator)
+    assert qa_chain.question_generator.condense_chain is condense
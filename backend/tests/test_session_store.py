@@ -0,0 +1,57 @@
+import pytest
+
+import session_store
+from session_store import SessionStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SessionStore(str(tmp_path / "sessions.sqlite"))
+    yield store
+    store.close()
+
+
+def save_at(store, monkeypatch, session_id, state, when):
+    monkeypatch.setattr(session_store.time, "time", lambda: when)
+    store.save(session_id, state)
+
+
+def test_round_trip_restores_history_tuples(store):
+    state = {"chat_history": [("Hi?", "Hello!")], "messages": [{"role": "user", "content": "Hi?"}],
+             "processed": True, "current_url": "https://example.com", "current_key_index": 1}
+    store.save("a", state)
+
+    assert store.load("a") == state
+    assert store.load("missing") is None
+
+
+def test_idle_sessions_are_evicted(store, monkeypatch):
+    save_at(store, monkeypatch, "old", {"chat_history": []}, when=1000.0)
+    save_at(store, monkeypatch, "recent", {"chat_history": []}, when=1900.0)
+
+    monkeypatch.setattr(session_store.time, "time", lambda: 2000.0)
+    assert store.active(max_idle_seconds=500) == {"recent"}
+    assert store.evict_idle(max_idle_seconds=500) == ["old"]
+
+    assert store.load("old") is None
+    assert store.load("recent") is not None
+    assert store.stats()["sessions"] == 1
+
+
+def test_saving_again_keeps_a_session_alive(store, monkeypatch):
+    save_at(store, monkeypatch, "a", {"chat_history": []}, when=1000.0)
+    save_at(store, monkeypatch, "a", {"chat_history": [("Q", "A")]}, when=1900.0)
+
+    monkeypatch.setattr(session_store.time, "time", lambda: 2000.0)
+    assert store.evict_idle(max_idle_seconds=500) == []
+    assert store.load("a")["chat_history"] == [("Q", "A")]
+
+
+def test_delete_and_stats(store):
+    store.save("a", {"chat_history": [], "messages": []})
+    store.save("b", {"chat_history": []})
+    store.delete("a")
+
+    stats = store.stats()
+    assert stats["sessions"] == 1
+    assert stats["stored_bytes"] > 0
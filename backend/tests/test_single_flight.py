@@ -0,0 +1,137 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from single_flight import SingleFlight, SingleFlightChatModel, normalize_prompt
+
+# Holds every fake call until all callers have joined it
+release = threading.Event()
+
+
+def run_together(group, key, fn, callers=5):
+    """Start `callers` calls of the same key while the leader is still running"""
+    started = threading.Event()
+
+    def leader_fn():
+        started.set()
+        return fn()
+
+    with ThreadPoolExecutor(callers) as pool:
+        leader = pool.submit(group.do, key, leader_fn)
+        started.wait()
+        followers = [pool.submit(group.do, key, fn) for _ in range(callers - 1)]
+        # Followers must have joined before the leader finishes
+        while group.stats()["coalesced"] < callers - 1:
+            time.sleep(0.001)
+        release.set()
+        return [leader] + followers
+
+
+@pytest.fixture(autouse=True)
+def reset_release():
+    release.clear()
+    yield
+    release.set()
+
+
+def test_concurrent_calls_share_one_execution():
+    group = SingleFlight()
+    calls = []
+
+    def fn():
+        calls.append(1)
+        release.wait(5)
+        return "answer"
+
+    futures = run_together(group, "key", fn)
+    results = [f.result() for f in futures]
+    assert len(calls) == 1
+    assert results[0] == ("answer", False)
+    assert results[1:] == [("answer", True)] * 4
+    assert group.stats()["in_flight"] == 0
+    assert group.stats()["max_waiters"] == 4
+
+
+def test_leader_exception_reaches_every_waiter():
+    group = SingleFlight()
+
+    def fn():
+        release.wait(5)
+        raise RuntimeError("429 quota exceeded")
+
+    futures = run_together(group, "key", fn)
+    for future in futures:
+        with pytest.raises(RuntimeError, match="429"):
+            future.result()
+    assert group.stats()["executed"] == 1
+    assert group.stats()["in_flight"] == 0
+
+
+def test_failed_key_runs_again_afterwards():
+    group = SingleFlight()
+    with pytest.raises(ValueError):
+        group.do("key", lambda: (_ for _ in ()).throw(ValueError("boom")))
+    assert group.do("key", lambda: "recovered") == ("recovered", False)
+
+
+def test_different_keys_do_not_coalesce():
+    group = SingleFlight()
+    assert group.do("a", lambda: 1) == (1, False)
+    assert group.do("b", lambda: 2) == (2, False)
+    assert group.stats()["coalesced"] == 0
+
+
+def test_prompt_key_ignores_whitespace_but_not_case():
+    assert normalize_prompt([HumanMessage(content="What  is\nthis?")]) == \
+        normalize_prompt([HumanMessage(content="What is this?")])
+    assert normalize_prompt([HumanMessage(content="what is this?")]) != \
+        normalize_prompt([HumanMessage(content="What is this?")])
+
+
+class CountingLLM:
+    _llm_type = "counting"
+    model = "fake-model"
+
+    def __init__(self, error=None):
+        self.calls = 0
+        self.error = error
+
+    def _generate(self, messages, stop=None, **kwargs):
+        self.calls += 1
+        release.wait(5)
+        if self.error:
+            raise self.error
+        message = AIMessage(content="shared answer",
+                            usage_metadata={"input_tokens": 10, "output_tokens": 2, "total_tokens": 12})
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+def invoke_concurrently(model, callers=4):
+    with ThreadPoolExecutor(callers) as pool:
+        futures = [pool.submit(model.invoke, "Same question?") for _ in range(callers)]
+        while model.group.stats()["coalesced"] < callers - 1:
+            time.sleep(0.001)
+        release.set()
+        return futures
+
+
+def test_chat_model_shares_the_answer_without_usage():
+    llm = CountingLLM()
+    model = SingleFlightChatModel(llm=llm, namespace="snapshot-1", group=SingleFlight())
+    messages = [f.result() for f in invoke_concurrently(model)]
+    assert llm.calls == 1
+    assert {m.content for m in messages} == {"shared answer"}
+    assert sum(m.usage_metadata is not None for m in messages) == 1
+
+
+def test_chat_model_propagates_errors_to_waiters():
+    llm = CountingLLM(error=RuntimeError("resource exhausted"))
+    model = SingleFlightChatModel(llm=llm, namespace="snapshot-1", group=SingleFlight())
+    for future in invoke_concurrently(model):
+        with pytest.raises(RuntimeError, match="resource exhausted"):
+            future.result()
+    assert llm.calls == 1
@@ -0,0 +1,102 @@
+import os
+import time
+
+import pytest
+
+from chunk_store import ChunkStore, MmapChunks
+from snapshots import BUILD_PREFIX, STALE_BUILD_SECONDS, SnapshotStore, resolve_data_dir
+
+
+def publish(store, *chunks):
+    with store.build() as snapshot_dir:
+        ChunkStore(str(snapshot_dir)).save(list(chunks), {"total_chunks": len(chunks)},
+                                           [{"source": "test"} for _ in chunks])
+    return store.current_version()
+
+
+def texts(path):
+    return list(MmapChunks(str(path)))
+
+
+def test_build_publishes_a_new_current_version(tmp_path):
+    store = SnapshotStore(str(tmp_path), keep=0, grace_seconds=0)
+    assert store.current_version() == "legacy"
+    version = publish(store, "first chunk")
+    assert store.versions() == [version]
+    assert resolve_data_dir(tmp_path) == tmp_path / "versions" / version
+    assert texts(store.current()) == ["first chunk"]
+
+
+def test_failed_build_keeps_the_current_version(tmp_path):
+    store = SnapshotStore(str(tmp_path), keep=0, grace_seconds=0)
+    version = publish(store, "good chunk")
+    with pytest.raises(RuntimeError):
+        with store.build() as snapshot_dir:
+            ChunkStore(str(snapshot_dir)).save(["half"], {"total_chunks": 1})
+            raise RuntimeError("crawl failed")
+    assert store.current_version() == version
+    assert store.versions() == [version]
+    assert not any(p.name.startswith(BUILD_PREFIX) for p in (tmp_path / "versions").iterdir())
+
+
+def test_invalid_snapshot_is_never_published(tmp_path):
+    store = SnapshotStore(str(tmp_path), keep=0, grace_seconds=0)
+    version = publish(store, "good chunk")
+    with pytest.raises(ValueError, match="metadata says"):
+        with store.build() as snapshot_dir:
+            ChunkStore(str(snapshot_dir)).save(["one"], {"total_chunks": 2})
+    with pytest.raises(ValueError, match="no chunks"):
+        publish(store)
+    assert store.current_version() == version
+
+
+def test_gc_skips_pinned_versions_until_released(tmp_path):
+    store = SnapshotStore(str(tmp_path), keep=0, grace_seconds=0)
+    old = publish(store, "old data")
+    with store.pin(store.current()):
+        new = publish(store, "new data")
+        # The reader of the old version still sees its files
+        assert old in store.versions()
+        assert texts(tmp_path / "versions" / old) == ["old data"]
+    assert store.gc() == [old]
+    assert store.versions() == [new]
+
+
+def test_gc_keeps_the_newest_retired_versions(tmp_path):
+    store = SnapshotStore(str(tmp_path), keep=1, grace_seconds=0)
+    first = publish(store, "one")
+    second = publish(store, "two")
+    third = publish(store, "three")
+    assert first not in store.versions()
+    assert store.versions() == [second, third]
+
+
+def test_gc_waits_for_the_grace_period(tmp_path):
+    store = SnapshotStore(str(tmp_path), keep=0, grace_seconds=3600)
+    old = publish(store, "old")
+    new = publish(store, "new")
+    assert store.versions() == [old, new]
+    assert store.gc() == []
+
+
+def test_activate_rolls_back_to_a_kept_version(tmp_path):
+    store = SnapshotStore(str(tmp_path), keep=1, grace_seconds=0)
+    old = publish(store, "old")
+    publish(store, "new")
+    store.activate(old)
+    assert texts(store.current()) == ["old"]
+    with pytest.raises(FileNotFoundError):
+        store.activate("19700101-000000-000000")
+
+
+def test_gc_removes_abandoned_builds(tmp_path):
+    store = SnapshotStore(str(tmp_path), keep=0, grace_seconds=0)
+    publish(store, "data")
+    abandoned = tmp_path / "versions" / f"{BUILD_PREFIX}crashed"
+    abandoned.mkdir()
+    recent = tmp_path / "versions" / f"{BUILD_PREFIX}running"
+    recent.mkdir()
+    old = time.time() - STALE_BUILD_SECONDS - 60
+    os.utime(abandoned, (old, old))
+    assert store.gc() == [abandoned.name]
+    assert recent.exists()
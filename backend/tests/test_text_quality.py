@@ -0,0 +1,65 @@
+import threading
+
+import pytest
+
+from text_quality import ChunkFilter
+
+
+@pytest.mark.parametrize("text", ["", "   ", "\n\n", " \t\n "])
+def test_whitespace_only_is_empty_even_without_min_chars(text):
+    assert ChunkFilter(min_chars=0).reason(text) == "empty"
+
+
+def test_short_chunk_is_too_short():
+    assert ChunkFilter(min_chars=20).reason("Short heading") == "too_short"
+
+
+def test_whitespace_does_not_count_towards_length():
+    text = "a b c d e f g h i j"
+    assert ChunkFilter(min_chars=11).reason(text) == "too_short"
+    assert ChunkFilter(min_chars=10).reason(text) is None
+
+
+def test_symbol_and_digit_chunks_are_low_alpha():
+    assert ChunkFilter(min_chars=5).reason("12345 67890 ---- |||| 2024-01-01 $$$$") == "low_alpha"
+
+
+def test_url_list_is_link_heavy():
+    text = " ".join(f"https://example.com/page-{i}" for i in range(10))
+    assert ChunkFilter(min_chars=5, min_alpha_ratio=0.0).reason(text) == "link_heavy"
+
+
+def test_prose_with_a_link_is_kept():
+    text = ("Our team builds reliable data pipelines for retailers and publishers. "
+            "Read the case studies at https://example.com/work before you get in touch.")
+    assert ChunkFilter().reason(text) is None
+
+
+def test_filter_and_accept_count_the_same_way():
+    records = [{"text": "   "}, {"text": "tiny"},
+               {"text": "A paragraph long enough to keep, written in ordinary words about the product."}]
+    by_filter, by_accept = ChunkFilter(), ChunkFilter()
+
+    kept = by_filter.filter(records)
+    accepted = [record for record in records if by_accept.accept(record)]
+
+    assert kept == accepted == records[2:]
+    assert by_filter.stats() == by_accept.stats() == {
+        "kept": 1, "dropped": 2, "reasons": {"empty": 1, "too_short": 1}}
+
+
+def test_counts_are_safe_across_threads():
+    chunk_filter = ChunkFilter()
+    record = {"text": "A paragraph long enough to keep, written in ordinary words about the product."}
+
+    def work():
+        for _ in range(1000):
+            chunk_filter.accept(record)
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert chunk_filter.stats()["kept"] == 8000
@@ -0,0 +1,159 @@
+"""
+Text Quality for RAG Chatbot
+One normalization stage for every source, and a filter that drops low-value chunks before they are embedded
+"""
+
+import re
+import threading
+import unicodedata
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional
+
+# Control characters, zero-width marks and lone surrogates (PDF extraction produces the latter)
+JUNK_CHARS = re.compile("[\x00-\x08\x0e-\x1f\x7f\u200b-\u200d\u2060\ufeff\ud800-\udfff]")
+EXTRA_BLANK_LINES = re.compile(r"\n{3,}")
+
+LINK_TEXT = re.compile(r"(?:https?://|www\.)\S+|\S+@\S+\.\w+")
+
+# HTML blocks that are usually menus, and attributes that mark cookie / consent banners
+LINK_BLOCK_TAGS = ["nav", "footer", "aside", "menu", "ul", "ol", "table"]
+BANNER_ATTR = re.compile(r"cookie|consent|gdpr", re.IGNORECASE)
+
+DEFAULT_MIN_CHARS = 30
+DEFAULT_MIN_ALPHA_RATIO = 0.3
+DEFAULT_MAX_LINK_RATIO = 0.6
+
+
+def normalize_line(line: str) -> str:
+    """
+    One stripped line: junk characters removed, whitespace runs collapsed to one space,
+    NFKC-normalized
+    """
+    if "  " in line or not line.isprintable():
+        line = " ".join(JUNK_CHARS.sub("", line).split())
+    if not line.isascii() and not unicodedata.is_normalized("NFKC", line):
+        line = unicodedata.normalize("NFKC", line)
+    return line
+
+
+def is_clean(lines: List[str], joined: str) -> bool:
+    """True if normalize_line would leave every line unchanged (checked with C-speed string methods)"""
+    return ("  " not in joined and all(map(str.isprintable, lines))
+            and (joined.isascii() or unicodedata.is_normalized("NFKC", joined)))
+
+
+def join_lines(lines: List[str], keep_paragraphs: bool) -> str:
+    if keep_paragraphs:
+        return EXTRA_BLANK_LINES.sub("\n\n", "\n".join(lines)).strip("\n")
+    return "\n".join(filter(None, lines))
+
+
+def normalize_text(text: str, keep_paragraphs: bool = False) -> str:
+    """
+    Strip every line and drop the empty ones; with keep_paragraphs a run of blank
+    lines becomes one blank line, so the chunker still sees paragraph breaks. Lines
+    are only normalized one by one when the text as a whole is not already clean.
+    """
+    # NFKC would turn no-break spaces into spaces anyway; doing it first keeps most pages on the fast path
+    lines = [line.strip() for line in text.replace("\xa0", " ").splitlines()]
+    joined = join_lines(lines, keep_paragraphs)
+    if is_clean(lines, joined):
+        return joined
+    return join_lines([normalize_line(line) if line else line for line in lines], keep_paragraphs)
+
+
+def is_banner(tag) -> bool:
+    marks = [tag.attrs.get("id") or ""] + list(tag.attrs.get("class") or [])
+    return any(BANNER_ATTR.search(mark) for mark in marks)
+
+
+def strip_boilerplate(soup, max_link_ratio: float = DEFAULT_MAX_LINK_RATIO) -> int:
+    """
+    Remove cookie/consent banners and menu-like blocks (nav, lists, tables ...) whose
+    text is mostly link text, in place, in one walk of the tree. Returns how many
+    elements were removed.
+    """
+    removed = 0
+    candidates = soup.find_all(lambda tag: tag.name in LINK_BLOCK_TAGS or
+                               (("id" in tag.attrs or "class" in tag.attrs) and is_banner(tag)))
+    for element in candidates:
+        if element.decomposed:
+            continue
+        if element.name not in LINK_BLOCK_TAGS or is_banner(element):
+            element.decompose()
+            removed += 1
+            continue
+        text_chars = len(element.get_text(strip=True))
+        if not text_chars:
+            continue
+        link_chars = sum(len(a.get_text(strip=True)) for a in element.find_all("a"))
+        if link_chars / text_chars >= max_link_ratio:
+            element.decompose()
+            removed += 1
+    return removed
+
+
+class ChunkFilter:
+    """
+    Drops chunks not worth embedding: too short, mostly digits / symbols, or mostly
+    URLs and e-mail addresses. Counts what it drops and why.
+    """
+
+    def __init__(self, min_chars: int = DEFAULT_MIN_CHARS, min_alpha_ratio: float = DEFAULT_MIN_ALPHA_RATIO,
+                 max_link_ratio: float = DEFAULT_MAX_LINK_RATIO, keep_if: Optional[Callable[[str], bool]] = None):
+        self.min_chars = min_chars
+        self.min_alpha_ratio = min_alpha_ratio
+        self.max_link_ratio = max_link_ratio
+        # Chunks it accepts (e.g. ones holding contact details) are kept whatever the reason to drop them
+        self.keep_if = keep_if
+        self.kept = 0
+        self.dropped: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def reason(self, text: str) -> Optional[str]:
+        """Why the chunk should be dropped, or None to keep it"""
+        visible = len(text) - sum(map(str.isspace, text))
+        # Both ratios divide by visible, so whitespace-only chunks stop here whatever min_chars is
+        if not visible:
+            return "empty"
+        if visible < self.min_chars:
+            reason = "too_short"
+        elif sum(map(str.isalpha, text)) / visible < self.min_alpha_ratio:
+            reason = "low_alpha"
+        elif ("://" in text or "www." in text or "@" in text) and \
+                sum(len(m) for m in LINK_TEXT.findall(text)) / visible > self.max_link_ratio:
+            reason = "link_heavy"
+        else:
+            return None
+        # Asked last, so only chunks about to be dropped pay for it
+        if self.keep_if is not None and self.keep_if(text):
+            return None
+        return reason
+
+    def accept(self, record: Dict[str, Any]) -> bool:
+        """Whether to keep one chunk record, counted like filter()"""
+        reason = self.reason(record["text"])
+        with self._lock:
+            if reason:
+                self.dropped[reason] += 1
+            else:
+                self.kept += 1
+        return reason is None
+
+    def filter(self, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Keep the chunk records ({"text": ..., ...}) that pass"""
+        kept, dropped = [], Counter()
+        for record in records:
+            reason = self.reason(record["text"])
+            if reason:
+                dropped[reason] += 1
+            else:
+                kept.append(record)
+        with self._lock:
+            self.kept += len(kept)
+            self.dropped.update(dropped)
+        return kept
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"kept": self.kept, "dropped": sum(self.dropped.values()), "reasons": dict(self.dropped)}
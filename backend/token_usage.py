@@ -0,0 +1,86 @@
+"""
+Token Accounting for RAG Chatbot
+Per-call breakdown of prompt, context, history and output tokens
+"""
+
+import math
+from typing import List, Dict, Any, Optional, Tuple
+from langchain_core.callbacks import BaseCallbackHandler
+
+# Gemini averages roughly four characters per token on English web text
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap local token estimate (no API call)"""
+    if not text:
+        return 0
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def format_history(chat_history: List[Tuple[str, str]]) -> str:
+    """Render (question, answer) pairs the way they reach the prompt"""
+    return "\n".join(f"Human: {q}\nAssistant: {a}" for q, a in chat_history)
+
+
+class TokenUsageCallback(BaseCallbackHandler):
+    """Collects provider-reported token usage for every LLM call in one chain run"""
+
+    def __init__(self):
+        self.llm_calls = 0
+        self.coalesced_calls = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+
+    def on_llm_end(self, response, **kwargs) -> None:
+        self.llm_calls += 1
+        if response.llm_output and response.llm_output.get("coalesced"):
+            # Shared another session's in-flight call (single_flight.py); no tokens were spent for it
+            self.coalesced_calls += 1
+        usage = None
+        for generations in response.generations:
+            for generation in generations:
+                message = getattr(generation, "message", None)
+                usage = getattr(message, "usage_metadata", None) or usage
+        if not usage and response.llm_output:
+            usage = response.llm_output.get("usage_metadata")
+        if usage:
+            self.input_tokens += usage.get("input_tokens", 0)
+            self.output_tokens += usage.get("output_tokens", 0)
+
+
+def build_usage_record(prompt_template: str, question: str, context_docs: List[Any],
+                       chat_history: List[Tuple[str, str]], answer: str,
+                       callback: Optional[TokenUsageCallback] = None) -> Dict[str, Any]:
+    """Break one query's token spend down by prompt part"""
+    from prompts import split_static_prefix
+
+    static_prefix, dynamic_tail = split_static_prefix(prompt_template)
+    context = "\n\n".join(getattr(doc, "page_content", str(doc)) for doc in context_docs)
+
+    record = {
+        "prompt_tokens": estimate_tokens(static_prefix) + estimate_tokens(dynamic_tail),
+        "context_tokens": estimate_tokens(context),
+        "history_tokens": estimate_tokens(format_history(chat_history)),
+        "question_tokens": estimate_tokens(question),
+        "output_tokens": estimate_tokens(answer),
+        "context_chunks": len(context_docs)
+    }
+    record["estimated_input_tokens"] = (record["prompt_tokens"] + record["context_tokens"]
+                                        + record["history_tokens"] + record["question_tokens"])
+
+    if callback is not None:
+        record["llm_calls"] = callback.llm_calls
+        record["coalesced_llm_calls"] = callback.coalesced_calls
+        record["provider_input_tokens"] = callback.input_tokens
+        record["provider_output_tokens"] = callback.output_tokens
+
+    return record
+
+
+def summarize_usage(records: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Average each field over a list of usage records"""
+    if not records:
+        return {}
+    keys = records[0].keys()
+    return {key: sum(r.get(key, 0) for r in records) / len(records) for key in keys}
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Transport Benchmark for RAG Chatbot
+Compares plain requests.get against HttpTransport on a local test site
+"""
+
+import argparse
+import gzip
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Dict, Any, Optional
+
+import requests
+
+from http_transport import HttpTransport, TransportError, DEFAULT_USER_AGENT
+
+
+class SiteStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.requests = 0
+        self.bytes_sent = 0
+        self.throttled = 0
+
+    def reset(self):
+        with self.lock:
+            self.connections = self.requests = self.bytes_sent = self.throttled = 0
+
+    def snapshot(self) -> Dict[str, int]:
+        with self.lock:
+            return {"connections": self.connections, "requests": self.requests,
+                    "bytes_sent": self.bytes_sent, "throttled": self.throttled}
+
+
+class TestSite:
+    """
+    Local site with HTML pages, a few images and one oversized download.
+    Supports keep-alive and gzip, and answers a share of requests with 429.
+    """
+
+    def __init__(self, pages: int = 100, page_kb: int = 30, latency_ms: float = 20,
+                 rate_limit_prob: float = 0.0, large_mb: int = 20, seed: int = 0):
+        self.pages = pages
+        self.latency_ms = latency_ms
+        self.rate_limit_prob = rate_limit_prob
+        self.stats = SiteStats()
+        self.random = random.Random(seed)
+
+        words = "profile skills project experience education contact resume python data".split()
+        filler = " ".join(self.random.choice(words) for _ in range(page_kb * 1024 // 8))
+        self.page_body = f"<html><body><h1>Page</h1><p>{filler}</p></body></html>".encode('utf-8')
+        self.page_gzip = gzip.compress(self.page_body)
+        self.image_body = bytes(self.random.getrandbits(8) for _ in range(200 * 1024))
+        self.large_mb = large_mb
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), self._handler_class())
+        self.httpd.daemon_threads = True
+        # Clients abandoning rejected downloads mid-body is expected here
+        self.httpd.handle_error = lambda request, client_address: None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def urls(self) -> List[str]:
+        urls = [f"{self.base_url}/page/{i}" for i in range(self.pages)]
+        # Resources a crawler can run into that aren't worth parsing
+        urls += [f"{self.base_url}/image/{i}.png" for i in range(max(self.pages // 20, 1))]
+        urls.append(f"{self.base_url}/download/archive.html")
+        return urls
+
+    def start(self) -> "TestSite":
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def _handler_class(self):
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body go out in separate writes; without this, keep-alive
+            # connections stall on Nagle + delayed ACK and the comparison is skewed
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                pass
+
+            def setup(self):
+                super().setup()
+                with site.stats.lock:
+                    site.stats.connections += 1
+
+            def _send(self, status: int, content_type: str, body: bytes, headers: Optional[Dict[str, str]] = None):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+                with site.stats.lock:
+                    site.stats.bytes_sent += len(body)
+
+            def do_GET(self):
+                with site.stats.lock:
+                    site.stats.requests += 1
+                    limited = site.random.random() < site.rate_limit_prob
+                time.sleep(site.latency_ms / 1000)
+
+                if limited:
+                    with site.stats.lock:
+                        site.stats.throttled += 1
+                    self._send(429, "text/plain", b"Too Many Requests", {"Retry-After": "0.2"})
+                elif self.path.startswith("/page/"):
+                    if "gzip" in self.headers.get("Accept-Encoding", ""):
+                        self._send(200, "text/html; charset=utf-8", site.page_gzip, {"Content-Encoding": "gzip"})
+                    else:
+                        self._send(200, "text/html; charset=utf-8", site.page_body)
+                elif self.path.startswith("/image/"):
+                    self._send(200, "image/png", site.image_body)
+                elif self.path.startswith("/download/"):
+                    # Claims to be HTML, so only the size cap can stop it
+                    self._send(200, "text/html", b"<p>" + b"x" * (site.large_mb * 1024 * 1024) + b"</p>")
+                else:
+                    self._send(404, "text/plain", b"Not found")
+
+        return Handler
+
+
+def fetch_plain(urls: List[str]) -> Dict[str, Any]:
+    """The scraper's old path: one requests.get per URL, no session"""
+    fetched, failed, received = 0, 0, 0
+    for url in urls:
+        try:
+            response = requests.get(url, headers={'User-Agent': DEFAULT_USER_AGENT}, timeout=20)
+            response.raise_for_status()
+            received += len(response.content)
+            fetched += 1
+        except Exception:
+            failed += 1
+    return {"fetched": fetched, "failed": failed, "rejected": 0, "received_bytes": received}
+
+
+def fetch_transport(urls: List[str], transport: HttpTransport) -> Dict[str, Any]:
+    fetched, failed, received = 0, 0, 0
+    for url in urls:
+        try:
+            received += len(transport.get(url))
+            fetched += 1
+        except TransportError:
+            failed += 1
+    stats = transport.stats()
+    return {"fetched": fetched, "failed": failed - stats["rejected"], "rejected": stats["rejected"],
+            "received_bytes": received, "retries": stats["retries"]}
+
+
+def run_benchmark(pages: int, latency_ms: float, rate_limit_prob: float) -> List[Dict[str, Any]]:
+    site = TestSite(pages=pages, latency_ms=latency_ms, rate_limit_prob=rate_limit_prob).start()
+    urls = site.urls()
+    variants = [
+        ("requests.get", lambda: fetch_plain(urls)),
+        ("transport", lambda: fetch_transport(urls, HttpTransport())),
+        ("transport, no politeness", lambda: fetch_transport(urls, HttpTransport(latency_factor=0.0, max_delay=0.0)))
+    ]
+
+    results = []
+    try:
+        for name, run in variants:
+            site.stats.reset()
+            site.random.seed(0)
+            t0 = time.perf_counter()
+            row = {"variant": name, **run()}
+            row["wall_s"] = time.perf_counter() - t0
+            row.update(site.stats.snapshot())
+            results.append(row)
+            print(f"{name:>26}  {row['wall_s']:7.2f}s  fetched {row['fetched']:4d}  failed {row['failed']:3d}  "
+                  f"rejected {row['rejected']:2d}  connections {row['connections']:4d}  "
+                  f"wire {row['bytes_sent'] / 1e6:7.2f} MB")
+    finally:
+        site.stop()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the scraper HTTP transport against plain requests.get")
+    parser.add_argument("--pages", type=int, default=100, help="HTML pages on the test site")
+    parser.add_argument("--latency-ms", type=float, default=20, help="server latency per request")
+    parser.add_argument("--rate-limit-prob", type=float, default=0.05, help="probability of a 429 per request")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    args = parser.parse_args()
+
+    print("Transport Benchmark")
+    print("=" * 50)
+    results = run_benchmark(args.pages, args.latency_ms, args.rate_limit_prob)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()